@@ -1,12 +1,32 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, session, Response
+from flask import Flask, jsonify, request, render_template, redirect, url_for, session, Response, abort, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import re
+import sys
 import secrets
 import time
 import json
 from functools import wraps
 from models.models import db, User, Template, Placeholder, Prompt, Resource
+from models.database import init_database
+from models.migrations import run_migrations
+from models.data_access import (
+    can_read_template, load_document_source, load_market_fingerprints, load_template_stamp,
+    render_stored_document_cached
+)
+from models.plantuml_pipeline import plantuml_pipeline
+from models.template_search import listing_options, listing_page, search_templates
+from models.template_import import (
+    create_template_bulk, export_catalogue, import_catalogue, parse_placeholder_lines, parse_prompt_lines
+)
+from mcp_tools.auth_cache import auth_cache
+from templates.document_cache import document_cache
+from templates.markdown_preview import preview_cache
+from web.http_cache import conditional_response, etag_for, init_http_cache, not_modified
+from monitoring.instrumentation import init_metrics
+from monitoring.sql_profiler import sql_profiler
+from workers.serving import serve_wsgi
 
 # Import MCP tools
 from mcp_tools.start_document import start_document_generation
@@ -18,17 +38,23 @@ from mcp_tools.generate_document import generate_complete_document
 app = Flask(__name__, template_folder='web_templates')
 app.secret_key = 'your-secret_key_here_2025'  # In production, use a secure secret key
 
-# Configure database
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "app.db")}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Configure and initialize the shared database (WAL, busy timeout, web pool)
+init_database(app, role='web')
 
-# Initialize database
-db.init_app(app)
+# Compress large responses
+init_http_cache(app)
 
-# Create tables
+# Route and SQL metrics, served on /metrics
+init_metrics(app, db)
+
+# Slow-statement log and N+1 detection, when SQL_PROFILE=1
+with app.app_context():
+    sql_profiler.install(db.engine)
+
+# Create tables and bring existing databases up to the current schema
 with app.app_context():
     db.create_all()
+    run_migrations(db.engine, backup=True)
 
 # User authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -89,14 +115,39 @@ def templates_market():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Get all public templates and user's own templates
-    public_templates = Template.query.filter_by(is_public=True).all()
-    user_templates = Template.query.filter_by(user_id=session['user_id']).all()
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit')
+    
+    # The listings only change when a listed template's version does
+    public_fingerprint, own_fingerprint = load_market_fingerprints(session['user_id'])
+    etag = etag_for('market', session['user_id'], session['username'], request.query_string.decode('latin-1'),
+                    *public_fingerprint, *own_fingerprint)
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    return render_template('templates_market.html', 
-                          public_templates=public_templates, 
-                          user_templates=user_templates,
-                          username=session['username'])
+    # One page of each listing (newest first), or one page of search results
+    search_page = public_page = own_page = None
+    try:
+        if query:
+            search_page = search_templates(session['user_id'], query, limit, request.args.get('cursor'))
+        else:
+            # Cards need neither the content nor the placeholder rows
+            public_page = listing_page([Template.is_public == True], limit,  # noqa: E712
+                                       request.args.get('public_cursor'), options=listing_options())
+            own_page = listing_page([Template.user_id == session['user_id']], limit,
+                                    request.args.get('mine_cursor'), options=listing_options())
+    except ValueError:
+        return "无效的分页参数", 400
+    
+    return conditional_response(render_template('templates_market.html', 
+                          query=query,
+                          search_page=search_page,
+                          public_page=public_page,
+                          own_page=own_page,
+                          public_templates=public_page.items if public_page else [], 
+                          user_templates=own_page.items if own_page else [],
+                          username=session['username']), etag)
 
 @app.route('/templates/create', methods=['GET', 'POST'])
 def create_template():
@@ -109,72 +160,162 @@ def create_template():
         description = request.form['description']
         is_public = 'is_public' in request.form
         
-        # Create new template
-        template = Template(
-            name=name,
-            content=content,
-            description=description,
-            user_id=session['user_id'],
-            is_public=is_public
-        )
-        db.session.add(template)
-        db.session.commit()
-        
-        # Process placeholders
-        placeholders_data = request.form.get('placeholders', '')
-        if placeholders_data:
-            placeholders = placeholders_data.split('\n')
-            for placeholder_line in placeholders:
-                if ':' in placeholder_line:
-                    parts = placeholder_line.split(':', 1)
-                    name = parts[0].strip()
-                    desc = parts[1].strip() if len(parts) > 1 else ''
-                    if name:
-                        placeholder = Placeholder(
-                            name=name,
-                            description=desc,
-                            template_id=template.id
-                        )
-                        db.session.add(placeholder)
-        
-        # Process prompts
-        prompts_data = request.form.get('prompts', '')
-        if prompts_data:
-            prompts = prompts_data.split('\n')
-            for i, prompt_content in enumerate(prompts):
-                if prompt_content.strip():
-                    prompt = Prompt(
-                        order=i,
-                        content=prompt_content.strip(),
-                        template_id=template.id
-                    )
-                    db.session.add(prompt)
-        
-        db.session.commit()
+        # Placeholders written as {{name}} in the content are discovered; the
+        # textarea only adds descriptions and placeholders not in the content
+        try:
+            create_template_bulk(
+                session['user_id'], name, content, description, is_public,
+                declared=parse_placeholder_lines(request.form.get('placeholders', '')),
+                prompts=parse_prompt_lines(request.form.get('prompts', ''))
+            )
+        except ValueError as e:
+            return render_template('create_template.html', username=session['username'], error=str(e))
         
         return redirect(url_for('templates_market'))
     
     return render_template('create_template.html', username=session['username'])
 
+def catalogue_user_id():
+    """The logged-in user, or the owner of the X-API-Key header for scripted transfers"""
+    if 'user_id' in session:
+        return session['user_id']
+    api_key = request.headers.get('X-API-Key')
+    if api_key:
+        user = User.query.filter_by(auth_token=api_key).first()
+        if user:
+            return user.id
+    return None
+
+@app.route('/templates/export')
+def export_templates():
+    user_id = catalogue_user_id()
+    if user_id is None:
+        abort(401)
+    
+    # Own templates by default, the public market with ?scope=public
+    if request.args.get('scope') == 'public':
+        criteria = [Template.is_public == True]  # noqa: E712
+    else:
+        criteria = [Template.user_id == user_id]
+    
+    # Streamed page by page; the catalogue is never held in memory
+    response = Response(stream_with_context(export_catalogue(criteria)), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=templates.ndjson'
+    return response
+
+@app.route('/templates/import', methods=['POST'])
+def import_templates():
+    user_id = catalogue_user_id()
+    if user_id is None:
+        abort(401)
+    
+    # NDJSON request body, read line by line and committed in batches;
+    # templates whose content the user already has are skipped
+    result = import_catalogue(request.stream, user_id)
+    return jsonify({
+        'imported': result.imported,
+        'skipped': result.skipped,
+        'failed': result.failed,
+        'errors': [{'line': number, 'error': message} for number, message in result.errors]
+    })
+
 @app.route('/templates/<int:template_id>')
 def view_template(template_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    template = Template.query.get_or_404(template_id)
+    # Check access and revalidate against the version stamp before loading anything else
+    stamp = load_template_stamp(template_id)
+    if not stamp:
+        abort(404)
     
     # Check if user can view this template (own template or public)
-    if template.user_id != session['user_id'] and not template.is_public:
+    if not can_read_template(stamp, session['user_id']):
         return "访问被拒绝", 403
     
+    etag = etag_for('template', template_id, stamp.version, session['user_id'], session['username'])
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    template = Template.query.get_or_404(template_id)
     placeholders = Placeholder.query.filter_by(template_id=template_id).all()
     prompts = Prompt.query.filter_by(template_id=template_id).order_by(Prompt.order).all()
     
-    return render_template('template_detail.html', 
+    return conditional_response(render_template('template_detail.html', 
                           template=template, 
                           placeholders=placeholders, 
                           prompts=prompts,
-                          username=session['username'])
+                          username=session['username']), etag)
+
+
+# HTML previews. Markdown is converted once per content hash; browsers
+# revalidate with ETag/If-None-Match or Last-Modified and get 304 when unchanged.
+
+def preview_response(entry, etag, title, template_id):
+    page = render_template('preview.html', title=title, html=entry.html, template_id=template_id)
+    return conditional_response(page, etag, last_modified=entry.last_modified)
+
+@app.route('/templates/<int:template_id>/preview')
+def preview_template(template_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    template = Template.query.get_or_404(template_id)
+    if template.user_id != session['user_id'] and not template.is_public:
+        return "访问被拒绝", 403
+    
+    key = preview_cache.key(template.content)
+    etag = etag_for('preview', key, template.name)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    entry = preview_cache.get_html(template.content, key)
+    return preview_response(entry, etag, template.name, template_id)
+
+@app.route('/templates/<int:template_id>/document/preview')
+def preview_document(template_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    source = load_document_source(template_id)
+    if not source:
+        return "模板不存在", 404
+    if not can_read_template(source, session['user_id']):
+        return "访问被拒绝", 403
+    
+    # The version stamp identifies the document, so revalidation needs no rendering
+    etag = etag_for('document', template_id, source.version, preview_cache.namespace())
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    document = render_stored_document_cached(source, document_cache).document
+    entry = preview_cache.get_html(document)
+    return preview_response(entry, etag, "生成文档预览", template_id)
+
+DIAGRAM_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+@app.route('/diagrams/<key>')
+def diagram_image(key):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    renderer = plantuml_pipeline.renderer
+    if renderer is None or not DIAGRAM_KEY_PATTERN.match(key):
+        return "图表不存在", 404
+    output = plantuml_pipeline.get_rendered(key)
+    if output is None:
+        return "图表不存在", 404
+    
+    # Content-addressed: a key always maps to the same image
+    response = Response(output, mimetype=renderer.mimetype)
+    response.set_etag(key)
+    response.cache_control.private = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
 
 
 # MCP Configuration route - Global configuration
@@ -192,6 +333,8 @@ def mcp_config():
     if not user.auth_token:
         user.auth_token = secrets.token_urlsafe(32)
         db.session.commit()
+        # The MCP service may have cached this key as unknown
+        auth_cache.invalidate(user.auth_token)
 
     api_key = user.auth_token
 
@@ -221,15 +364,56 @@ def mcp_config():
         }
     }
 
-    return render_template('mcp_config.html',
+    # Everything on the page is known at this point; only render when it changed
+    etag = etag_for('mcp_config', session['username'], api_key, server_url, mcp_transport, mcp_host, mcp_port)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    return conditional_response(render_template('mcp_config.html',
                            mcp_config=mcp_config,
                            server_url=server_url,
                            api_key=api_key,
                            username=session['username'],
                            mcp_transport=mcp_transport,
                            mcp_host=mcp_host,
-                           mcp_port=mcp_port)
+                           mcp_port=mcp_port), etag)
+
+@app.route('/mcp/config/rotate', methods=['POST'])
+def rotate_mcp_token():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    user = User.query.get(session['user_id'])
+    if not user:
+        return redirect(url_for('login'))
+
+    # Replace the authentication token and revoke the old one everywhere
+    old_token = user.auth_token
+    user.auth_token = secrets.token_urlsafe(32)
+    db.session.commit()
+    auth_cache.invalidate(*[token for token in (old_token, user.auth_token) if token])
+
+    return redirect(url_for('mcp_config'))
+
+# Liveness check used by the worker supervisor of start_all_services.py
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
 
 if __name__ == '__main__':
     # Bind to all interfaces to allow external access
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    host = '0.0.0.0'
+    port = 5000
+    for i, arg in enumerate(sys.argv):
+        if arg == '--host' and i + 1 < len(sys.argv):
+            host = sys.argv[i + 1]
+        elif arg == '--port' and i + 1 < len(sys.argv):
+            port = int(sys.argv[i + 1])
+
+    if '--worker' in sys.argv:
+        # One of several production workers started by start_all_services.py --workers,
+        # sharing the port through SO_REUSEPORT
+        serve_wsgi(app, host, port)
+    else:
+        app.run(debug=True, host=host, port=port)
\ No newline at end of file
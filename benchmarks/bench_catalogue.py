@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+模板目录导入/导出基准：生成N个模板的NDJSON目录，用 template_catalogue.py 导入(首次导入、重复导入全部跳过)和导出，
+统计耗时、吞吐量和进程内存峰值；并以逐个模板ORM提交的旧方式(add_sample_templates.py 的做法)导入一小部分作对比
+用法: python benchmarks/bench_catalogue.py [--templates 100000] [--placeholders 10] [--legacy 1000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def write_catalogue(path, templates, placeholder_count):
+    """Write a synthetic catalogue one line at a time"""
+    from synthetic_data import SECTION_FILLER
+
+    with open(path, 'w', encoding='utf-8') as catalogue:
+        for number in range(templates):
+            names = [f"section_{i}" for i in range(placeholder_count)]
+            # The number makes every content, and so every content hash, distinct
+            content = f"# 设计文档 {number}\n" + ''.join(
+                f"\n## {i + 1}. {name}\n{SECTION_FILLER}{{{{{name}}}}}\n" for i, name in enumerate(names))
+            record = {
+                'name': f"Catalogue template {number}",
+                'description': "benchmark catalogue",
+                'content': content,
+                'is_public': number % 2 == 0,
+                'placeholders': [{'name': name, 'description': f"第{i + 1}节"} for i, name in enumerate(names)],
+                'prompts': [f"请填写第{i + 1}节" for i in range(placeholder_count)],
+            }
+            catalogue.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def run_cli(database_uri, *arguments):
+    """Run template_catalogue.py; return (seconds, peak RSS in MB, stderr)"""
+    env = dict(os.environ, DATABASE_URI=database_uri)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'template_catalogue.py'), *arguments],
+                               cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read().decode()
+    # wait4 reports the resource usage of this child alone
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.stderr.close()
+    if status != 0:
+        raise SystemExit(f"template_catalogue.py {' '.join(arguments)} failed:\n{stderr}")
+    return elapsed, usage.ru_maxrss / 1024, stderr.strip()
+
+
+def legacy_import(path, count):
+    """One ORM object per row and one commit per template, like add_sample_templates.py"""
+    from models.models import db, User, Template, Placeholder, Prompt
+
+    user = User.query.filter_by(username="legacy").first()
+    start = time.perf_counter()
+    with open(path, encoding='utf-8') as catalogue:
+        for _, line in zip(range(count), catalogue):
+            record = json.loads(line)
+            template = Template(name=record['name'], content=record['content'], description=record['description'],
+                                user_id=user.id, is_public=record['is_public'])
+            db.session.add(template)
+            db.session.commit()
+            for item in record['placeholders']:
+                db.session.add(Placeholder(name=item['name'], description=item['description'],
+                                           template_id=template.id))
+            for order, prompt in enumerate(record['prompts']):
+                db.session.add(Prompt(order=order, content=prompt, template_id=template.id))
+            db.session.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template catalogue import/export benchmark")
+    parser.add_argument("--templates", type=int, default=100000, help="templates in the catalogue (default: 100000)")
+    parser.add_argument("--placeholders", type=int, default=10,
+                        help="placeholders and prompts per template (default: 10)")
+    parser.add_argument("--legacy", type=int, default=1000,
+                        help="templates imported the old way for comparison (default: 1000)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_catalogue_")
+    database_uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['DATABASE_URI'] = database_uri
+    catalogue = os.path.join(workdir, 'catalogue.ndjson')
+    exported = os.path.join(workdir, 'exported.ndjson')
+    write_catalogue(catalogue, args.templates, args.placeholders)
+    size_mb = os.path.getsize(catalogue) / 1024 / 1024
+    print(f"{args.templates} templates x {args.placeholders} placeholders/prompts, {size_mb:.0f} MB of NDJSON")
+
+    from synthetic_data import create_user, seed_app
+    from models.models import db
+    from models.migrations import run_migrations
+
+    app = seed_app()
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        create_user("importer", "importer-key")
+        create_user("legacy", "legacy-key")
+
+    print(f"{'run':<28}{'seconds':>9}{'templates/s':>13}{'peak MB':>9}  result")
+    for label, arguments in [
+        ("import", ('import', catalogue, '--user', 'importer')),
+        ("import again (all skipped)", ('import', catalogue, '--user', 'importer')),
+        ("export", ('export', '--user', 'importer', '-o', exported)),
+    ]:
+        elapsed, peak_mb, summary = run_cli(database_uri, *arguments)
+        print(f"{label:<28}{elapsed:>9.1f}{args.templates / elapsed:>13.0f}{peak_mb:>9.0f}  {summary}")
+
+    if args.legacy:
+        with app.app_context():
+            elapsed = legacy_import(catalogue, args.legacy)
+        print(f"{'per-template ORM commits':<28}{elapsed:>9.1f}{args.legacy / elapsed:>13.0f}{'':>9}  "
+              f"first {args.legacy} templates")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Web 页面 HTTP 缓存基准：对比完整渲染、gzip 压缩与 ETag 重新验证(304)的传输字节数和延迟
+用法: python benchmarks/bench_http_caching.py [--public-templates 500] [--requests 30]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(client, url, requests, headers=None):
+    """Median latency and response size of ``requests`` GETs"""
+    latencies = []
+    size = 0
+    status = None
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        latencies.append(time.perf_counter() - start)
+        size = len(response.get_data())
+        status = response.status_code
+    return statistics.median(latencies), size, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP caching and compression benchmark")
+    parser.add_argument("--public-templates", type=int, default=500, help="public templates (default: 500)")
+    parser.add_argument("--placeholders", type=int, default=20, help="placeholders per template (default: 20)")
+    parser.add_argument("--requests", type=int, default=30, help="requests per scenario (default: 30)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_http_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import app as web
+    from synthetic_data import create_user, create_template
+
+    with web.app.app_context():
+        owner_id = create_user("publisher", "publisher-key")
+        user_id = create_user("reviewer", "reviewer-key")
+        for _ in range(args.public_templates):
+            create_template(owner_id, args.placeholders, is_public=True)
+        own_template = create_template(user_id, args.placeholders)
+
+    client = web.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = "reviewer"
+
+    pages = {
+        'templates_market': '/templates/market',
+        'view_template': f'/templates/{own_template}',
+        'mcp_config': '/mcp/config',
+    }
+    print(f"{args.public_templates} public templates x {args.placeholders} placeholders, "
+          f"median of {args.requests} requests")
+    print(f"{'page':<18}{'scenario':<22}{'status':>7}{'bytes':>10}{'ms':>9}")
+    for page, url in pages.items():
+        etag = client.get(url).headers['ETag']
+        scenarios = [
+            ("full, identity", {'Accept-Encoding': 'identity'}),
+            ("full, gzip", {'Accept-Encoding': 'gzip'}),
+            ("revalidate (304)", {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+        ]
+        for label, headers in scenarios:
+            latency, size, status = measure(client, url, args.requests, headers)
+            print(f"{page:<18}{label:<22}{status:>7}{size:>10}{latency * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
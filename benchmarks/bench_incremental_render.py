@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+对比单个占位符修改后的文档生成：完整重新渲染 vs 增量拼接并返回补丁
+用法: python benchmarks/bench_incremental_render.py [--placeholders 1000] [--steps 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_KEY = "incremental-render-key"
+SECTION_CONTENT = "该部分内容由助手逐步补充，用于模拟真实设计文档中的段落。\n" * 8
+
+
+def apply_patch(document, patch):
+    """Apply {'offset', 'length', 'text'} edits from last to first"""
+    for edit in reversed(patch):
+        document = document[:edit['offset']] + edit['text'] + document[edit['offset'] + edit['length']:]
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-render benchmark")
+    parser.add_argument("--placeholders", type=int, default=1000, help="placeholders per template (default: 1000)")
+    parser.add_argument("--steps", type=int, default=50, help="submit/generate rounds per mode (default: 50)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_incr_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import mcp_service
+    from models.models import db, Placeholder
+    from synthetic_data import create_user, create_template, seed_app
+
+    fixtures_app = seed_app()
+
+    with fixtures_app.app_context():
+        db.create_all()
+        user_id = create_user("incremental", API_KEY)
+        template_id = create_template(user_id, args.placeholders, completed=True)
+        placeholder_ids = [row[0] for row in db.session.query(Placeholder.id)
+                           .filter_by(template_id=template_id).order_by(Placeholder.id)]
+        db.session.query(Placeholder).filter_by(template_id=template_id).update(
+            {'content': SECTION_CONTENT}, synchronize_session=False)
+        db.session.commit()
+
+    def submit(step):
+        placeholder_id = placeholder_ids[(step * 7919) % len(placeholder_ids)]
+        result = asyncio.run(mcp_service.submit_placeholder_content(
+            placeholder_id, f"{SECTION_CONTENT}第 {step} 次修订。\n", API_KEY))
+        assert 'error' not in result, result
+
+    def generate(since_version=None):
+        start = time.perf_counter()
+        result = asyncio.run(mcp_service.generate_complete_document(template_id, API_KEY, since_version))
+        elapsed = time.perf_counter() - start
+        assert 'error' not in result, result
+        return result, elapsed, len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+
+    baseline, _, _ = generate()
+    print(f"template: {args.placeholders} placeholders, "
+          f"{len(baseline['document_content'].encode('utf-8')) / 1024:.0f} KiB rendered")
+
+    results = {}
+
+    # Full rebuild: drop the cached render so every call renders from scratch
+    latencies, sizes = [], []
+    for step in range(args.steps):
+        submit(step)
+        mcp_service.document_cache.invalidate(template_id)
+        _, elapsed, size = generate()
+        latencies.append(elapsed)
+        sizes.append(size)
+    results['full render + full document'] = (latencies, sizes)
+
+    # Incremental: splice the changed placeholder and transfer only the patch
+    document_result, _, _ = generate()
+    document, version = document_result['document_content'], document_result['version']
+    latencies, sizes = [], []
+    for step in range(args.steps):
+        submit(args.steps + step)
+        result, elapsed, size = generate(version)
+        document = apply_patch(document, result['patch'])
+        version = result['version']
+        latencies.append(elapsed)
+        sizes.append(size)
+    results['incremental splice + patch'] = (latencies, sizes)
+
+    final, _, _ = generate()
+    assert final['document_content'] == document, "patched document differs from a full render"
+
+    print(f"{'mode':<32}{'p50 ms':>10}{'p95 ms':>10}{'response KiB':>15}")
+    for mode, (latencies, sizes) in results.items():
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{mode:<32}{statistics.median(latencies) * 1000:>10.2f}{p95 * 1000:>10.2f}"
+              f"{statistics.mean(sizes) / 1024:>15.1f}")
+    print("\nOK: patched document matches a full render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+服务日志管道基准：多个持续输出日志的子进程，对比从不读取的 subprocess.PIPE (旧方式，管道写满后子进程阻塞)
+与 LogPipeline 后台读取并写入滚动JSON Lines文件(新方式)，统计子进程完成时间、滚动后日志文件中保留/丢弃的行数、磁盘占用和内存峰值
+用法: python benchmarks/bench_log_pipeline.py [--children 4] [--lines 100000] [--width 120]
+"""
+
+import argparse
+import glob
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A child logging like a busy worker: one access-log sized line per request
+CHATTY_CHILD = "import sys\nfor i in range({lines}):\n    print({line!r}, i, file=sys.stderr if i % 2 else sys.stdout)\n"
+
+
+def spawn_children(count, lines, width):
+    code = CHATTY_CHILD.format(lines=lines, line='x' * width)
+    return [subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            for _ in range(count)]
+
+
+def wait_all(children, timeout):
+    """Seconds until every child exited, or None if one is still running at the timeout"""
+    start = time.perf_counter()
+    deadline = start + timeout
+    for child in children:
+        try:
+            child.wait(timeout=max(0, deadline - time.perf_counter()))
+        except subprocess.TimeoutExpired:
+            return None
+    return time.perf_counter() - start
+
+
+def undrained(args):
+    children = spawn_children(args.children, args.lines, args.width)
+    try:
+        elapsed = wait_all(children, args.timeout)
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+            child.stdout.close()
+            child.stderr.close()
+    status = f"{elapsed:.2f}s" if elapsed is not None else f"blocked (running after {args.timeout:.0f}s)"
+    print(f"{'unread PIPE':<22}{status:>34}")
+
+
+def drained(args, label, queue_size):
+    from workers.log_pipeline import LogPipeline
+
+    log_dir = tempfile.mkdtemp(prefix="designmaster_log_pipeline_")
+    pipeline = LogPipeline(log_dir, max_bytes=args.max_bytes, backup_count=args.backups, queue_size=queue_size,
+                           echo=False)
+    children = spawn_children(args.children, args.lines, args.width)
+    for number, child in enumerate(children, 1):
+        pipeline.attach(child, 'bench', f'bench-{number}')
+    elapsed = wait_all(children, args.timeout)
+    pipeline.close()
+    files = glob.glob(os.path.join(log_dir, 'services.log*'))
+    kept = 0
+    for path in files:
+        with open(path, 'rb') as log_file:
+            kept += sum(1 for _ in log_file)
+    disk_mb = sum(os.path.getsize(path) for path in files) / 1024 / 1024
+    status = f"{elapsed:.2f}s" if elapsed is not None else "blocked"
+    print(f"{label:<22}{status:>34}{kept:>10}{pipeline.dropped:>10}{disk_mb:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service log pipeline benchmark")
+    parser.add_argument("--children", type=int, default=4, help="logging child processes (default: 4)")
+    parser.add_argument("--lines", type=int, default=100000, help="lines per child (default: 100000)")
+    parser.add_argument("--width", type=int, default=120, help="characters per line (default: 120)")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for the children (default: 10)")
+    parser.add_argument("--max-bytes", type=int, default=10 * 1024 * 1024, help="log file size limit (default: 10MB)")
+    parser.add_argument("--backups", type=int, default=2, help="rotated files kept (default: 2)")
+    args = parser.parse_args()
+
+    print(f"{args.children} children x {args.lines} lines of {args.width} characters")
+    print(f"{'scenario':<22}{'children finished in':>34}{'kept':>10}{'dropped':>10}{'disk MB':>10}")
+    undrained(args)
+    drained(args, "LogPipeline", 64)
+    drained(args, "LogPipeline, queue 8", 8)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak memory of this process: {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
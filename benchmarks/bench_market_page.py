@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+模板市场页面内存与SQL次数基准：模板数量增长时，每次市场页请求的SQL语句数和峰值内存应保持不变
+用法: python benchmarks/bench_market_page.py [--sizes 100 1000 5000] [--placeholders 20] [--requests 10]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+
+
+def add_templates(owner_id, count, placeholder_count):
+    """Insert ``count`` public templates with ~8 KB of content and their placeholders"""
+    from models.models import db, Template, Placeholder
+    from synthetic_data import SECTION_FILLER
+
+    names = [f"section_{i}" for i in range(placeholder_count)]
+    content = "# Synthetic Design Document\n" + ''.join(
+        f"\n## {name}\n{SECTION_FILLER * 3}{{{{{name}}}}}\n" for name in names)
+    for start in range(0, count, 500):
+        batch = min(500, count - start)
+        first_id = (db.session.execute(select(db.func.max(Template.id))).scalar() or 0) + 1
+        db.session.execute(insert(Template), [
+            {'name': f"Market template {first_id + i}", 'description': "benchmark template",
+             'content': content, 'is_public': True, 'user_id': owner_id}
+            for i in range(batch)
+        ])
+        db.session.execute(insert(Placeholder), [
+            {'name': name, 'description': name, 'template_id': template_id}
+            for template_id in range(first_id, first_id + batch) for name in names
+        ])
+        db.session.commit()
+
+
+def measure(counter, engine, label, call, requests):
+    """SQL statements, peak traced memory and median latency of ``call``"""
+    latencies = []
+    with counter.watch(engine):
+        call()
+    statements = counter.count
+    tracemalloc.start()
+    for _ in range(requests):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return label, statements, peak / 1024, statistics.median(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market page memory and query-count benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="public templates (default: 100 1000 5000)")
+    parser.add_argument("--placeholders", type=int, default=20, help="placeholders per template (default: 20)")
+    parser.add_argument("--requests", type=int, default=10, help="requests per measurement (default: 10)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_market_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import app as web
+    from models.models import db, Template
+    from models.template_search import listing_options, listing_page
+    from synthetic_data import QueryCounter, create_user
+
+    with web.app.app_context():
+        owner_id = create_user("publisher", "publisher-key")
+        user_id = create_user("reviewer", "reviewer-key")
+        engine = db.engine
+
+    client = web.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = "reviewer"
+
+    def page_cards(options):
+        """Load one listing page in a fresh session and touch what a card shows"""
+        def call():
+            with web.app.app_context():
+                for template in listing_page([Template.is_public == True], 20, options=options()).items:  # noqa: E712
+                    if options is listing_options:
+                        (template.name, template.user.username, template.placeholder_count)
+                    else:
+                        (template.name, template.user.username, len(template.placeholders))
+        return call
+
+    scenarios = [
+        ("market page (HTTP)", lambda: client.get('/templates/market', headers={'Accept-Encoding': 'identity'})),
+        ("page of 20, default loading", page_cards(tuple)),
+        ("page of 20, listing_options()", page_cards(listing_options)),
+    ]
+
+    counter = QueryCounter()
+    results = {}
+    total = 0
+    print(f"{args.placeholders} placeholders per template, median of {args.requests} requests")
+    print(f"{'templates':>10}  {'scenario':<32}{'queries':>8}{'peak KB':>10}{'ms':>9}")
+    for size in sorted(args.sizes):
+        with web.app.app_context():
+            add_templates(owner_id, size - total, args.placeholders)
+        total = size
+        for label, call in scenarios:
+            label, statements, peak, latency = measure(counter, engine, label, call, args.requests)
+            results.setdefault(label, []).append(statements)
+            print(f"{size:>10}  {label:<32}{statements:>8}{peak:>10.1f}{latency:>9.2f}")
+
+    # The market page must not issue more statements as the catalogue grows
+    counts = results["market page (HTTP)"]
+    if len(set(counts)) > 1:
+        print(f"FAIL: market page statements grew with the number of templates: {counts}")
+        sys.exit(1)
+    print("OK: market page statements are constant")
+
+
+if __name__ == "__main__":
+    main()
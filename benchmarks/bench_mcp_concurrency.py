@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+MCP并发基准测试：通过HTTP传输，让多个客户端同时调用工具，观察吞吐量随客户端数的变化
+用法: python benchmarks/bench_mcp_concurrency.py [--clients 1 2 4 8 16] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_KEY = "concurrency-key"
+
+
+def client_worker(url, template_id, duration, start_at, results):
+    """One IDE-like client alternating get_next_step and generate_complete_document"""
+    from fastmcp import Client
+
+    async def run():
+        calls, errors, latencies = 0, 0, []
+        async with Client(url) as client:
+            # Start every client at the same moment
+            await asyncio.sleep(max(0, start_at - time.time()))
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                tool = 'generate_complete_document' if calls % 2 else 'get_next_step'
+                start = time.perf_counter()
+                result = await client.call_tool(tool, {'template_id': template_id, 'api_key': API_KEY})
+                latencies.append(time.perf_counter() - start)
+                calls += 1
+                if 'error' in result.data:
+                    errors += 1
+        return calls, errors, latencies
+
+    results.put(asyncio.run(run()))
+
+
+def seed(database_uri, placeholder_count):
+    os.environ['DATABASE_URI'] = database_uri
+    from models.models import db
+    from synthetic_data import create_user, create_template, seed_app
+
+    fixtures_app = seed_app()
+
+    with fixtures_app.app_context():
+        db.create_all()
+        user_id = create_user("concurrency", API_KEY)
+        template_id = create_template(user_id, placeholder_count, prompt_count=1, completed=True)
+    return template_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP HTTP transport concurrency benchmark")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="simultaneous clients per run (default: 1 2 4 8 16)")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per run (default: 5)")
+    parser.add_argument("--placeholders", type=int, default=200, help="placeholders in the template (default: 200)")
+    args = parser.parse_args()
+
+    from servers import mcp_http_server
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_mcp_concurrency_")
+    database_uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    template_id = seed(database_uri, args.placeholders)
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{'clients':>8} {'calls/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errors':>8}")
+    with mcp_http_server(database_uri) as url:
+        for clients in args.clients:
+            results = ctx.Queue()
+            start_at = time.time() + 3
+            workers = [ctx.Process(target=client_worker, args=(url, template_id, args.duration, start_at, results))
+                       for _ in range(clients)]
+            for worker in workers:
+                worker.start()
+            collected = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            calls = sum(row[0] for row in collected)
+            errors = sum(row[1] for row in collected)
+            latencies = sorted(latency for row in collected for latency in row[2])
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            print(f"{clients:>8} {calls / args.duration:>10.0f} {p50:>10.1f} {p95:>10.1f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+MCP会话生命周期微基准：对比每次工具调用创建并销毁Flask app_context(旧方式，认证时再嵌套一层)
+与线程作用域会话在调用之间保持复用(新方式)的单次调用开销
+用法: python benchmarks/bench_mcp_sessions.py [--calls 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def per_call_us(func, calls, repeat):
+    """Median over ``repeat`` runs of the mean microseconds per call"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        runs.append((time.perf_counter() - start) / calls * 1e6)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP session lifecycle microbenchmark")
+    parser.add_argument("--calls", type=int, default=5000, help="calls per run (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario (default: 5)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_sessions_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from flask import Flask
+    from sqlalchemy import select
+
+    from models.database import init_database
+    from models.data_access import load_next_step
+    from models.models import db, User
+    from mcp_tools import service_backend
+    from synthetic_data import create_user, create_template, seed_app
+
+    fixtures_app = seed_app()
+    with fixtures_app.app_context():
+        db.create_all()
+        user_id = create_user("sessions", "sessions-key")
+        template_id = create_template(user_id, 10)
+
+    # The per-call pattern the MCP service used before: a Flask app context
+    # around each tool, a nested one for the API-key lookup, and the
+    # Flask-SQLAlchemy session created and removed with the outer context
+    legacy_app = Flask('legacy_mcp')
+    init_database(legacy_app, role='mcp')
+
+    def legacy_lifecycle():
+        with legacy_app.app_context():
+            with legacy_app.app_context():
+                db.session
+            db.session
+
+    def legacy_call():
+        with legacy_app.app_context():
+            with legacy_app.app_context():
+                db.session.execute(select(User.id, User.username).where(User.auth_token == "sessions-key")).first()
+            load_next_step(template_id)
+
+    def scoped_lifecycle():
+        with service_backend.tool_session():
+            pass
+
+    def scoped_call():
+        with service_backend.tool_session() as session:
+            session.execute(select(User.id, User.username).where(User.auth_token == "sessions-key")).first()
+            load_next_step(template_id, session)
+
+    # Warm both connection pools and statement caches
+    for func in (legacy_call, scoped_call):
+        for _ in range(100):
+            func()
+
+    scenarios = [
+        ("lifecycle only, app_context", legacy_lifecycle),
+        ("lifecycle only, scoped session", scoped_lifecycle),
+        ("auth + get_next_step query, app_context", legacy_call),
+        ("auth + get_next_step query, scoped session", scoped_call),
+    ]
+    print(f"{args.calls} calls per run, median of {args.repeat} runs")
+    print(f"{'scenario':<46}{'us/call':>10}")
+    results = {}
+    for label, func in scenarios:
+        results[label] = per_call_us(func, args.calls, args.repeat)
+        print(f"{label:<46}{results[label]:>10.1f}")
+    saved = results["auth + get_next_step query, app_context"] - results["auth + get_next_step query, scoped session"]
+    print(f"saved per tool call: {saved:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
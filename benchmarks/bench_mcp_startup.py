@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+STDIO MCP服务冷启动基准：测量从启动进程到 initialize、tools/list 响应以及首次工具调用完成的时间，
+对比延迟加载数据库后端(默认)与预加载(MCP_PRELOAD=1)，并可输出 mcp_service 的导入耗时分析
+用法: python benchmarks/bench_mcp_startup.py [--runs 10] [--importtime] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "startup-key"
+
+
+def seed(database_uri):
+    """Create the database with one user, in a separate process like a real deployment"""
+    script = (
+        "import app; from models.models import db, User\n"
+        "with app.app.app_context():\n"
+        f"    db.session.add(User(username='startup', email='s@example.com', password_hash='x', auth_token={API_KEY!r}))\n"
+        "    db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+                   env={**os.environ, 'DATABASE_URI': database_uri})
+
+
+def read_response(process, request_id):
+    """Read stdout lines until the JSON-RPC response with ``request_id``"""
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("MCP server exited before answering")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get('id') == request_id:
+            return message
+
+
+def one_session(database_uri, preload):
+    """Seconds from spawn to the initialize, tools/list and first tools/call responses"""
+    env = {**os.environ, 'DATABASE_URI': database_uri}
+    if preload:
+        env['MCP_PRELOAD'] = '1'
+    else:
+        env.pop('MCP_PRELOAD', None)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'mcp_service.py')], cwd=ROOT, env=env,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True, bufsize=1)
+
+    def send(message):
+        process.stdin.write(json.dumps(message) + "\n")
+        process.stdin.flush()
+
+    try:
+        send({'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {
+            'protocolVersion': '2025-06-18', 'capabilities': {},
+            'clientInfo': {'name': 'bench_mcp_startup', 'version': '1.0'}}})
+        read_response(process, 1)
+        initialized = time.perf_counter() - start
+        send({'jsonrpc': '2.0', 'method': 'notifications/initialized'})
+        send({'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'})
+        tools = read_response(process, 2)
+        listed = time.perf_counter() - start
+        send({'jsonrpc': '2.0', 'id': 3, 'method': 'tools/call', 'params': {
+            'name': 'start_document_generation',
+            'arguments': {'project_root_path': '/tmp/project', 'api_key': API_KEY}}})
+        result = read_response(process, 3)
+        called = time.perf_counter() - start
+    finally:
+        process.stdin.close()
+        process.terminate()
+        process.wait(timeout=10)
+    if len(tools['result']['tools']) == 0 or result['result'].get('isError'):
+        raise RuntimeError(f"Unexpected responses: {tools} {result}")
+    return initialized, listed, called
+
+
+def import_profile(top):
+    """Print the slowest imports of mcp_service from ``python -X importtime``"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import mcp_service'], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        prefix, cumulative_us, name = line.split('|')
+        self_us = int(prefix.split(':')[1])
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), self_us, depth, name.strip()))
+    total = max(row[0] for row in rows)
+    print(f"\nimport mcp_service: {total / 1000:.0f} ms; slowest imports by cumulative time")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative, self_us, depth, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f}{self_us / 1000:>10.1f}  {'  ' * depth}{name}")
+    loaded = {row[3] for row in rows}
+    heavy = sorted(loaded & {'flask', 'sqlalchemy', 'flask_sqlalchemy', 'markdown', 'models.models'})
+    print("database modules imported at startup: " + (', '.join(heavy) or "none"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STDIO MCP server cold start benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="server spawns per mode (default: 10)")
+    parser.add_argument("--importtime", action="store_true", help="also print an import-time profile")
+    parser.add_argument("--top", type=int, default=15, help="imports listed in the profile (default: 15)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_startup_")
+    database_uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    seed(database_uri)
+
+    print(f"median of {args.runs} spawns, ms from spawn")
+    print(f"{'mode':<22}{'initialize':>12}{'tools/list':>12}{'first call':>12}")
+    for label, preload in (("lazy backend", False), ("preload (MCP_PRELOAD)", True)):
+        samples = [one_session(database_uri, preload) for _ in range(args.runs)]
+        initialized, listed, called = (statistics.median(column) * 1000 for column in zip(*samples))
+        print(f"{label:<22}{initialized:>12.0f}{listed:>12.0f}{called:>12.0f}")
+
+    if args.importtime:
+        import_profile(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+MCP工具基准套件：在临时SQLite数据库中构建10到10000个占位符/提示的合成模板，
+分别在进程内和通过HTTP传输调用四个工具，报告p50/p95/p99延迟、吞吐量和峰值内存，并保存JSON结果用于跨提交对比
+用法: python benchmarks/bench_mcp_tools.py [--sizes 10 100 1000 10000] [--iterations 50] [--warmup 1]
+                                         [--transports inprocess http] [--output results.json]
+                                         [--compare baseline.json] [--max-regression 1.25]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "tool-suite-key"
+TOOLS = ['start_document_generation', 'get_next_step', 'submit_placeholder_content', 'generate_complete_document']
+# Calls traced for peak memory in-process; tracemalloc slows calls down, so
+# latency is measured in a separate, untraced pass
+MEMORY_ITERATIONS = 5
+
+
+def seed(sizes):
+    """
+    Build two templates per size: one with pending prompts for get_next_step
+    and one with every prompt completed for generate_complete_document, whose
+    placeholders receive the submissions.
+    """
+    from models.models import db, Placeholder
+    from synthetic_data import create_user, create_template, seed_app
+
+    fixtures_app = seed_app()
+
+    fixtures = {}
+    with fixtures_app.app_context():
+        db.create_all()
+        user_id = create_user("tool_suite", API_KEY)
+        for size in sizes:
+            steps_template = create_template(user_id, size)
+            document_template = create_template(user_id, size, completed=True)
+            placeholder_id = db.session.query(Placeholder.id).filter_by(
+                template_id=document_template).order_by(Placeholder.id).first()[0]
+            fixtures[size] = {'steps_template': steps_template, 'document_template': document_template,
+                              'placeholder_id': placeholder_id}
+    return fixtures
+
+
+def tool_arguments(tool, fixture, iteration):
+    """Arguments of call number ``iteration``; submissions change the content every time"""
+    if tool == 'start_document_generation':
+        return {'project_root_path': "/tmp/project", 'api_key': API_KEY}
+    if tool == 'get_next_step':
+        return {'template_id': fixture['steps_template'], 'api_key': API_KEY}
+    if tool == 'submit_placeholder_content':
+        return {'placeholder_id': fixture['placeholder_id'], 'content': f"benchmark content {iteration}",
+                'api_key': API_KEY}
+    return {'template_id': fixture['document_template'], 'api_key': API_KEY}
+
+
+def summarize(latencies, elapsed, errors):
+    """Percentiles in milliseconds and sequential throughput"""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'calls': len(latencies),
+        'errors': errors,
+        'p50_ms': cuts[49] * 1000,
+        'p95_ms': cuts[94] * 1000,
+        'p99_ms': cuts[98] * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'throughput_per_s': len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def run_calls(call, tool, fixture, iterations, warmup=0):
+    """
+    Call a tool ``warmup`` times untimed, then ``iterations`` times in sequence
+    Returns (latencies, elapsed, errors).
+    """
+    for iteration in range(warmup):
+        await call(tool, tool_arguments(tool, fixture, -1 - iteration))
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        start = time.perf_counter()
+        result = await call(tool, tool_arguments(tool, fixture, iteration))
+        latencies.append(time.perf_counter() - start)
+        if 'error' in result:
+            errors += 1
+    return latencies, time.perf_counter() - started, errors
+
+
+async def bench_in_process(fixtures, iterations, warmup):
+    import mcp_service
+
+    async def call(tool, arguments):
+        return await getattr(mcp_service, tool)(**arguments)
+
+    results = []
+    for size, fixture in fixtures.items():
+        for tool in TOOLS:
+            latencies, elapsed, errors = await run_calls(call, tool, fixture, iterations, warmup)
+            tracemalloc.start()
+            await run_calls(call, tool, fixture, MEMORY_ITERATIONS)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            row = {'transport': 'inprocess', 'tool': tool, 'size': size,
+                   **summarize(latencies, elapsed, errors), 'peak_memory_kb': peak / 1024}
+            results.append(row)
+            print_row(row)
+    return results
+
+
+async def bench_http(database_uri, fixtures, iterations, warmup):
+    """One fresh server per size, so its peak RSS reflects that size only"""
+    from fastmcp import Client
+    from servers import mcp_http_process, peak_rss_kb
+
+    results = []
+    for size, fixture in fixtures.items():
+        with mcp_http_process(database_uri) as (url, process):
+            async with Client(url) as client:
+                async def call(tool, arguments):
+                    return (await client.call_tool(tool, arguments, raise_on_error=False)).data or {'error': True}
+
+                for tool in TOOLS:
+                    latencies, elapsed, errors = await run_calls(call, tool, fixture, iterations, warmup)
+                    # Server-wide high-water mark; it only grows while the server runs
+                    peak = peak_rss_kb(process.pid)
+                    row = {'transport': 'http', 'tool': tool, 'size': size,
+                           **summarize(latencies, elapsed, errors), 'peak_memory_kb': peak}
+                    results.append(row)
+                    print_row(row)
+    return results
+
+
+def print_header():
+    print(f"{'transport':<10}{'tool':<28}{'size':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'calls/s':>9}{'peak KB':>11}{'errors':>7}")
+
+
+def print_row(row):
+    peak = f"{row['peak_memory_kb']:.0f}" if row['peak_memory_kb'] is not None else "n/a"
+    print(f"{row['transport']:<10}{row['tool']:<28}{row['size']:>6}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+          f"{row['p99_ms']:>9.2f}{row['throughput_per_s']:>9.0f}{peak:>11}{row['errors']:>7}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, max_regression):
+    """Print p50/p95 ratios against a baseline file; returns the rows slower than ``max_regression``"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(row['transport'], row['tool'], row['size']): row for row in baseline['results']}
+    print(f"\ncompared with {baseline.get('commit') or baseline_path}")
+    print(f"{'transport':<10}{'tool':<28}{'size':>6}{'p50 x':>8}{'p95 x':>8}")
+    regressions = []
+    for row in results:
+        old = previous.get((row['transport'], row['tool'], row['size']))
+        if old is None:
+            continue
+        p50 = row['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+        p95 = row['p95_ms'] / old['p95_ms'] if old['p95_ms'] else float('inf')
+        flag = ""
+        if max_regression and p50 > max_regression:
+            regressions.append(row)
+            flag = "  REGRESSION"
+        print(f"{row['transport']:<10}{row['tool']:<28}{row['size']:>6}{p50:>8.2f}{p95:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP tool benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="placeholders and prompts per template (default: 10 100 1000 10000)")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per tool and size (default: 50)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed calls per tool and size before measuring (default: 1)")
+    parser.add_argument("--transports", nargs="+", choices=['inprocess', 'http'], default=['inprocess', 'http'],
+                        help="how to call the tools (default: inprocess http)")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/bench_mcp_tools-<commit>.json)")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="with --compare, exit non-zero when a p50 grows by more than this factor")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_tools_")
+    database_uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['DATABASE_URI'] = database_uri
+    fixtures = seed(args.sizes)
+
+    print(f"{args.iterations} sequential calls per tool and size")
+    print_header()
+    results = []
+    if 'inprocess' in args.transports:
+        results += asyncio.run(bench_in_process(fixtures, args.iterations, args.warmup))
+    if 'http' in args.transports:
+        results += asyncio.run(bench_http(database_uri, fixtures, args.iterations, args.warmup))
+
+    commit = git_commit()
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"bench_mcp_tools-{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'sizes': args.sizes,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare and compare(results, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
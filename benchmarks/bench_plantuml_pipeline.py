@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+PlantUML 流水线基准：模拟多个用户多次生成包含相同图表的文档，统计实际渲染次数与耗时
+用法: python benchmarks/bench_plantuml_pipeline.py [--documents 20] [--diagrams 5] [--render-ms 300]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.plantuml_pipeline import DiagramCache, PlantUMLPipeline, StubRenderer
+
+
+class CountingPipeline(PlantUMLPipeline):
+    """Pipeline that counts the renders it actually starts"""
+
+    renders = 0
+
+    def _submit(self, key, source):
+        with self._lock:
+            if key not in self._pending:
+                self.renders += 1
+        return super()._submit(key, source)
+
+
+def build_document(index, diagram_count, shared_ratio):
+    """A document whose diagrams are mostly shared with every other document"""
+    blocks = []
+    for number in range(diagram_count):
+        shared = number < diagram_count * shared_ratio
+        label = f"Shared{number}" if shared else f"Doc{index}_{number}"
+        blocks.append(f"```plantuml\n@startuml\nclass {label} {{\n  id: int\n}}\n{label} --> Template\n@enduml\n```\n")
+    return f"# Document {index}\n\n" + "\n".join(blocks)
+
+
+def run(documents, diagram_count, shared_ratio, render_delay, workers, cached):
+    cache = DiagramCache(tempfile.mkdtemp(prefix="designmaster_diagrams_") if cached else None,
+                         max_memory_entries=256 if cached else 0)
+    pipeline = CountingPipeline(StubRenderer(delay=render_delay), cache, max_workers=workers)
+    # Start the worker processes before timing
+    pipeline.get_output("@startuml\nwarm -> up\n@enduml")
+    pipeline.renders = 0
+    start = time.perf_counter()
+    # Every document is generated twice, as after an edit elsewhere in it
+    for _ in range(2):
+        for index in range(documents):
+            pipeline.process(build_document(index, diagram_count, shared_ratio), wait=True)
+    elapsed = time.perf_counter() - start
+    pipeline.shutdown()
+    return elapsed, pipeline.renders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PlantUML pipeline benchmark")
+    parser.add_argument("--documents", type=int, default=20, help="documents per round (default: 20)")
+    parser.add_argument("--diagrams", type=int, default=5, help="diagrams per document (default: 5)")
+    parser.add_argument("--shared", type=float, default=0.6, help="share of diagrams common to all documents")
+    parser.add_argument("--render-ms", type=float, default=300, help="simulated render time (default: 300)")
+    parser.add_argument("--workers", type=int, default=4, help="render processes (default: 4)")
+    args = parser.parse_args()
+
+    delay = args.render_ms / 1000
+    print(f"{args.documents} documents x {args.diagrams} diagrams, generated twice, "
+          f"{args.render_ms:.0f} ms per render")
+    print(f"{'mode':<28}{'renders':>10}{'seconds':>10}")
+    for label, workers, cached in [
+        ("1 worker, no cache", 1, False),
+        (f"{args.workers} workers, no cache", args.workers, False),
+        (f"{args.workers} workers, hash cache", args.workers, True),
+    ]:
+        elapsed, renders = run(args.documents, args.diagrams, args.shared, delay, workers, cached)
+        print(f"{label:<28}{renders:>10}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+SQLite并发读写压力测试：模拟Web市场页读取与MCP提交写入同时进行
+对比默认配置（回滚日志）与共享数据库配置（WAL + busy_timeout + 连接池）
+用法: python benchmarks/bench_sqlite_concurrency.py [--readers 4] [--writers 4] [--duration 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from models.database import engine_options, install_sqlite_pragmas
+from models.models import db, User, Template, Placeholder
+
+TEMPLATE_COUNT = 50
+PLACEHOLDERS_PER_TEMPLATE = 20
+
+
+def make_engine(uri, mode, role):
+    if mode == 'default':
+        return create_engine(uri)
+    engine = create_engine(uri, **engine_options(role, uri))
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def seed(uri, mode):
+    engine = make_engine(uri, mode, 'script')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': 1, 'username': 'bench', 'email': 'bench@example.com',
+                                     'password_hash': 'x'}])
+        conn.execute(insert(Template), [
+            {'id': t, 'name': f"Template {t}", 'content': "{{a}}\n" * 200, 'description': "bench",
+             'is_public': True, 'user_id': 1}
+            for t in range(1, TEMPLATE_COUNT + 1)
+        ])
+        conn.execute(insert(Placeholder), [
+            {'name': f"p{i}", 'template_id': t, 'content': ''}
+            for t in range(1, TEMPLATE_COUNT + 1) for i in range(PLACEHOLDERS_PER_TEMPLATE)
+        ])
+    engine.dispose()
+
+
+def reader(uri, mode, duration, results):
+    """Template market style reads"""
+    engine = make_engine(uri, mode, 'web')
+    ops, errors, latencies = 0, 0, []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(Template).where(Template.is_public == True)).all()  # noqa: E712
+                template_id = random.randint(1, TEMPLATE_COUNT)
+                conn.execute(select(Placeholder).where(Placeholder.template_id == template_id)).all()
+            ops += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+    results.put(('read', ops, errors, latencies))
+
+
+def writer(uri, mode, duration, results):
+    """submit_placeholder_content style writes, one transaction per submit"""
+    engine = make_engine(uri, mode, 'mcp')
+    ops, errors, latencies = 0, 0, []
+    payload = "generated section content\n" * 50
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                placeholder_id = random.randint(1, TEMPLATE_COUNT * PLACEHOLDERS_PER_TEMPLATE)
+                conn.execute(select(Placeholder.template_id).where(Placeholder.id == placeholder_id)).first()
+                conn.execute(update(Placeholder).where(Placeholder.id == placeholder_id).values(content=payload))
+            ops += 1
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+    results.put(('write', ops, errors, latencies))
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(mode, args):
+    workdir = tempfile.mkdtemp(prefix="designmaster_concurrency_")
+    uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    seed(uri, mode)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    workers = [ctx.Process(target=reader, args=(uri, mode, args.duration, results)) for _ in range(args.readers)]
+    workers += [ctx.Process(target=writer, args=(uri, mode, args.duration, results)) for _ in range(args.writers)]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    summary = {}
+    for kind in ('read', 'write'):
+        rows = [row for row in collected if row[0] == kind]
+        latencies = [latency for row in rows for latency in row[3]]
+        summary[kind] = {
+            'ops_per_sec': sum(row[1] for row in rows) / args.duration,
+            'errors': sum(row[2] for row in rows),
+            'p95_ms': percentile(latencies, 95) * 1000,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrent read/write stress test")
+    parser.add_argument("--readers", type=int, default=4, help="reader processes (default: 4)")
+    parser.add_argument("--writers", type=int, default=4, help="writer processes (default: 4)")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per run (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.duration}s per configuration\n")
+    print(f"{'configuration':<10} {'reads/s':>10} {'read p95':>10} {'writes/s':>10} {'write p95':>10} {'locked errors':>14}")
+    for mode in ('default', 'shared'):
+        summary = run(mode, args)
+        read, write = summary['read'], summary['write']
+        print(f"{mode:<10} {read['ops_per_sec']:>10.0f} {read['p95_ms']:>8.1f}ms "
+              f"{write['ops_per_sec']:>10.0f} {write['p95_ms']:>8.1f}ms {read['errors'] + write['errors']:>14}")
+
+
+if __name__ == "__main__":
+    main()
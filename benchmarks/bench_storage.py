@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+StorageManager保存延迟基准：用户模板数量增长时，单次 save_template 的耗时
+对比旧的整文件读-合并-重写实现与按模板分文件的原子写实现
+用法: python benchmarks/bench_storage.py [--max-templates 5000] [--baseline-max 2000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.storage_manager import StorageManager
+
+TEMPLATE_DATA = {
+    'name': "Web应用设计模板",
+    'description': "适用于Web应用程序的设计文档模板",
+    'content': "# {{project_name}}\n\n## 1. 项目概述\n{{project_overview}}\n" * 20,
+}
+
+
+class LegacyStorageManager:
+    """The previous implementation: every save rewrites the whole user file"""
+
+    def __init__(self, storage_dir):
+        self.storage_dir = storage_dir
+
+    def save_user_data(self, user_id, data):
+        user_file = os.path.join(self.storage_dir, f"user_{user_id}.json")
+        data['last_updated'] = datetime.now().isoformat()
+        if os.path.exists(user_file):
+            with open(user_file, 'r') as f:
+                existing_data = json.load(f)
+            existing_data.update(data)
+            data = existing_data
+        with open(user_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        return user_file
+
+    def load_user_data(self, user_id):
+        user_file = os.path.join(self.storage_dir, f"user_{user_id}.json")
+        if not os.path.exists(user_file):
+            return {}
+        with open(user_file, 'r') as f:
+            return json.load(f)
+
+    def save_template(self, user_id, template_id, template_data):
+        user_data = self.load_user_data(user_id)
+        if 'templates' not in user_data:
+            user_data['templates'] = {}
+        user_data['templates'][template_id] = template_data
+        self.save_user_data(user_id, user_data)
+
+
+def measure(manager, max_templates, checkpoints, samples):
+    """Grow one user's templates and time saves at each checkpoint"""
+    results = {}
+    count = 0
+    for checkpoint in checkpoints:
+        if checkpoint > max_templates:
+            break
+        while count < checkpoint:
+            manager.save_template(1, f"t{count}", TEMPLATE_DATA)
+            count += 1
+        timings = []
+        for i in range(samples):
+            start = time.perf_counter()
+            # Overwrite existing templates so the user's size stays at the checkpoint
+            manager.save_template(1, f"t{i % max(count, 1)}", TEMPLATE_DATA)
+            timings.append(time.perf_counter() - start)
+        results[checkpoint] = sorted(timings)[len(timings) // 2] * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="StorageManager save latency benchmark")
+    parser.add_argument("--max-templates", type=int, default=5000, help="templates per user (default: 5000)")
+    parser.add_argument("--baseline-max", type=int, default=2000,
+                        help="stop the legacy implementation here, it is quadratic (default: 2000)")
+    parser.add_argument("--samples", type=int, default=20, help="timed saves per checkpoint (default: 20)")
+    args = parser.parse_args()
+
+    checkpoints = [1, 10, 100, 500, 1000, 2000, 5000, 10000]
+    workdir = tempfile.mkdtemp(prefix="designmaster_storage_")
+    try:
+        legacy_dir = os.path.join(workdir, 'legacy')
+        os.makedirs(legacy_dir)
+        legacy = measure(LegacyStorageManager(legacy_dir), args.baseline_max, checkpoints, args.samples)
+        current = measure(StorageManager(os.path.join(workdir, 'current')), args.max_templates,
+                          checkpoints, args.samples)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'templates':>10} {'legacy ms':>12} {'current ms':>12}")
+    for checkpoint in checkpoints:
+        if checkpoint not in current:
+            break
+        legacy_ms = f"{legacy[checkpoint]:.3f}" if checkpoint in legacy else "-"
+        print(f"{checkpoint:>10} {legacy_ms:>12} {current[checkpoint]:>12.3f}")
+    print("\nmedian latency of a single save_template call")
+
+
+if __name__ == "__main__":
+    main()
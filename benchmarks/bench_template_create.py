@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+模板创建基准：对比旧的逐行ORM创建方式(先提交模板，再为每个占位符和提示词各添加一个对象，每行触发一次版本更新)
+与 create_template_bulk (从内容中自动识别占位符，批量插入，单个事务)，统计耗时和SQL语句数
+用法: python benchmarks/bench_template_create.py [--sizes 10 100 1000 5000] [--repeat 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def form_fields(placeholder_count):
+    """Content, placeholder lines and prompt lines as the web form submits them"""
+    from synthetic_data import SECTION_FILLER
+
+    names = [f"section_{i}" for i in range(placeholder_count)]
+    content = "# Synthetic Design Document\n" + ''.join(
+        f"\n## {i + 1}. {name}\n{SECTION_FILLER}{{{{{name}}}}}\n" for i, name in enumerate(names))
+    placeholders = '\n'.join(f"{name}:第{i + 1}节" for i, name in enumerate(names))
+    prompts = '\n'.join(f"请填写第{i + 1}节" for i in range(placeholder_count))
+    return content, placeholders, prompts
+
+
+def create_legacy(user_id, name, content, placeholders_data, prompts_data):
+    """The previous create_template route body"""
+    from models.models import db, Template, Placeholder, Prompt
+
+    template = Template(name=name, content=content, description="benchmark template", user_id=user_id,
+                        is_public=False)
+    db.session.add(template)
+    db.session.commit()
+    for placeholder_line in placeholders_data.split('\n'):
+        if ':' in placeholder_line:
+            placeholder_name, desc = placeholder_line.split(':', 1)
+            if placeholder_name.strip():
+                db.session.add(Placeholder(name=placeholder_name.strip(), description=desc.strip(),
+                                           template_id=template.id))
+    for i, prompt_content in enumerate(prompts_data.split('\n')):
+        if prompt_content.strip():
+            db.session.add(Prompt(order=i, content=prompt_content.strip(), template_id=template.id))
+    db.session.commit()
+
+
+def create_bulk(user_id, name, content, placeholders_data, prompts_data):
+    from models.template_import import create_template_bulk, parse_placeholder_lines, parse_prompt_lines
+
+    create_template_bulk(user_id, name, content, "benchmark template", False,
+                         declared=parse_placeholder_lines(placeholders_data),
+                         prompts=parse_prompt_lines(prompts_data))
+
+
+def create_discovered(user_id, name, content, placeholders_data, prompts_data):
+    """Bulk path without declarations: every placeholder comes from the content"""
+    from models.template_import import create_template_bulk, parse_prompt_lines
+
+    create_template_bulk(user_id, name, content, "benchmark template", False,
+                         prompts=parse_prompt_lines(prompts_data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template creation benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000],
+                        help="placeholders (and prompts) per template (default: 10 100 1000 5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="templates created per measurement (default: 3)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_create_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import app as web
+    from models.models import db
+    from synthetic_data import QueryCounter, create_user
+
+    scenarios = [
+        ("per-line ORM (old)", create_legacy),
+        ("bulk, declared", create_bulk),
+        ("bulk, discovered only", create_discovered),
+    ]
+
+    counter = QueryCounter()
+    print(f"median of {args.repeat} templates")
+    print(f"{'placeholders':>12}  {'scenario':<24}{'statements':>11}{'ms':>10}")
+    with web.app.app_context():
+        user_id = create_user("author", "author-key")
+        for size in args.sizes:
+            fields = form_fields(size)
+            for label, create in scenarios:
+                with counter.watch(db.engine):
+                    create(user_id, f"{label} {size}", *fields)
+                statements = counter.count
+                latencies = []
+                for number in range(args.repeat):
+                    start = time.perf_counter()
+                    create(user_id, f"{label} {size} #{number}", *fields)
+                    latencies.append(time.perf_counter() - start)
+                print(f"{size:>12}  {label:<24}{statements:>11}{statistics.median(latencies) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+对比文档渲染性能：旧的逐个 str.replace 循环 vs 编译后的单次拼接渲染
+用法: python benchmarks/bench_template_render.py [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from templates.template_renderer import CompiledTemplate, TemplateCompiler, render_document
+
+SECTION_FILLER = "本节描述系统在该方面的设计考虑、约束条件以及备选方案的取舍。\n" * 4
+
+
+def build_template(placeholder_count):
+    """Build a synthetic template with one section per placeholder"""
+    sections = [f"# Synthetic Design Document\n\n{{{{project_name}}}}\n"]
+    placeholders = [SimpleNamespace(name="project_name", content="Benchmark Project")]
+    for i in range(placeholder_count - 1):
+        name = f"section_{i}"
+        sections.append(f"\n## {i + 1}. Section {i}\n{SECTION_FILLER}\n{{{{{name}}}}}\n")
+        # Leave every tenth placeholder empty to exercise the fallback text
+        content = None if i % 10 == 0 else f"Content for section {i}.\n" * 3
+        placeholders.append(SimpleNamespace(name=name, content=content))
+    return ''.join(sections), placeholders
+
+
+def render_with_replace(content, placeholders):
+    """The original rendering loop, kept here as the baseline"""
+    document_content = content
+    for placeholder in placeholders:
+        placeholder_key = f"{{{{{placeholder.name}}}}}"
+        document_content = document_content.replace(
+            placeholder_key,
+            placeholder.content or f"[{placeholder.name} content not provided]"
+        )
+    return document_content
+
+
+def best_of(repeat, func, *args):
+    """Return the best wall time in milliseconds over ``repeat`` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template rendering benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement (default: 20)")
+    args = parser.parse_args()
+
+    print(f"{'placeholders':>12} {'doc size':>10} {'replace ms':>12} {'compile ms':>12} {'cached ms':>12} {'speedup':>8}")
+    for count in (10, 100, 1000):
+        content, placeholders = build_template(count)
+        expected = render_with_replace(content, placeholders)
+
+        compiler = TemplateCompiler()
+        assert render_document(1, content, placeholders, compiler) == expected
+
+        replace_ms = best_of(args.repeat, render_with_replace, content, placeholders)
+        compile_ms = best_of(args.repeat, CompiledTemplate.compile, content)
+        cached_ms = best_of(args.repeat, render_document, 1, content, placeholders, compiler)
+        print(f"{count:>12} {len(content):>10} {replace_ms:>12.3f} {compile_ms:>12.3f} "
+              f"{cached_ms:>12.3f} {replace_ms / cached_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
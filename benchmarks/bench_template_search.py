@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+模板市场分页与全文检索基准：对比一次性加载全部模板与键集分页、FTS5 检索与 LIKE 扫描
+用法: python benchmarks/bench_template_search.py [--sizes 1000 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from models.database import install_sqlite_pragmas
+from models.migrations import run_migrations
+from models.models import db, Template, User
+from models.template_search import listing_page, search_statement, search_templates
+
+WORDS = ["用户", "订单", "支付", "库存", "网关", "认证", "日志", "缓存", "消息队列", "搜索",
+         "microservice", "gateway", "database", "kubernetes", "observability", "plantuml"]
+
+
+def populate(session, count):
+    """Insert ``count`` public templates with ~4 KB of content each"""
+    rng = random.Random(42)
+    session.execute(insert(User), [{'username': 'publisher', 'email': 'p@example.com', 'password_hash': 'x'}])
+    batch = []
+    for i in range(count):
+        words = rng.sample(WORDS, 6)
+        body = "\n".join(f"## {word}\n" + f"{word} 模块的设计说明与约束。" * 20 for word in words)
+        batch.append({'name': f"{words[0]} {words[1]} 设计模板 {i}", 'description': f"{words[2]} 相关的模板",
+                      'content': body, 'is_public': True, 'user_id': 1})
+        if len(batch) == 1000:
+            session.execute(insert(Template), batch)
+            batch = []
+    if batch:
+        session.execute(insert(Template), batch)
+    session.commit()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template listing and search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="public templates (default: 1000 10000)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement (default: 20)")
+    args = parser.parse_args()
+
+    print(f"{'templates':>10}  {'operation':<36}{'median ms':>10}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix="designmaster_search_")
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        install_sqlite_pragmas(engine)
+        db.metadata.create_all(engine)
+        run_migrations(engine)
+        with Session(engine) as session:
+            populate(session, size)
+            deep_cursor = None
+            for _ in range(min(50, size // 20 - 1)):
+                deep_cursor = listing_page([Template.is_public == True], 20, deep_cursor, session).next_cursor  # noqa: E712
+
+            operations = {
+                "load all public templates (.all())": lambda: session.query(Template).filter_by(is_public=True).all(),
+                "keyset page 1": lambda: listing_page([Template.is_public == True], 20, None, session),  # noqa: E712
+                "keyset page 50": lambda: listing_page([Template.is_public == True], 20, deep_cursor, session),  # noqa: E712
+                "FTS search '消息队列 plantuml'": lambda: search_templates(1, "消息队列 plantuml", 20, None, session),
+                "LIKE scan '消息队列 plantuml'": lambda: session.execute(
+                    search_statement(1, "消息队列 plantuml", 20, use_fts=False)).all(),
+            }
+            for label, operation in operations.items():
+                session.expunge_all()
+                print(f"{size:>10}  {label:<36}{timed(operation, args.repeat):>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+多进程模式负载测试：用 start_all_services.py --workers N 启动N个Web和N个MCP HTTP工作进程，
+由多个客户端进程同时请求模板市场页面和 get_next_step 工具，观察吞吐量随工作进程数的变化
+(吞吐量的上限是CPU核数，客户端与服务运行在同一台机器上)
+用法: python benchmarks/bench_workers.py [--workers 1 2 4] [--clients 8] [--duration 5]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_KEY = "workers-key"
+
+
+def request(base_url, method, path, body=None, headers=None):
+    """One request on a new connection, so that SO_REUSEPORT can pick any worker"""
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=30)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def web_call(base_url, cookie):
+    status, _ = request(base_url, 'GET', '/templates/market',
+                        headers={'Cookie': f'session={cookie}', 'Accept-Encoding': 'identity'})
+    return status == 200
+
+
+def mcp_call(base_url, template_id):
+    body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call', 'params': {
+        'name': 'get_next_step', 'arguments': {'template_id': template_id, 'api_key': API_KEY}}})
+    status, payload = request(base_url, 'POST', '/mcp', body=body, headers={
+        'Content-Type': 'application/json', 'Accept': 'application/json, text/event-stream'})
+    if status != 200:
+        return False
+    # Stateless streamable HTTP answers with a single server-sent event
+    for line in payload.decode().splitlines():
+        if line.startswith('data: '):
+            result = json.loads(line[len('data: '):]).get('result', {})
+            return 'error' not in result.get('structuredContent', {'error': None})
+    return False
+
+
+def client_worker(kind, base_url, argument, duration, start_at, results):
+    """One client issuing requests back to back until the deadline"""
+    call = web_call if kind == 'web' else mcp_call
+    calls, errors, latencies = 0, 0, []
+    time.sleep(max(0, start_at - time.time()))
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = call(base_url, argument)
+        except OSError:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        calls += 1
+        if not ok:
+            errors += 1
+    results.put((calls, errors, latencies))
+
+
+def run_load(ctx, kind, base_url, argument, clients, duration):
+    """(calls/s, p50 ms, errors) of ``clients`` concurrent client processes"""
+    results = ctx.Queue()
+    start_at = time.time() + 2
+    processes = [ctx.Process(target=client_worker, args=(kind, base_url, argument, duration, start_at, results))
+                 for _ in range(clients)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    calls = sum(row[0] for row in collected)
+    errors = sum(row[1] for row in collected)
+    latencies = sorted(latency for row in collected for latency in row[2])
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    return calls / duration, p50, errors
+
+
+def wait_for_workers(base_url, workers, timeout=90):
+    """Poll /healthz until ``workers`` distinct processes have answered on the shared port"""
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while len(seen) < workers and time.monotonic() < deadline:
+        try:
+            status, payload = request(base_url, 'GET', '/healthz')
+            if status == 200:
+                seen.add(json.loads(payload)['pid'])
+        except OSError:
+            pass
+        time.sleep(0.05)
+    return len(seen)
+
+
+def seed(public_templates, placeholder_count):
+    """Create the database; return (template id, signed session cookie of its owner)"""
+    import app as web
+    from synthetic_data import create_user, create_template
+
+    with web.app.app_context():
+        user_id = create_user("workers", API_KEY)
+        for _ in range(public_templates):
+            create_template(user_id, placeholder_count, is_public=True)
+        template_id = create_template(user_id, placeholder_count, prompt_count=1, completed=True)
+    serializer = web.app.session_interface.get_signing_serializer(web.app)
+    return template_id, serializer.dumps({'user_id': user_id, 'username': "workers"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker throughput benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="worker counts to compare (default: 1 2 4)")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes (default: 8)")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per run (default: 5)")
+    parser.add_argument("--public-templates", type=int, default=50,
+                        help="templates on the market page (default: 50)")
+    parser.add_argument("--placeholders", type=int, default=20, help="placeholders per template (default: 20)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_workers_")
+    database_uri = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['DATABASE_URI'] = database_uri
+    template_id, cookie = seed(args.public_templates, args.placeholders)
+
+    from servers import supervised_services
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>8} {'web req/s':>10} {'web p50 ms':>11} {'mcp calls/s':>12} {'mcp p50 ms':>11} {'errors':>7}")
+    for workers in args.workers:
+        with supervised_services(database_uri, workers) as (web_url, mcp_url):
+            if wait_for_workers(web_url, workers) < workers or wait_for_workers(mcp_url, workers) < workers:
+                print(f"{workers:>8}  not every worker answered on the shared ports")
+                continue
+            web_rate, web_p50, web_errors = run_load(ctx, 'web', web_url, cookie, args.clients, args.duration)
+            mcp_rate, mcp_p50, mcp_errors = run_load(ctx, 'mcp', mcp_url, template_id, args.clients, args.duration)
+        print(f"{workers:>8} {web_rate:>10.0f} {web_p50:>11.1f} {mcp_rate:>12.0f} {mcp_p50:>11.1f} "
+              f"{web_errors + mcp_errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
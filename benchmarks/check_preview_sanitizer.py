@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+断言Markdown预览的清理器不会输出可执行的链接或脚本：对已知的XSS写法(含HTML字符引用编码的协议)逐一渲染，
+检查每个href/src按浏览器的方式解码后都不是 javascript:/data:/vbscript: 等协议，且不含原始HTML和事件属性
+用法: python benchmarks/check_preview_sanitizer.py
+"""
+
+import html
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAYLOADS = [
+    '<script>alert(1)</script>',
+    '<img src=x onerror=alert(1)>',
+    '[x](javascript:alert(1))',
+    '[x](data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==)',
+    '[x](<java script:alert(1)>)',
+    '[x](java\tscript:alert(1))',
+    '[x](/a){: onclick="alert(1)"}',
+    '[x](&#106;avascript:alert(1))',
+    '[x](javascript&colon;alert(document.cookie))',
+    '[x](javascript&#58;alert(1))',
+    '[x](&#x6A;avascript&#x3A;alert(1))',
+    '![i](&#106;avascript:alert(1))',
+]
+
+# Links that must come through unchanged
+KEPT = {
+    '[ok](/a?b=1&c=2)': '/a?b=1&amp;c=2',
+    '[ok](https://example.com/)': 'https://example.com/',
+}
+
+URL_VALUE = re.compile(r'\b(?:href|src)="([^"]*)"')
+RAW_HTML = re.compile(r'<script|<[^>]*\son\w+=', re.IGNORECASE)
+UNSAFE_SCHEME = re.compile(r'^(?:javascript|data|vbscript):', re.IGNORECASE)
+
+
+def main():
+    from templates.markdown_preview import create_converter
+
+    converter = create_converter()
+    failures = []
+    for payload in PAYLOADS:
+        output = converter.reset().convert(payload)
+        if RAW_HTML.search(output):
+            failures.append((payload, output))
+            continue
+        for value in URL_VALUE.findall(output):
+            if UNSAFE_SCHEME.match(re.sub(r'[\x00-\x20]+', '', html.unescape(value))):
+                failures.append((payload, output))
+                break
+    for source, expected in KEPT.items():
+        output = converter.reset().convert(source)
+        if f'href="{expected}"' not in output:
+            failures.append((source, output))
+
+    for source, output in failures:
+        print(f"FAIL: {source!r} -> {output}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: {len(PAYLOADS)} payloads neutralised, {len(KEPT)} safe links kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+断言每个MCP工具的SQL往返次数不随模板规模增长
+用法: python benchmarks/check_query_counts.py [--sizes 10 100 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+API_KEY = "query-count-key"
+
+# Upper bounds on statements per call with a warm authentication cache
+EXPECTED_MAX = {
+    'start_document_generation': 0,
+    'get_next_step': 1,
+    'submit_placeholder_content': 3,
+    'submit_placeholder_contents': 3,
+    # One query on a rendered-document cache hit, two on a splice, three on a miss
+    'generate_complete_document': 3,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP tool query-count harness")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="placeholders/prompts per template (default: 10 100 1000)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="designmaster_qc_")
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    import mcp_service
+    from mcp_tools.auth_cache import auth_cache
+    from models.models import db, Placeholder, Prompt
+    from synthetic_data import QueryCounter, create_user, create_template, seed_app
+
+    fixtures_app = seed_app()
+
+    with fixtures_app.app_context():
+        db.create_all()
+        user_id = create_user("query_counter", API_KEY)
+        templates = {size: create_template(user_id, size) for size in args.sizes}
+        placeholder_ids = {
+            size: [row[0] for row in db.session.query(Placeholder.id).filter_by(template_id=template_id)]
+            for size, template_id in templates.items()
+        }
+
+    def mark_prompts_completed(template_id):
+        with fixtures_app.app_context():
+            Prompt.query.filter_by(template_id=template_id).update({'completed': True})
+            db.session.commit()
+
+    # The tools are coroutines; each call runs to completion on a fresh loop
+    calls = {
+        'start_document_generation': lambda size: asyncio.run(
+            mcp_service.start_document_generation("/tmp/project", API_KEY)),
+        'get_next_step': lambda size: asyncio.run(mcp_service.get_next_step(templates[size], API_KEY)),
+        'submit_placeholder_content': lambda size: asyncio.run(mcp_service.submit_placeholder_content(
+            placeholder_ids[size][0], "benchmark content", API_KEY)),
+        # Batch submissions cover the whole template, up to the batch limit
+        'submit_placeholder_contents': lambda size: asyncio.run(mcp_service.submit_placeholder_contents(
+            [{'placeholder_id': placeholder_id, 'content': "batch content"}
+             for placeholder_id in placeholder_ids[size][:mcp_service.MAX_BATCH_SIZE]], API_KEY)),
+        'generate_complete_document': lambda size: asyncio.run(
+            mcp_service.generate_complete_document(templates[size], API_KEY)),
+    }
+
+    counter = QueryCounter()
+    results = {}
+    failures = []
+    for tool, call in calls.items():
+        results[tool] = {}
+        for size in args.sizes:
+            if tool == 'generate_complete_document':
+                mark_prompts_completed(templates[size])
+
+            auth_cache.invalidate()
+            with counter.watch(mcp_service.engine):
+                response = call(size)
+            cold = counter.count
+
+            with counter.watch(mcp_service.engine):
+                response = call(size)
+            warm = counter.count
+
+            if 'error' in response:
+                failures.append(f"{tool} (size {size}) returned an error: {response['error']}")
+            results[tool][size] = (cold, warm)
+
+    print(f"{'tool':<30}" + ''.join(f"{size:>14}" for size in args.sizes) + "   (cold/warm auth cache)")
+    for tool, counts in results.items():
+        print(f"{tool:<30}" + ''.join(f"{f'{c}/{w}':>14}" for c, w in counts.values()))
+        warm_counts = {w for _, w in counts.values()}
+        cold_counts = {c for c, _ in counts.values()}
+        if len(warm_counts) != 1 or len(cold_counts) != 1:
+            failures.append(f"{tool}: statement count depends on template size {counts}")
+        if max(warm_counts) > EXPECTED_MAX[tool]:
+            failures.append(f"{tool}: {max(warm_counts)} statements, expected at most {EXPECTED_MAX[tool]}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nOK: statement counts are constant across template sizes")
+
+
+if __name__ == "__main__":
+    main()
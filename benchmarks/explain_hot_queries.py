@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+对热点查询执行 EXPLAIN QUERY PLAN，检查每条查询都使用了索引
+用法: python benchmarks/explain_hot_queries.py [--database-uri sqlite:///app.db]
+"""
+
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import sqlite
+
+from models.database import get_database_uri
+from models.migrations import LATEST_VERSION, get_schema_version
+from models.models import Template, Prompt, User
+from models.data_access import (
+    next_step_statement, document_source_statement,
+    placeholder_values_statement, changed_placeholder_values_statement, placeholder_owner_statement,
+    listing_fingerprint_statement, template_stamp_statement
+)
+
+# A plain "SCAN table" step without an index reads every row of the table
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+
+def hot_queries():
+    """The statements issued on the MCP tool and template market hot paths"""
+    return {
+        'auth: user by api key': select(User.id).where(User.auth_token == 'key'),
+        'get_next_step': next_step_statement(1),
+        'generate: template + incomplete count': document_source_statement(1),
+        'generate: placeholder values': placeholder_values_statement(1),
+        'generate: changed placeholder values': changed_placeholder_values_statement(1, 0),
+        'submit: placeholder owner': placeholder_owner_statement(1),
+        'market: public templates': select(Template.id).where(Template.is_public == True),  # noqa: E712
+        'market: user templates': select(Template.id).where(Template.user_id == 1),
+        'market: public page (keyset)': select(Template.id).where(Template.is_public == True, Template.id < 1000)  # noqa: E712
+                                        .order_by(Template.id.desc()).limit(21),
+        'market: user page (keyset)': select(Template.id).where(Template.user_id == 1, Template.id < 1000)
+                                      .order_by(Template.id.desc()).limit(21),
+        'market: public ETag fingerprint': listing_fingerprint_statement(Template.is_public == True),  # noqa: E712
+        'market: user ETag fingerprint': listing_fingerprint_statement(Template.user_id == 1),
+        'view_template: ETag stamp': template_stamp_statement(1),
+        'view_template: prompts in order': select(Prompt.id).where(Prompt.template_id == 1).order_by(Prompt.order),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN report for hot queries")
+    parser.add_argument("--database-uri", default=get_database_uri(),
+        help="database to inspect (default: app.db)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_uri)
+    failures = []
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+        if version < LATEST_VERSION:
+            sys.exit(f"The database schema is at version {version}, the queries need version {LATEST_VERSION}.\n"
+                     "Run `python migrate_db.py` first.")
+        for name, stmt in hot_queries().items():
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}))
+            plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            problems = [step for step in plan if FULL_SCAN.match(step) or TEMP_SORT.search(step)]
+            status = "FAIL" if problems else "ok"
+            print(f"[{status:>4}] {name}")
+            for step in plan:
+                print(f"         {step}")
+            if problems:
+                failures.append(name)
+
+    if failures:
+        print(f"\n{len(failures)} hot queries do not use an index: {', '.join(failures)}")
+        print("Run `python migrate_db.py` to add the missing indexes.")
+        sys.exit(1)
+    print("\nOK: every hot query uses an index")
+
+
+if __name__ == "__main__":
+    main()
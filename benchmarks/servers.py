@@ -0,0 +1,99 @@
+# Helpers for running services as subprocesses in benchmarks
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    """Ask the OS for an unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, host='127.0.0.1', timeout=30):
+    """Block until something accepts connections on the port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Nothing listening on {host}:{port} after {timeout}s")
+
+
+def peak_rss_kb(pid):
+    """Peak resident set size of a process in KB (Linux only; None elsewhere)"""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def mcp_http_server(database_uri, port=None, extra_env=None):
+    """Run mcp_service.py with the HTTP transport and yield its /mcp URL"""
+    with mcp_http_process(database_uri, port, extra_env) as (url, _):
+        yield url
+
+
+@contextmanager
+def mcp_http_process(database_uri, port=None, extra_env=None):
+    """Run mcp_service.py with the HTTP transport and yield (its /mcp URL, the Popen)"""
+    port = port or free_port()
+    env = os.environ.copy()
+    env['DATABASE_URI'] = database_uri
+    env.update(extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'mcp_service.py'), '--http', '--host', '127.0.0.1', '--port', str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        yield f"http://127.0.0.1:{port}/mcp", process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextmanager
+def supervised_services(database_uri, workers, web_port=None, mcp_port=None, extra_env=None):
+    """Run start_all_services.py with N web and N MCP HTTP workers and yield (web URL, MCP URL)"""
+    web_port = web_port or free_port()
+    mcp_port = mcp_port or free_port()
+    env = os.environ.copy()
+    env['DATABASE_URI'] = database_uri
+    env.update(extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'start_all_services.py'), '--workers', str(workers),
+         '--mcp-transport', 'http', '--mcp-host', '127.0.0.1', '--mcp-port', str(mcp_port),
+         '--web-host', '127.0.0.1', '--web-port', str(web_port),
+         '--quiet', '--log-dir', tempfile.mkdtemp(prefix='designmaster_logs_')],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(web_port, timeout=90)
+        wait_for_port(mcp_port, timeout=90)
+        yield f"http://127.0.0.1:{web_port}", f"http://127.0.0.1:{mcp_port}"
+    finally:
+        # SIGTERM makes the supervisor stop its workers
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
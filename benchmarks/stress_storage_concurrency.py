@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+StorageManager多进程压力测试：N个进程同时写入同一个用户，验证没有任何写入丢失
+用法: python benchmarks/stress_storage_concurrency.py [--processes 8] [--writes 200] [--legacy]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.storage_manager import StorageManager
+
+USER_ID = 1
+
+
+def make_manager(storage_dir, legacy):
+    if legacy:
+        from bench_storage import LegacyStorageManager
+        return LegacyStorageManager(storage_dir)
+    return StorageManager(storage_dir)
+
+
+def hammer(storage_dir, legacy, worker, writes, start_at):
+    """Interleave profile merges and template saves for one user"""
+    manager = make_manager(storage_dir, legacy)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    for i in range(writes):
+        manager.save_user_data(USER_ID, {f"worker_{worker}_key_{i}": i})
+        manager.save_template(USER_ID, f"worker_{worker}_template_{i}", {'worker': worker, 'index': i})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process StorageManager stress test")
+    parser.add_argument("--processes", type=int, default=8, help="writer processes (default: 8)")
+    parser.add_argument("--writes", type=int, default=200, help="saves of each kind per process (default: 200)")
+    parser.add_argument("--legacy", action="store_true",
+                        help="run against the old whole-file implementation to show lost writes")
+    args = parser.parse_args()
+
+    storage_dir = tempfile.mkdtemp(prefix="designmaster_storage_stress_")
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        start_at = time.time() + 2
+        workers = [ctx.Process(target=hammer, args=(storage_dir, args.legacy, worker, args.writes, start_at))
+                   for worker in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - start_at
+        failed_workers = [worker.exitcode for worker in workers if worker.exitcode != 0]
+
+        data = make_manager(storage_dir, args.legacy).load_user_data(USER_ID)
+        templates = data.get('templates', {})
+        expected_keys = {f"worker_{w}_key_{i}" for w in range(args.processes) for i in range(args.writes)}
+        expected_templates = {f"worker_{w}_template_{i}" for w in range(args.processes) for i in range(args.writes)}
+        lost_keys = expected_keys - set(data)
+        lost_templates = expected_templates - set(templates)
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+    total = 2 * args.processes * args.writes
+    print(f"{args.processes} processes x {args.writes} saves of each kind "
+          f"({'legacy' if args.legacy else 'current'} implementation)")
+    print(f"  throughput:      {total / elapsed:.0f} saves/s")
+    print(f"  lost user keys:  {len(lost_keys)} of {len(expected_keys)}")
+    print(f"  lost templates:  {len(lost_templates)} of {len(expected_templates)}")
+    if failed_workers:
+        print(f"  crashed workers: {len(failed_workers)}")
+
+    if lost_keys or lost_templates or failed_workers:
+        print("FAILED: concurrent saves were lost")
+        sys.exit(1)
+    print("OK: every concurrent save was preserved")
+
+
+if __name__ == "__main__":
+    main()
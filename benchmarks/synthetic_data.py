@@ -0,0 +1,78 @@
+# Synthetic data helpers shared by the benchmark scripts
+
+from contextlib import contextmanager
+
+from sqlalchemy import event, insert
+
+from models.models import db, User, Template, Placeholder, Prompt
+
+SECTION_FILLER = "本节描述系统在该方面的设计考虑、约束条件以及备选方案的取舍。\n"
+
+
+def seed_app():
+    """A Flask app on the shared database for building fixtures; the MCP backend runs without one"""
+    from flask import Flask
+    from models.database import init_database
+
+    app = Flask('synthetic_data')
+    init_database(app, role='script')
+    return app
+
+
+def create_user(username, auth_token):
+    """Create a user with a known API key and return its id"""
+    user = User(username=username, email=f"{username}@example.com",
+                password_hash="x", auth_token=auth_token)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def create_template(user_id, placeholder_count, prompt_count=None, is_public=False, completed=False):
+    """
+    Create a template with ``placeholder_count`` sections and as many prompts
+    Placeholders and prompts are inserted with executemany so that building
+    large templates stays fast. Returns the template id.
+    """
+    prompt_count = placeholder_count if prompt_count is None else prompt_count
+    names = [f"section_{i}" for i in range(placeholder_count)]
+    content = "# Synthetic Design Document\n" + ''.join(
+        f"\n## {i + 1}. {name}\n{SECTION_FILLER}{{{{{name}}}}}\n" for i, name in enumerate(names)
+    )
+    template = Template(name=f"Synthetic {placeholder_count}", content=content,
+                        description="benchmark template", user_id=user_id, is_public=is_public)
+    db.session.add(template)
+    db.session.flush()
+    if names:
+        db.session.execute(insert(Placeholder), [
+            {'name': name, 'description': name, 'template_id': template.id} for name in names
+        ])
+    if prompt_count:
+        db.session.execute(insert(Prompt), [
+            {'order': i, 'content': f"Step {i}", 'template_id': template.id, 'completed': completed}
+            for i in range(prompt_count)
+        ])
+    db.session.commit()
+    return template.id
+
+
+class QueryCounter:
+    """Count SQL statements issued through an engine"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    @contextmanager
+    def watch(self, engine):
+        self.count = 0
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        try:
+            yield self
+        finally:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
@@ -5,193 +5,130 @@
 """
 
 from fastmcp import FastMCP
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 import os
 import sys
 import asyncio
+from typing import Optional
 
 # Create an MCP server
 mcp = FastMCP("DesignMaster")
 
-# Initialize Flask app for database access
-app = Flask(__name__)
+# Only what answering initialize and tools/list needs is imported here. The
+# database side (SQLAlchemy, the models) lives in
+# mcp_tools.service_backend and is imported on the first tool call, so that
+# IDEs spawning an STDIO server per session get the tool list quickly.
+from mcp_tools.db_executor import db_executor
+from monitoring.instrumentation import instrument_tool, metrics_endpoint
+from workers.serving import health_socket, listen_socket
 
-# Configure database (same as main app)
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "app.db")}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+mcp.custom_route('/metrics', methods=['GET'])(metrics_endpoint)
 
-# Initialize database
-db = SQLAlchemy(app)
+@mcp.custom_route('/healthz', methods=['GET'])
+async def healthz(request):
+    """Liveness check used by the worker supervisor of start_all_services.py"""
+    from starlette.responses import JSONResponse
+    return JSONResponse({'status': 'ok', 'pid': os.getpid()})
 
-# Import models after db initialization
-from models.models import User, Template, Placeholder, Prompt
+def run_backend(name: str, *args):
+    """Call a blocking tool implementation, importing the backend on first use"""
+    from mcp_tools import service_backend
+    return getattr(service_backend, name)(*args)
 
-def get_user_by_api_key(api_key: str):
-    """根据API Key获取用户信息"""
+def __getattr__(name):
+    # Backend names (engine, Session, document_cache, MAX_BATCH_SIZE, ...) stay reachable
+    # as attributes of this module
+    if name.startswith('__'):
+        raise AttributeError(name)
+    from mcp_tools import service_backend
     try:
-        with app.app_context():
-            if not api_key:
-                return None
-            user = User.query.filter_by(auth_token=api_key).first()
-            return user
-    except Exception as e:
-        print(f"Error getting user by API key: {e}")
-        return None
+        return getattr(service_backend, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
 # Add tools for design document generation
+# Tools are async so that database work never blocks the event loop shared by
+# every connected client; the blocking part runs on a bounded thread pool.
 @mcp.tool()
-def start_document_generation(project_root_path: str, api_key: str) -> dict:
+@instrument_tool
+async def start_document_generation(project_root_path: str, api_key: str) -> dict:
     """Start generating a design document"""
-    try:
-        with app.app_context():
-            # Validate inputs
-            if not project_root_path or not api_key:
-                return {'error': 'Missing required parameters'}
-            
-            # Check if user exists by API key
-            user = get_user_by_api_key(api_key)
-            if not user:
-                return {'error': 'Invalid API key'}
-            
-            # Here you would implement the logic to start document generation
-            # For now, we'll just return a success message
-            return {
-                'message': 'Document generation started successfully',
-                'project_root_path': project_root_path,
-                'user_id': user.id
-            }
-    except Exception as e:
-        return {'error': str(e)}
+    return await db_executor.run(run_backend, '_start_document_generation', project_root_path, api_key)
 
 @mcp.tool()
-def get_next_step(template_id: int, api_key: str) -> dict:
+@instrument_tool
+async def get_next_step(template_id: int, api_key: str) -> dict:
     """Get the next prompt in the sequence"""
-    try:
-        with app.app_context():
-            if not template_id or not api_key:
-                return {'error': 'Missing required parameters'}
-            
-            # Check if user exists by API key
-            user = get_user_by_api_key(api_key)
-            if not user:
-                return {'error': 'Invalid API key'}
-            
-            # Check if template belongs to user or is public
-            template = Template.query.get(template_id)
-            if not template:
-                return {'error': 'Template not found'}
-            
-            if template.user_id != user.id and not template.is_public:
-                return {'error': 'Access denied to private template'}
-            
-            # Find the next incomplete prompt
-            next_prompt = Prompt.query.filter_by(
-                template_id=template_id, 
-                completed=False
-            ).order_by(Prompt.order).first()
-            
-            if not next_prompt:
-                return {'message': 'No more steps available'}
-            
-            return {
-                'prompt_id': next_prompt.id,
-                'content': next_prompt.content,
-                'order': next_prompt.order
-            }
-    except Exception as e:
-        return {'error': str(e)}
+    return await db_executor.run(run_backend, '_get_next_step', template_id, api_key)
 
 @mcp.tool()
-def submit_placeholder_content(placeholder_id: int, content: str, api_key: str) -> dict:
-    """Submit content for placeholders"""
-    try:
-        with app.app_context():
-            if not placeholder_id or content is None or not api_key:
-                return {'error': 'Missing required parameters'}
-            
-            # Check if user exists by API key
-            user = get_user_by_api_key(api_key)
-            if not user:
-                return {'error': 'Invalid API key'}
-            
-            # Find the placeholder
-            placeholder = Placeholder.query.get(placeholder_id)
-            if not placeholder:
-                return {'error': 'Placeholder not found'}
-            
-            # Check if placeholder belongs to user's template
-            template = Template.query.get(placeholder.template_id)
-            if template.user_id != user.id:
-                return {'error': 'Access denied to this placeholder'}
-            
-            # Update the placeholder content
-            placeholder.content = content
-            db.session.commit()
-            
-            return {
-                'message': 'Content submitted successfully',
-                'placeholder_id': placeholder_id
-            }
-    except Exception as e:
-        return {'error': str(e)}
+@instrument_tool
+async def submit_placeholder_content(placeholder_id: int, content: str, api_key: str) -> dict:
+    """Submit content for placeholders
+
+    PlantUML diagrams in the content are syntax-checked; the result lists
+    each diagram's status and errors under "diagrams" so they can be fixed
+    and resubmitted. Content is stored even when a diagram has errors.
+    """
+    return await db_executor.run(run_backend, '_submit_placeholder_content', placeholder_id, content, api_key)
 
 @mcp.tool()
-def generate_complete_document(template_id: int, api_key: str) -> dict:
-    """Generate the complete design document"""
-    try:
-        with app.app_context():
-            if not template_id or not api_key:
-                return {'error': 'Missing required parameters'}
-            
-            # Check if user exists by API key
-            user = get_user_by_api_key(api_key)
-            if not user:
-                return {'error': 'Invalid API key'}
-            
-            # Check if template belongs to user or is public
-            template = Template.query.get(template_id)
-            if not template:
-                return {'error': 'Template not found'}
-            
-            if template.user_id != user.id and not template.is_public:
-                return {'error': 'Access denied to private template'}
-            
-            # Check if all prompts are completed
-            incomplete_prompts = Prompt.query.filter_by(
-                template_id=template_id, 
-                completed=False
-            ).count()
-            
-            if incomplete_prompts > 0:
-                return {
-                    'error': 'Not all steps are completed',
-                    'incomplete_steps': incomplete_prompts
-                }
-            
-            # Get all placeholders for this template
-            placeholders = Placeholder.query.filter_by(template_id=template_id).all()
-            
-            # Generate the document by replacing placeholders
-            document_content = template.content
-            for placeholder in placeholders:
-                placeholder_key = f"{{{{{placeholder.name}}}}}"
-                document_content = document_content.replace(
-                    placeholder_key, 
-                    placeholder.content or f"[{placeholder.name} content not provided]"
-                )
-            
-            return {
-                'message': 'Document generated successfully',
-                'document_content': document_content
-            }
-    except Exception as e:
-        return {'error': str(e)}
+@instrument_tool
+async def submit_placeholder_contents(items: list[dict], api_key: str) -> dict:
+    """Submit content for many placeholders in one call
+
+    Each item is {"placeholder_id": int, "content": str}. Ownership of all
+    placeholders is checked with one query and every valid item is written in
+    a single transaction; per-item results are returned in input order.
+    """
+    return await db_executor.run(run_backend, '_submit_placeholder_contents', items, api_key)
+
+@mcp.tool()
+@instrument_tool
+async def generate_complete_document(template_id: int, api_key: str, since_version: Optional[int] = None) -> dict:
+    """Generate the complete design document
+
+    The result carries the document's ``version``. Pass a version received
+    earlier as ``since_version`` to get a ``patch`` instead of the full
+    ``document_content`` when possible: a list of {"offset", "length", "text"}
+    edits against that version, with character offsets into the old document
+    in ascending order (apply them from last to first). An empty patch means
+    nothing changed; the full document is returned when no patch is available.
+    """
+    return await db_executor.run(run_backend, '_generate_complete_document', template_id, api_key, since_version)
+
+@mcp.tool()
+@instrument_tool
+async def search_templates(query: str, api_key: str, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """Search public templates and your own by name, description and content
+
+    Every whitespace-separated term must match (substring match, so Chinese
+    text works without spaces). Results are ranked by relevance; an empty
+    query lists templates newest first. Pass "next_cursor" from a result as
+    ``cursor`` to get the next page; it is null on the last page.
+    """
+    return await db_executor.run(run_backend, '_search_templates', query, api_key, limit, cursor)
+
+@mcp.tool()
+@instrument_tool
+async def create_template(name: str, content: str, api_key: str, description: str = '',
+                          placeholders: Optional[list[dict]] = None, prompts: Optional[list[str]] = None,
+                          is_public: bool = False) -> dict:
+    """Create a template with its placeholders and prompts
+
+    Placeholders written as {{name}} in the content are found automatically.
+    ``placeholders`` is optional; each item is {"name": str, "description":
+    str, "example": str} and adds a description to a placeholder of the
+    content, or a placeholder the content does not use. The result lists
+    "undeclared_placeholders" (found but not declared) and
+    "unused_placeholders" (declared but not in the content). Prompts are the
+    steps in order.
+    """
+    return await db_executor.run(run_backend, '_create_template', name, content, api_key, description,
+                                 placeholders, prompts, is_public)
 
 if __name__ == "__main__":
     # Check command line arguments for transport mode
-    transport_mode = "http"  # default mode
+    transport_mode = "stdio"  # default mode, as documented in the README
     host = "127.0.0.1"
     port = 8000
     
@@ -210,16 +147,29 @@ if __name__ == "__main__":
         elif arg == "--port" and i + 1 < len(sys.argv):
             port = int(sys.argv[i + 1])
     
+    # Network transports load the database backend and open its connections up
+    # front so that the first requests do not pay for it; STDIO sessions load
+    # it on the first tool call unless MCP_PRELOAD is set
+    if transport_mode != "stdio" or os.environ.get('MCP_PRELOAD', '').lower() in ('1', 'true', 'yes', 'on'):
+        from mcp_tools import service_backend
+        service_backend.warm_up()
+    
     # Run the MCP server with specified transport mode
-    if transport_mode == "sse":
-        print(f"Running MCP server with SSE transport on {host}:{port}")
-        asyncio.run(mcp.run_sse_async(host=host, port=port))
-    elif transport_mode == "http":
-        print(f"Running MCP server with HTTP transport on {host}:{port}")
-        asyncio.run(mcp.run_http_async(host=host, port=port))
-    elif transport_mode == "streamable-http":
-        print(f"Running MCP server with StreamableHTTP transport on {host}:{port}")
-        asyncio.run(mcp.run_streamable_http_async(host=host, port=port))
+    if transport_mode == "stdio":
+        # stdout carries the protocol in STDIO mode
+        print("Running MCP server with STDIO transport", file=sys.stderr)
+        # The banner is only useful on a terminal and costs a rich import at startup
+        mcp.run(show_banner=False)
     else:
-        print("Running MCP server with STDIO transport")
-        mcp.run()
\ No newline at end of file
+        # Workers started by start_all_services.py --workers share the port through
+        # SO_REUSEPORT. Their sessions cannot be pinned to one process, so the
+        # HTTP transports run stateless there; every tool call carries its api_key.
+        reuse_port = "--reuse-port" in sys.argv
+        sockets = None
+        health = health_socket()
+        if reuse_port or health is not None:
+            sockets = [listen_socket(host, port, reuse_port)] + ([health] if health is not None else [])
+        print(f"Running MCP server with {transport_mode} transport on {host}:{port}")
+        # Supervised workers skip the banner, which would be repeated for every one of them
+        asyncio.run(mcp.run_http_async(transport=transport_mode, host=host, port=port, sockets=sockets,
+                                       stateless_http=True if reuse_port else None, show_banner=health is None))
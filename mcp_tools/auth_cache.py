@@ -0,0 +1,132 @@
+# API Key Authentication Cache
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Lightweight snapshot of the authenticated user. ORM instances are bound to
+# the session that loaded them, so they must not outlive a tool call.
+AuthenticatedUser = namedtuple('AuthenticatedUser', ['id', 'username'])
+
+basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_STAMP_PATH = os.path.join(basedir, '.auth_cache_stamp')
+
+
+class AuthCache:
+    """
+    Bounded TTL/LRU cache mapping API keys to users
+    The web app and the MCP service run in separate processes, so
+    invalidation is propagated through a stamp file: every invalidation
+    replaces the file, and each process drops its cache as soon as it
+    notices the stamp changed.
+    """
+
+    def __init__(self, ttl=60, negative_ttl=5, max_entries=1024, stamp_path=DEFAULT_STAMP_PATH):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.stamp_path = stamp_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = self._read_stamp()
+        # Incremented by every invalidation, local or noticed through the stamp
+        self._generation = 0
+
+    def _read_stamp(self):
+        try:
+            stat = os.stat(self.stamp_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _check_stamp(self):
+        stamp = self._read_stamp()
+        if stamp != self._stamp:
+            self._entries.clear()
+            self._stamp = stamp
+            self._generation += 1
+
+    def get_user(self, api_key, loader):
+        """
+        Return the cached user for an API key
+        ``loader(api_key)`` is called on a miss and must return an
+        AuthenticatedUser or None. Unknown keys are cached for
+        ``negative_ttl`` seconds so that bad keys cannot hammer the database.
+        A result is not cached when an invalidation happened while it was
+        loading, since it may predate the change.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_stamp()
+            entry = self._entries.get(api_key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(api_key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        user = loader(api_key)
+
+        ttl = self.ttl if user is not None else self.negative_ttl
+        with self._lock:
+            self._check_stamp()
+            if self._generation != generation:
+                return user
+            self._entries[api_key] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(api_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return user
+
+    def invalidate(self, *api_keys):
+        """
+        Invalidate cached API keys in this process and in every other
+        process sharing the stamp file
+        Call this whenever a token is issued, rotated or revoked.
+        """
+        with self._lock:
+            if api_keys:
+                for api_key in api_keys:
+                    self._entries.pop(api_key, None)
+            else:
+                self._entries.clear()
+            self._generation += 1
+            self._touch_stamp()
+
+    def _touch_stamp(self):
+        # Replace the file instead of rewriting it so the inode changes even
+        # on filesystems with coarse modification times.
+        directory = os.path.dirname(self.stamp_path) or '.'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.auth_cache_')
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(time.time_ns()))
+            os.replace(tmp_path, self.stamp_path)
+        except OSError as e:
+            print(f"Error updating auth cache stamp: {e}", file=sys.stderr)
+            return
+        self._stamp = self._read_stamp()
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+auth_cache = AuthCache(
+    ttl=int(os.environ.get('AUTH_CACHE_TTL', 60)),
+    max_entries=int(os.environ.get('AUTH_CACHE_SIZE', 1024)),
+)
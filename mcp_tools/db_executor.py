@@ -0,0 +1,55 @@
+# Database Executor for async MCP tools
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models.database import POOL_SETTINGS
+
+# One worker per connection the MCP engine may open, so work never queues
+# inside the connection pool while holding a thread
+DEFAULT_WORKERS = POOL_SETTINGS['mcp']['pool_size'] + POOL_SETTINGS['mcp']['max_overflow']
+
+
+class DatabaseExecutor:
+    """
+    Run blocking database work on a bounded thread pool
+    Tool coroutines await the result, so a slow query only occupies one worker
+    thread while the event loop keeps serving every other client.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily so that importing the service does not start threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='mcp-db'
+                    )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        # Carry context variables (e.g. the metrics call scope) into the worker
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._get_executor(),
+                                          functools.partial(context.run, func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+db_executor = DatabaseExecutor(int(os.environ.get('MCP_DB_WORKERS', DEFAULT_WORKERS)))
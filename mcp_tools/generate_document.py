@@ -2,6 +2,8 @@
 
 from flask import jsonify, request
 from models.models import db, Template, Placeholder, Prompt, User
+from models.data_access import can_read_template, load_document_source, render_stored_document_cached
+from templates.document_cache import document_cache
 
 def generate_complete_document():
     """
@@ -20,37 +22,25 @@ def generate_complete_document():
     if not user:
         return jsonify({'error': 'Invalid API key'}), 401
     
-    # Check if template belongs to user or is public
-    template = Template.query.get(template_id)
+    # Load the template's access fields, version and incomplete step count in one query
+    template = load_document_source(template_id)
     if not template:
         return jsonify({'error': 'Template not found'}), 404
     
-    if template.user_id != user.id and not template.is_public:
+    # Check if template belongs to user or is public
+    if not can_read_template(template, user.id):
         return jsonify({'error': 'Access denied to private template'}), 403
     
     # Check if all prompts are completed
-    incomplete_prompts = Prompt.query.filter_by(
-        template_id=template_id, 
-        completed=False
-    ).count()
-    
-    if incomplete_prompts > 0:
+    if template.incomplete_steps > 0:
         return jsonify({
             'error': 'Not all steps are completed',
-            'incomplete_steps': incomplete_prompts
+            'incomplete_steps': template.incomplete_steps
         }), 400
     
-    # Get all placeholders for this template
-    placeholders = Placeholder.query.filter_by(template_id=template_id).all()
-    
-    # Generate the document by replacing placeholders
-    document_content = template.content
-    for placeholder in placeholders:
-        placeholder_key = f"{{{{{placeholder.name}}}}}"
-        document_content = document_content.replace(
-            placeholder_key, 
-            placeholder.content or f"[{placeholder.name} content not provided]"
-        )
+    # Serve the document from memory while the template version is unchanged,
+    # re-splice only changed placeholders, or render in a single pass
+    document_content = render_stored_document_cached(template, document_cache).document
     
     # In a real implementation, you would either:
     # 1. Save to a file and return the path
@@ -2,6 +2,7 @@
 
 from flask import jsonify, request
 from models.models import db, Prompt, Template, User
+from models.data_access import can_read_template, load_next_step
 
 def get_next_step():
     """
@@ -19,25 +20,20 @@ def get_next_step():
     if not user:
         return jsonify({'error': 'Invalid API key'}), 401
     
-    # Check if template belongs to user or is public
-    template = Template.query.get(template_id)
-    if not template:
+    # Load the template and its next incomplete prompt in one query
+    next_step = load_next_step(template_id)
+    if not next_step:
         return jsonify({'error': 'Template not found'}), 404
     
-    if template.user_id != user.id and not template.is_public:
+    # Check if template belongs to user or is public
+    if not can_read_template(next_step, user.id):
         return jsonify({'error': 'Access denied to private template'}), 403
     
-    # Find the next incomplete prompt
-    next_prompt = Prompt.query.filter_by(
-        template_id=template_id, 
-        completed=False
-    ).order_by(Prompt.order).first()
-    
-    if not next_prompt:
+    if next_step.prompt_id is None:
         return jsonify({'message': 'No more steps available'}), 200
     
     return jsonify({
-        'prompt_id': next_prompt.id,
-        'content': next_prompt.content,
-        'order': next_prompt.order
+        'prompt_id': next_step.prompt_id,
+        'content': next_step.content,
+        'order': next_step.order
     })
\ No newline at end of file
@@ -0,0 +1,376 @@
+# MCP Service Backend
+#
+# The database side of mcp_service.py: an engine on the shared database, the
+# thread-scoped sessions tool calls use, and the blocking implementations of
+# the tools, which run on the database executor. mcp_service imports this
+# module on the first tool call, so an STDIO session can answer initialize
+# and tools/list without loading SQLAlchemy or the models.
+#
+# No Flask app is involved: every executor thread keeps one session (bound to
+# the same models and metadata as the web app) for its whole life, and each
+# tool call only closes it at the end, which returns the connection to the
+# pool where it stays open for the next call.
+#
+# The MCP server may be started on its own, before the web app has ever run
+# against the database, so loading the backend creates missing tables and
+# applies pending migrations the same way app.py does.
+
+import sys
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import select
+
+from models.models import db, User
+from models.database import create_database_engine, create_scoped_session
+from models.data_access import (
+    can_read_template, can_write_template, load_next_step, load_document_source,
+    load_placeholder_owner, load_placeholder_owners, render_stored_document_cached,
+    update_placeholder_content, update_placeholder_contents
+)
+from models.migrations import run_migrations
+from models.model_handler import ModelCallHandler
+from models.template_import import MAX_TEMPLATE_ITEMS, PlaceholderSpec, create_template_bulk
+from models.template_search import search_templates as find_templates
+from mcp_tools.auth_cache import AuthenticatedUser, auth_cache
+from monitoring.instrumentation import instrument_engine
+from monitoring.sql_profiler import sql_profiler
+from templates.document_cache import document_cache
+
+engine = create_database_engine(role='mcp')
+Session = create_scoped_session(engine)
+
+# Create tables and bring existing databases up to the current schema
+db.metadata.create_all(engine)
+run_migrations(engine, backup=True)
+
+# Count and time SQL statements per tool; served with the tool metrics on
+# /metrics by the HTTP and SSE transports
+instrument_engine(engine)
+# Slow-statement log and N+1 detection, when SQL_PROFILE=1
+sql_profiler.install(engine)
+
+model_handler = ModelCallHandler()
+
+@contextmanager
+def tool_session():
+    """The calling thread's session for one tool call, closed (not discarded) afterwards"""
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def warm_up(connections=None):
+    """Open pooled connections ahead of the first tool calls (by default as many as the pool keeps)"""
+    if connections is None:
+        size = getattr(engine.pool, 'size', None)
+        connections = size() if callable(size) else 1
+    opened = [engine.connect() for _ in range(connections)]
+    for connection in opened:
+        connection.close()
+
+def load_user_by_api_key(api_key: str, session):
+    """从数据库加载API Key对应的用户"""
+    row = session.execute(select(User.id, User.username).where(User.auth_token == api_key)).first()
+    if not row:
+        return None
+    return AuthenticatedUser(row.id, row.username)
+
+def get_user_by_api_key(api_key: str, session):
+    """根据API Key获取用户信息（优先使用认证缓存）"""
+    try:
+        if not api_key:
+            return None
+        return auth_cache.get_user(api_key, lambda key: load_user_by_api_key(key, session))
+    except Exception as e:
+        # stdout carries the protocol under the STDIO transport
+        print(f"Error getting user by API key: {e}", file=sys.stderr)
+        return None
+
+# Blocking implementations of the tools; they run on the database executor
+def _start_document_generation(project_root_path: str, api_key: str) -> dict:
+    """Start generating a design document"""
+    try:
+        with tool_session() as session:
+            # Validate inputs
+            if not project_root_path or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            # Here you would implement the logic to start document generation
+            # For now, we'll just return a success message
+            return {
+                'message': 'Document generation started successfully',
+                'project_root_path': project_root_path,
+                'user_id': user.id
+            }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _get_next_step(template_id: int, api_key: str) -> dict:
+    """Get the next prompt in the sequence"""
+    try:
+        with tool_session() as session:
+            if not template_id or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            # Load the template and its next incomplete prompt in one query
+            next_step = load_next_step(template_id, session)
+            if not next_step:
+                return {'error': 'Template not found'}
+            
+            # Check if template belongs to user or is public
+            if not can_read_template(next_step, user.id):
+                return {'error': 'Access denied to private template'}
+            
+            if next_step.prompt_id is None:
+                return {'message': 'No more steps available'}
+            
+            return {
+                'prompt_id': next_step.prompt_id,
+                'content': next_step.content,
+                'order': next_step.order
+            }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _submit_placeholder_content(placeholder_id: int, content: str, api_key: str) -> dict:
+    """Submit content for placeholders"""
+    try:
+        with tool_session() as session:
+            if not placeholder_id or content is None or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            # Find the placeholder together with its template's owner
+            placeholder = load_placeholder_owner(placeholder_id, session)
+            if not placeholder:
+                return {'error': 'Placeholder not found'}
+            
+            # Check if placeholder belongs to user's template
+            if not can_write_template(placeholder, user.id):
+                return {'error': 'Access denied to this placeholder'}
+            
+            # Check PlantUML diagrams and start rendering them in the background
+            processed = model_handler.process_placeholder_content(content)
+            
+            # Update the placeholder content
+            update_placeholder_content(placeholder_id, processed.content, placeholder.template_id, session)
+            
+            result = {
+                'message': 'Content submitted successfully',
+                'placeholder_id': placeholder_id
+            }
+            if processed.diagrams:
+                result['diagrams'] = model_handler.diagram_report(processed.diagrams)
+            return result
+    except Exception as e:
+        return {'error': str(e)}
+
+# Maximum number of items accepted by one batch submission
+MAX_BATCH_SIZE = 500
+
+def _submit_placeholder_contents(items: list[dict], api_key: str) -> dict:
+    """Submit content for many placeholders in one call"""
+    try:
+        with tool_session() as session:
+            if not items or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            if len(items) > MAX_BATCH_SIZE:
+                return {'error': f'Too many items, at most {MAX_BATCH_SIZE} per call'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            # Validate the shape of every item before touching the database
+            results = [None] * len(items)
+            candidates = []
+            for index, item in enumerate(items):
+                item = item if isinstance(item, dict) else {}
+                placeholder_id = item.get('placeholder_id')
+                content = item.get('content')
+                if not placeholder_id or content is None:
+                    results[index] = {'placeholder_id': placeholder_id, 'error': 'Missing required parameters'}
+                    continue
+                try:
+                    placeholder_id = int(placeholder_id)
+                except (TypeError, ValueError):
+                    results[index] = {'placeholder_id': placeholder_id, 'error': 'Invalid placeholder_id'}
+                    continue
+                candidates.append((index, placeholder_id, content))
+            
+            # Check ownership of all placeholders with one query
+            owners = load_placeholder_owners({placeholder_id for _, placeholder_id, _ in candidates}, session)
+            contents = []
+            template_ids = set()
+            for index, placeholder_id, content in candidates:
+                placeholder = owners.get(placeholder_id)
+                if not placeholder:
+                    results[index] = {'placeholder_id': placeholder_id, 'error': 'Placeholder not found'}
+                elif not can_write_template(placeholder, user.id):
+                    results[index] = {'placeholder_id': placeholder_id, 'error': 'Access denied to this placeholder'}
+                else:
+                    processed = model_handler.process_placeholder_content(content)
+                    contents.append((placeholder_id, processed.content))
+                    template_ids.add(placeholder.template_id)
+                    results[index] = {'placeholder_id': placeholder_id, 'message': 'Content submitted successfully'}
+                    if processed.diagrams:
+                        results[index]['diagrams'] = model_handler.diagram_report(processed.diagrams)
+            
+            # Write every accepted item in a single transaction
+            update_placeholder_contents(contents, template_ids, session)
+            
+            return {
+                'message': f'{len(contents)} of {len(items)} placeholders submitted',
+                'submitted': len(contents),
+                'failed': len(items) - len(contents),
+                'results': results
+            }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _generate_complete_document(template_id: int, api_key: str, since_version: Optional[int] = None) -> dict:
+    """Generate the complete design document"""
+    try:
+        with tool_session() as session:
+            if not template_id or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            # Load the template's access fields, version and incomplete step count in one query
+            template = load_document_source(template_id, session)
+            if not template:
+                return {'error': 'Template not found'}
+            
+            # Check if template belongs to user or is public
+            if not can_read_template(template, user.id):
+                return {'error': 'Access denied to private template'}
+            
+            # Check if all prompts are completed
+            if template.incomplete_steps > 0:
+                return {
+                    'error': 'Not all steps are completed',
+                    'incomplete_steps': template.incomplete_steps
+                }
+            
+            # Serve the document from memory while the template version is unchanged,
+            # re-splice only the placeholders changed since the cached render, or
+            # render in a single pass when the template layout changed
+            rendered = render_stored_document_cached(template, document_cache, session)
+            
+            # Clients that still hold an earlier version can receive just the edits
+            patch = rendered.patch_from(since_version) if since_version is not None else None
+            if patch is not None:
+                return {
+                    'message': 'Document generated successfully',
+                    'version': rendered.version,
+                    'base_version': since_version,
+                    'patch': patch
+                }
+            
+            return {
+                'message': 'Document generated successfully',
+                'version': rendered.version,
+                'document_content': rendered.document
+            }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _search_templates(query: str, api_key: str, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """Search the templates visible to the user"""
+    try:
+        with tool_session() as session:
+            if query is None or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            try:
+                page = find_templates(user.id, query, limit, cursor, session)
+            except ValueError as e:
+                return {'error': str(e)}
+            
+            return {
+                'results': [
+                    {
+                        'template_id': result.template_id,
+                        'name': result.name,
+                        'description': result.description,
+                        'is_public': bool(result.is_public),
+                        'owned': result.owner_id == user.id,
+                        'snippet': result.snippet
+                    }
+                    for result in page.items
+                ],
+                'next_cursor': page.next_cursor
+            }
+    except Exception as e:
+        return {'error': str(e)}
+
+def _create_template(name: str, content: str, api_key: str, description: str = '',
+                     placeholders: Optional[list[dict]] = None, prompts: Optional[list[str]] = None,
+                     is_public: bool = False) -> dict:
+    """Create a template, discovering its placeholders from the content"""
+    try:
+        with tool_session() as session:
+            if not name or not content or not api_key:
+                return {'error': 'Missing required parameters'}
+            
+            placeholders = placeholders or []
+            prompts = prompts or []
+            if len(placeholders) > MAX_TEMPLATE_ITEMS or len(prompts) > MAX_TEMPLATE_ITEMS:
+                return {'error': f'Too many placeholders or prompts, at most {MAX_TEMPLATE_ITEMS} each'}
+            
+            # Check if user exists by API key
+            user = get_user_by_api_key(api_key, session)
+            if not user:
+                return {'error': 'Invalid API key'}
+            
+            declared = []
+            for item in placeholders:
+                if not isinstance(item, dict) or not str(item.get('name') or '').strip():
+                    return {'error': 'Every placeholder needs a name'}
+                declared.append(PlaceholderSpec(str(item['name']).strip(), str(item.get('description') or ''),
+                                                item.get('example')))
+            
+            # Template, placeholders and prompts are written in a single transaction
+            try:
+                created = create_template_bulk(user.id, name, content, description or '', is_public, declared,
+                                               [str(prompt).strip() for prompt in prompts], session)
+            except ValueError as e:
+                return {'error': str(e)}
+            
+            return {
+                'message': 'Template created successfully',
+                'template_id': created.template_id,
+                'placeholder_count': created.placeholder_count,
+                'prompt_count': created.prompt_count,
+                'undeclared_placeholders': created.undeclared,
+                'unused_placeholders': created.unused
+            }
+    except Exception as e:
+        return {'error': str(e)}
@@ -2,6 +2,10 @@
 
 from flask import jsonify, request
 from models.models import db, Placeholder, Template, User
+from models.data_access import can_write_template, load_placeholder_owner, update_placeholder_content
+from models.model_handler import ModelCallHandler
+
+model_handler = ModelCallHandler()
 
 def submit_placeholder_content():
     """
@@ -21,21 +25,25 @@ def submit_placeholder_content():
     if not user:
         return jsonify({'error': 'Invalid API key'}), 401
     
-    # Find the placeholder
-    placeholder = Placeholder.query.get(placeholder_id)
+    # Find the placeholder together with its template's owner
+    placeholder = load_placeholder_owner(placeholder_id)
     if not placeholder:
         return jsonify({'error': 'Placeholder not found'}), 404
     
     # Check if placeholder belongs to user's template
-    template = Template.query.get(placeholder.template_id)
-    if template.user_id != user.id:
+    if not can_write_template(placeholder, user.id):
         return jsonify({'error': 'Access denied to this placeholder'}), 403
     
+    # Check PlantUML diagrams and start rendering them in the background
+    processed = model_handler.process_placeholder_content(content)
+    
     # Update the placeholder content
-    placeholder.content = content
-    db.session.commit()
+    update_placeholder_content(placeholder_id, processed.content, placeholder.template_id)
     
-    return jsonify({
+    result = {
         'message': 'Content submitted successfully',
         'placeholder_id': placeholder_id
-    })
\ No newline at end of file
+    }
+    if processed.diagrams:
+        result['diagrams'] = model_handler.diagram_report(processed.diagrams)
+    return jsonify(result)
\ No newline at end of file
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+数据库迁移脚本：为已有的 app.db 补齐索引和新增字段，不会丢失数据
+用法:
+    python migrate_db.py            # 备份后执行所有待处理的迁移
+    python migrate_db.py --status   # 只查看当前版本和待处理的迁移
+"""
+
+import argparse
+
+from sqlalchemy import create_engine
+
+from models.database import engine_options, get_database_uri, install_sqlite_pragmas
+from models.migrations import LATEST_VERSION, get_schema_version, pending_migrations, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DesignMaster数据库迁移")
+    parser.add_argument("--database-uri", default=get_database_uri(),
+        help="数据库URI (默认: app.db)")
+    parser.add_argument("--status", action="store_true", help="只显示迁移状态")
+    parser.add_argument("--no-backup", action="store_true", help="迁移前不备份数据库")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_uri, **engine_options('script', args.database_uri))
+    install_sqlite_pragmas(engine)
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+        pending = pending_migrations(conn)
+
+    print(f"当前版本: {version}  最新版本: {LATEST_VERSION}")
+    if not pending:
+        print("数据库已是最新版本")
+        return
+    for number, description, _ in pending:
+        print(f"  待处理: {number:04d} {description}")
+    if args.status:
+        return
+
+    run_migrations(engine, backup=not args.no_backup, verbose=True)
+    print("迁移完成")
+
+
+if __name__ == "__main__":
+    main()
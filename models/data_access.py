@@ -0,0 +1,317 @@
+# Data Access Layer for MCP tools
+#
+# Each loader resolves a template, the information needed to check access to
+# it and the data the calling tool needs in a single round trip, so the number
+# of SQL statements per tool call does not depend on the size of the template.
+
+from collections import namedtuple
+
+from sqlalchemy import bindparam, func, select, update
+
+from models.models import db, Template, Placeholder, Prompt
+from templates.template_renderer import (
+    RenderedDocument, placeholder_values, render_document, template_compiler,
+)
+
+NextStep = namedtuple('NextStep', ['template_id', 'owner_id', 'is_public', 'prompt_id', 'content', 'order'])
+DocumentSource = namedtuple('DocumentSource', ['template_id', 'owner_id', 'is_public', 'version', 'layout_version',
+                                               'incomplete_steps'])
+PlaceholderOwner = namedtuple('PlaceholderOwner', ['placeholder_id', 'template_id', 'owner_id'])
+TemplateStamp = namedtuple('TemplateStamp', ['template_id', 'owner_id', 'is_public', 'version'])
+ListingFingerprint = namedtuple('ListingFingerprint', ['count', 'max_id', 'version_sum'])
+
+
+def can_read_template(record, user_id):
+    """A template is readable by its owner, or by anyone when it is public"""
+    return record.owner_id == user_id or bool(record.is_public)
+
+
+def can_write_template(record, user_id):
+    """Only the owner may submit content to a template"""
+    return record.owner_id == user_id
+
+
+def next_step_statement(template_id):
+    """Template access fields joined with the next incomplete prompt"""
+    next_prompt_id = (
+        select(Prompt.id)
+        .where(Prompt.template_id == Template.id, Prompt.completed == False)  # noqa: E712
+        .order_by(Prompt.order)
+        .limit(1)
+        .correlate(Template)
+        .scalar_subquery()
+    )
+    return (
+        select(Template.id, Template.user_id, Template.is_public,
+               Prompt.id, Prompt.content, Prompt.order)
+        .outerjoin(Prompt, Prompt.id == next_prompt_id)
+        .where(Template.id == template_id)
+    )
+
+
+def document_source_statement(template_id):
+    """Template access fields and version stamps with its incomplete prompt count"""
+    incomplete_steps = (
+        select(func.count(Prompt.id))
+        .where(Prompt.template_id == Template.id, Prompt.completed == False)  # noqa: E712
+        .correlate(Template)
+        .scalar_subquery()
+    )
+    return (
+        select(Template.id, Template.user_id, Template.is_public, Template.version,
+               Template.layout_version, incomplete_steps)
+        .where(Template.id == template_id)
+    )
+
+
+def template_stamp_statement(template_id):
+    """Template access fields and version stamp, without the content"""
+    return (
+        select(Template.id, Template.user_id, Template.is_public, Template.version)
+        .where(Template.id == template_id)
+    )
+
+
+def listing_fingerprint_statement(*criteria):
+    """
+    Count, highest id and sum of versions of the templates matching ``criteria``
+    Versions only grow, so any insert, delete or change of a listed template
+    changes at least one of the three.
+    """
+    return (
+        select(func.count(Template.id),
+               func.coalesce(func.max(Template.id), 0),
+               func.coalesce(func.sum(Template.version), 0))
+        .where(*criteria)
+    )
+
+
+def template_content_statement(template_id):
+    """Raw content of a template"""
+    return select(Template.content).where(Template.id == template_id)
+
+
+def placeholder_values_statement(template_id):
+    """(name, content) of every placeholder of a template"""
+    return (
+        select(Placeholder.name, Placeholder.content)
+        .where(Placeholder.template_id == template_id)
+        .order_by(Placeholder.id)
+    )
+
+
+def changed_placeholder_values_statement(template_id, since_version):
+    """
+    (name, content) of every placeholder sharing a name with one changed after ``since_version``
+    Unchanged placeholders with the same name are included so that the
+    first-one-wins rule can be applied again.
+    """
+    changed_names = (
+        select(Placeholder.name)
+        .where(Placeholder.template_id == template_id, Placeholder.revision > since_version)
+    )
+    return (
+        select(Placeholder.name, Placeholder.content)
+        .where(Placeholder.template_id == template_id, Placeholder.name.in_(changed_names))
+        .order_by(Placeholder.id)
+    )
+
+
+def placeholder_owner_statement(placeholder_id):
+    """A placeholder joined with the owner of its template"""
+    return (
+        select(Placeholder.id, Placeholder.template_id, Template.user_id)
+        .join(Template, Template.id == Placeholder.template_id)
+        .where(Placeholder.id == placeholder_id)
+    )
+
+
+def placeholder_owners_statement(placeholder_ids):
+    """Placeholders joined with the owners of their templates"""
+    return (
+        select(Placeholder.id, Placeholder.template_id, Template.user_id)
+        .join(Template, Template.id == Placeholder.template_id)
+        .where(Placeholder.id.in_(placeholder_ids))
+    )
+
+
+def load_next_step(template_id, session=None):
+    """
+    Load a template's access fields and its next incomplete prompt
+    Returns None when the template does not exist; ``prompt_id`` is None when
+    every prompt has been completed.
+    """
+    session = session or db.session
+    row = session.execute(next_step_statement(template_id)).first()
+    return NextStep(*row) if row else None
+
+
+def load_document_source(template_id, session=None):
+    """
+    Load a template's access fields, version and number of incomplete prompts
+    The content is left out so that a rendered-document cache hit never
+    transfers it. Returns None when the template does not exist.
+    """
+    session = session or db.session
+    row = session.execute(document_source_statement(template_id)).first()
+    return DocumentSource(*row) if row else None
+
+
+def load_template_stamp(template_id, session=None):
+    """Load a template's access fields and version; None when it does not exist"""
+    session = session or db.session
+    row = session.execute(template_stamp_statement(template_id)).first()
+    return TemplateStamp(*row) if row else None
+
+
+def load_market_fingerprints(user_id, session=None):
+    """ListingFingerprints of the public templates and of a user's own templates"""
+    session = session or db.session
+    public = session.execute(listing_fingerprint_statement(Template.is_public == True)).one()  # noqa: E712
+    own = session.execute(listing_fingerprint_statement(Template.user_id == user_id)).one()
+    return ListingFingerprint(*public), ListingFingerprint(*own)
+
+
+def load_template_content(template_id, session=None):
+    """Load the raw content of a template"""
+    session = session or db.session
+    return session.execute(template_content_statement(template_id)).scalar()
+
+
+def load_placeholder_values(template_id, session=None):
+    """Load (name, content) of every placeholder of a template in one query"""
+    session = session or db.session
+    return session.execute(placeholder_values_statement(template_id)).all()
+
+
+def load_changed_placeholder_values(template_id, since_version, session=None):
+    """Load the rendered values of placeholders changed after ``since_version``"""
+    session = session or db.session
+    rows = session.execute(changed_placeholder_values_statement(template_id, since_version)).all()
+    return placeholder_values(rows)
+
+
+def load_placeholder_owner(placeholder_id, session=None):
+    """
+    Load a placeholder together with the owner of its template
+    Returns None when the placeholder does not exist.
+    """
+    session = session or db.session
+    row = session.execute(placeholder_owner_statement(placeholder_id)).first()
+    return PlaceholderOwner(*row) if row else None
+
+
+def render_stored_document(template_id, session=None):
+    """Load a template's content and placeholders and render the document"""
+    content = load_template_content(template_id, session)
+    placeholders = load_placeholder_values(template_id, session)
+    return render_document(template_id, content, placeholders)
+
+
+def load_rendered_document(template_id, version, session=None):
+    """Load a template's content and placeholders and render a RenderedDocument"""
+    content = load_template_content(template_id, session)
+    placeholders = load_placeholder_values(template_id, session)
+    compiled = template_compiler.get(template_id, content)
+    return RenderedDocument.render(compiled, placeholder_values(placeholders), version)
+
+
+def render_stored_document_cached(source, cache, session=None):
+    """
+    Return the RenderedDocument for a DocumentSource through a DocumentCache
+    Renders from scratch, re-splices only changed placeholders or serves the
+    cached document, depending on what changed since the cached render.
+    """
+    return cache.get_document(
+        source.template_id, source.version, source.layout_version,
+        lambda: load_rendered_document(source.template_id, source.version, session),
+        lambda since: load_changed_placeholder_values(source.template_id, since, session),
+    )
+
+
+def bump_template_versions(template_ids, session=None):
+    """
+    Increment the version stamp of templates whose rendered output changed
+    Runs inside the caller's transaction; the caller commits.
+    """
+    session = session or db.session
+    template_ids = sorted(set(template_ids))
+    if not template_ids:
+        return
+    session.execute(
+        update(Template)
+        .where(Template.id.in_(template_ids))
+        .values(version=Template.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_template_layouts(template_ids, session=None):
+    """
+    Increment the version stamp of templates whose content or placeholder set changed
+    The layout version moves with it, so cached renders are not patched
+    incrementally. Runs inside the caller's transaction; the caller commits.
+    """
+    session = session or db.session
+    template_ids = sorted(set(template_ids))
+    if not template_ids:
+        return
+    session.execute(
+        update(Template)
+        .where(Template.id.in_(template_ids))
+        .values(version=Template.version + 1, layout_version=Template.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def template_version_subquery():
+    """The current version of a placeholder's template, for stamping revisions"""
+    return (
+        select(Template.version)
+        .where(Template.id == Placeholder.template_id)
+        .scalar_subquery()
+    )
+
+
+def update_placeholder_content(placeholder_id, content, template_id, session=None):
+    """Store submitted placeholder content without loading the row first"""
+    session = session or db.session
+    # Bump first so the placeholder's revision is the template's new version
+    bump_template_versions([template_id], session)
+    session.execute(
+        update(Placeholder)
+        .where(Placeholder.id == placeholder_id)
+        .values(content=content, revision=template_version_subquery())
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+
+
+def load_placeholder_owners(placeholder_ids, session=None):
+    """Load many placeholders with their template owners, keyed by placeholder id"""
+    session = session or db.session
+    if not placeholder_ids:
+        return {}
+    rows = session.execute(placeholder_owners_statement(list(placeholder_ids))).all()
+    return {row[0]: PlaceholderOwner(*row) for row in rows}
+
+
+def update_placeholder_contents(contents, template_ids, session=None):
+    """
+    Store many placeholder contents in a single transaction
+    ``contents`` is a list of (placeholder_id, content) pairs. One version bump
+    for the affected ``template_ids`` is followed by the updates, sent as one
+    executemany statement.
+    """
+    session = session or db.session
+    if not contents:
+        return
+    bump_template_versions(template_ids, session)
+    placeholder_table = Placeholder.__table__
+    session.execute(
+        placeholder_table.update()
+        .where(placeholder_table.c.id == bindparam('placeholder_id'))
+        .values(content=bindparam('new_content'), revision=template_version_subquery()),
+        [{'placeholder_id': placeholder_id, 'new_content': content} for placeholder_id, content in contents]
+    )
+    session.commit()
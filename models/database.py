@@ -0,0 +1,133 @@
+# Shared Database Configuration
+#
+# The web app and the MCP service are separate processes working on the same
+# SQLite file. Both configure their engines here so that every connection
+# uses WAL journaling (readers no longer block the writer and vice versa) and
+# waits for locks instead of failing with "database is locked".
+
+import os
+
+# SQLAlchemy and the models are imported inside the functions that need them:
+# the MCP server reads POOL_SETTINGS while starting, before any database work
+
+basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "app.db")}'
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # NORMAL is durable across application crashes in WAL mode and avoids an
+    # fsync on every commit
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'temp_store': 'MEMORY',
+}
+
+# Connection pool settings per process type
+POOL_SETTINGS = {
+    # Threaded Flask server: one connection per in-flight request
+    'web': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 10},
+    # MCP server: tool calls are short and mostly sequential per client
+    'mcp': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 10},
+    # One-off scripts (migrations, seeding, benchmarks)
+    'script': {'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 30},
+}
+
+
+def get_database_uri():
+    """Database URI shared by all processes; DATABASE_URI overrides app.db"""
+    return os.environ.get('DATABASE_URI', DEFAULT_DATABASE_URI)
+
+
+def is_sqlite_memory(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri)
+
+
+def engine_options(role='web', uri=None):
+    """SQLAlchemy engine options for a process type"""
+    uri = uri or get_database_uri()
+    if role not in POOL_SETTINGS:
+        raise ValueError(f"Unknown database role: {role}")
+    if is_sqlite_memory(uri):
+        # In-memory databases live in a single connection
+        return {}
+    options = dict(POOL_SETTINGS[role])
+    if uri.startswith('sqlite'):
+        # The sqlite3 module waits on locks by itself too; keep it in step
+        # with busy_timeout and allow pooled connections to move threads
+        options['connect_args'] = {
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'check_same_thread': False,
+        }
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Connection event handler that applies SQLITE_PRAGMAS"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(engine):
+    """Apply SQLITE_PRAGMAS to every connection an engine opens"""
+    from sqlalchemy import event
+
+    if engine.dialect.name != 'sqlite' or is_sqlite_memory(str(engine.url)):
+        return
+    if not event.contains(engine, 'connect', apply_sqlite_pragmas):
+        event.listen(engine, 'connect', apply_sqlite_pragmas)
+
+
+def init_database(app, role='web'):
+    """Configure a Flask app to use the shared database with tuned pooling"""
+    from models.models import db
+
+    uri = get_database_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(role, uri)
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine)
+    return db
+
+
+def create_database_engine(role='script', uri=None):
+    """A standalone engine on the shared database, for processes that do not run Flask"""
+    from sqlalchemy import create_engine
+
+    uri = uri or get_database_uri()
+    engine = create_engine(uri, **engine_options(role, uri))
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def begin_immediate(session):
+    """
+    Take SQLite's write lock now instead of at the first write
+    For read-check-then-write sequences that must not interleave with
+    another writer. A no-op for other databases and inside a transaction
+    that already began; the caller's commit or rollback releases the lock.
+    """
+    connection = session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+    dbapi_connection = connection.connection.dbapi_connection
+    if not dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def create_scoped_session(engine):
+    """
+    Thread-scoped sessions on ``engine`` using the models shared with the web app
+    Each thread reuses its session across units of work; closing it after each
+    one returns the connection to the pool, which keeps it open for the next.
+    Loaded attributes survive commits, since results are read after them.
+    """
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    return scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
@@ -0,0 +1,220 @@
+# Schema Migrations
+#
+# db.create_all() only creates missing tables, so databases created before a
+# model change never receive new indexes or columns. Migrations are applied
+# in order and the schema version is tracked with SQLite's PRAGMA user_version.
+# Every operation is idempotent because fresh databases already get the
+# current schema from create_all().
+
+import os
+import sqlite3
+import warnings
+from datetime import datetime
+
+from templates.template_renderer import content_hash
+
+
+def index_exists(conn, name):
+    """Check whether an index exists"""
+    row = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+    ).first()
+    return row is not None
+
+
+def column_exists(conn, table, column):
+    """Check whether a table has a column"""
+    rows = conn.exec_driver_sql(f'PRAGMA table_info("{table}")').all()
+    return any(row[1] == column for row in rows)
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Create an index unless it already exists"""
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    unique_sql = 'UNIQUE ' if unique else ''
+    conn.exec_driver_sql(f'CREATE {unique_sql}INDEX IF NOT EXISTS "{name}" ON "{table}" ({column_list})')
+
+
+def add_column(conn, table, column, ddl):
+    """Add a column unless it already exists"""
+    if not column_exists(conn, table, column):
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}')
+
+
+def migration_0001_hot_path_indexes(conn):
+    """Indexes for the MCP tool and template market query paths"""
+    create_index(conn, 'ix_prompt_template_completed_order', 'prompt', ['template_id', 'completed', 'order'])
+    create_index(conn, 'ix_prompt_template_order', 'prompt', ['template_id', 'order'])
+    create_index(conn, 'ix_placeholder_template_id', 'placeholder', ['template_id'])
+    create_index(conn, 'ix_template_is_public', 'template', ['is_public'])
+    create_index(conn, 'ix_template_user_id', 'template', ['user_id'])
+
+
+def migration_0002_template_version(conn):
+    """Version stamp used to key rendered-document caches"""
+    add_column(conn, 'template', 'version', "INTEGER NOT NULL DEFAULT 0")
+
+
+def migration_0003_incremental_render(conn):
+    """Change tracking for incremental re-rendering of documents"""
+    add_column(conn, 'template', 'layout_version', "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, 'placeholder', 'revision', "INTEGER NOT NULL DEFAULT 0")
+    create_index(conn, 'ix_placeholder_template_revision', 'placeholder', ['template_id', 'revision'])
+
+
+def migration_0004_template_listing_indexes(conn):
+    """Covering indexes for template listings and their ETag fingerprints"""
+    create_index(conn, 'ix_template_public_listing', 'template', ['is_public', 'id', 'version'])
+    create_index(conn, 'ix_template_user_listing', 'template', ['user_id', 'id', 'version'])
+    # Superseded: both are prefixes of the new indexes
+    conn.exec_driver_sql('DROP INDEX IF EXISTS "ix_template_is_public"')
+    conn.exec_driver_sql('DROP INDEX IF EXISTS "ix_template_user_id"')
+
+
+TEMPLATE_FTS_TRIGGERS = {
+    'template_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS template_fts_insert AFTER INSERT ON template BEGIN
+            INSERT INTO template_fts(rowid, name, description, content)
+            VALUES (new.id, new.name, new.description, new.content);
+        END""",
+    'template_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS template_fts_delete AFTER DELETE ON template BEGIN
+            INSERT INTO template_fts(template_fts, rowid, name, description, content)
+            VALUES ('delete', old.id, old.name, old.description, old.content);
+        END""",
+    # Version bumps do not touch the indexed columns and skip this trigger
+    'template_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS template_fts_update AFTER UPDATE OF name, description, content ON template BEGIN
+            INSERT INTO template_fts(template_fts, rowid, name, description, content)
+            VALUES ('delete', old.id, old.name, old.description, old.content);
+            INSERT INTO template_fts(rowid, name, description, content)
+            VALUES (new.id, new.name, new.description, new.content);
+        END""",
+}
+
+
+def fts5_supported(conn):
+    """Whether this SQLite build includes FTS5 with the trigram tokenizer"""
+    try:
+        conn.exec_driver_sql("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='trigram')")
+    except Exception:
+        return False
+    conn.exec_driver_sql("DROP TABLE temp.fts5_probe")
+    return True
+
+
+def migration_0005_template_search(conn):
+    """Full-text index over template name, description and content"""
+    if not fts5_supported(conn):
+        # Search falls back to LIKE; rerun after upgrading SQLite with
+        # PRAGMA user_version = 4 to build the index
+        warnings.warn("SQLite lacks FTS5 trigram support; template search will use LIKE")
+        return
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'template_fts'"
+    ).first()
+    # External-content table: the text is read from template, only the index is stored
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS template_fts USING fts5("
+        "name, description, content, content='template', content_rowid='id', tokenize='trigram')"
+    )
+    for ddl in TEMPLATE_FTS_TRIGGERS.values():
+        conn.exec_driver_sql(ddl)
+    if not exists:
+        conn.exec_driver_sql("INSERT INTO template_fts(template_fts) VALUES ('rebuild')")
+
+
+def migration_0006_template_content_hash(conn):
+    """Content hash used by catalogue imports to skip templates the owner already has"""
+    add_column(conn, 'template', 'content_hash', "VARCHAR(64)")
+    create_index(conn, 'ix_template_user_content_hash', 'template', ['user_id', 'content_hash'])
+    # Backfill in chunks so that large catalogues are not loaded at once
+    while True:
+        rows = conn.exec_driver_sql(
+            "SELECT id, content FROM template WHERE content_hash IS NULL LIMIT 1000"
+        ).all()
+        if not rows:
+            break
+        conn.exec_driver_sql(
+            "UPDATE template SET content_hash = ? WHERE id = ?",
+            [(content_hash(content or ''), template_id) for template_id, content in rows]
+        )
+
+
+# (version, description, function) - append new migrations, never reorder
+MIGRATIONS = [
+    (1, 'hot path indexes', migration_0001_hot_path_indexes),
+    (2, 'template version stamp', migration_0002_template_version),
+    (3, 'incremental render tracking', migration_0003_incremental_render),
+    (4, 'template listing indexes', migration_0004_template_listing_indexes),
+    (5, 'template full-text search', migration_0005_template_search),
+    (6, 'template content hash', migration_0006_template_content_hash),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Return the schema version stored in the database"""
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def pending_migrations(conn):
+    """Return migrations that have not been applied yet"""
+    version = get_schema_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > version]
+
+
+def database_is_empty(conn):
+    """Whether the database holds no rows at all, as when it was just created"""
+    tables = [row[0] for row in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    return not any(conn.exec_driver_sql(f'SELECT 1 FROM "{table}" LIMIT 1').first() for table in tables)
+
+
+def backup_database(db_path):
+    """Copy a SQLite database with the online backup API and return the copy's path"""
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    backup_path = f"{db_path}.{timestamp}.bak"
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return backup_path
+
+
+def run_migrations(engine, backup=False, verbose=False):
+    """
+    Apply pending migrations in order
+    The schema version is bumped after each migration, and operations are
+    idempotent, so an interrupted run can simply be repeated. With
+    ``backup=True`` the database file is copied before anything is changed,
+    unless it was never migrated and holds no data (a brand-new database).
+    Returns the list of applied versions.
+    """
+    with engine.connect() as conn:
+        pending = pending_migrations(conn)
+        if pending and backup and get_schema_version(conn) == 0 and database_is_empty(conn):
+            backup = False
+    if not pending:
+        return []
+
+    db_path = engine.url.database
+    if backup and db_path and db_path != ':memory:' and os.path.exists(db_path):
+        backup_path = backup_database(db_path)
+        if verbose:
+            print(f"Backed up database to {backup_path}")
+
+    applied = []
+    for version, description, migrate in pending:
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+        applied.append(version)
+        if verbose:
+            print(f"Applied migration {version:04d}: {description}")
+    return applied
@@ -1,12 +1,17 @@
 # Model Call Handler
 
 import re
+from collections import namedtuple
+
+from models.plantuml_pipeline import plantuml_pipeline
+
+ProcessedContent = namedtuple('ProcessedContent', ['content', 'diagrams'])
 
 class ModelCallHandler:
     """Handle AI model calls and parameter refinement"""
     
-    def __init__(self):
-        pass
+    def __init__(self, diagram_pipeline=None):
+        self.diagram_pipeline = diagram_pipeline or plantuml_pipeline
     
     def refine_parameters(self, raw_parameters):
         """
@@ -34,14 +39,18 @@ class ModelCallHandler:
     def process_placeholder_content(self, content):
         """
         Process content for placeholders
-        This could include:
-        - Formatting text
-        - Adding markdown syntax
-        - Validating PlantUML diagrams
+        PlantUML diagrams in the content are syntax-checked and rendered in the
+        background so that document generation finds them in the diagram cache.
+        The content itself is stored as submitted; returns a ProcessedContent
+        whose ``diagrams`` report each diagram's errors and render status.
         """
-        # For now, just return the content as-is
-        # In a real implementation, you might want to:
-        # - Check for PlantUML diagrams and validate them
-        # - Format markdown properly
-        # - Ensure content meets template requirements
-        return content
\ No newline at end of file
+        diagrams = self.diagram_pipeline.process(content)
+        return ProcessedContent(content, diagrams)
+    
+    @staticmethod
+    def diagram_report(diagrams):
+        """JSON-friendly summary of processed diagrams for tool responses"""
+        return [
+            {'index': index, 'status': diagram.status, 'errors': diagram.errors}
+            for index, diagram in enumerate(diagrams)
+        ]
\ No newline at end of file
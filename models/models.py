@@ -1,4 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import query_expression
+
+from templates.template_renderer import content_hash
 
 db = SQLAlchemy()
 
@@ -23,8 +27,26 @@ class Template(db.Model):
     description = db.Column(db.Text)
     is_public = db.Column(db.Boolean, default=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Bumped whenever anything shown for the template changes (see the events below)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Version at which the content or the set of placeholder names last changed;
+    # renders from an older version cannot be patched incrementally
+    layout_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # SHA-256 of the content; catalogue imports skip templates their owner already has
+    content_hash = db.Column(db.String(64))
     placeholders = db.relationship('Placeholder', backref='template', lazy=True)
     prompts = db.relationship('Prompt', backref='template', lazy=True)
+    # Filled in by listing queries (see models.template_search.listing_options)
+    # so that cards show the count without loading every placeholder
+    placeholder_count = query_expression()
+
+    # Listings are read in id order, and their ETag fingerprints (count, max id,
+    # sum of versions) are answered from these indexes without touching rows
+    __table_args__ = (
+        db.Index('ix_template_public_listing', 'is_public', 'id', 'version'),
+        db.Index('ix_template_user_listing', 'user_id', 'id', 'version'),
+        db.Index('ix_template_user_content_hash', 'user_id', 'content_hash'),
+    )
 
     def __repr__(self):
         return f'<Template {self.name}>'
@@ -37,6 +59,14 @@ class Placeholder(db.Model):
     example = db.Column(db.Text)
     template_id = db.Column(db.Integer, db.ForeignKey('template.id'), nullable=False)
     content = db.Column(db.Text)  # Content submitted by user
+    # Template version at which the content was last submitted
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # ix_placeholder_template_id also yields rows in id order without a sort
+    __table_args__ = (
+        db.Index('ix_placeholder_template_id', 'template_id'),
+        db.Index('ix_placeholder_template_revision', 'template_id', 'revision'),
+    )
 
     def __repr__(self):
         return f'<Placeholder {self.name}>'
@@ -49,6 +79,12 @@ class Prompt(db.Model):
     template_id = db.Column(db.Integer, db.ForeignKey('template.id'), nullable=False)
     completed = db.Column(db.Boolean, default=False)
 
+    # Serve "next incomplete prompt" and ordered listings without a sort step
+    __table_args__ = (
+        db.Index('ix_prompt_template_completed_order', 'template_id', 'completed', 'order'),
+        db.Index('ix_prompt_template_order', 'template_id', 'order'),
+    )
+
     def __repr__(self):
         return f'<Prompt {self.order}>'
 
@@ -60,4 +96,88 @@ class Resource(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     def __repr__(self):
-        return f'<Resource {self.name}>'
\ No newline at end of file
+        return f'<Resource {self.name}>'
+
+
+# Template.version changes with everything shown for a template: its own
+# columns, its placeholders and its prompts. It keys the rendered-document
+# cache and the web pages' ETags. Template.layout_version and
+# Placeholder.revision additionally track what incremental re-rendering needs.
+# These events keep the stamps in step with ORM changes; Core-level bulk
+# statements bypass them and must use the helpers in models.data_access.
+
+TEMPLATE_DISPLAY_COLUMNS = ('name', 'description', 'is_public', 'user_id')
+
+@event.listens_for(Template, 'before_insert')
+def hash_template_content(mapper, connection, target):
+    target.content_hash = content_hash(target.content or '')
+
+@event.listens_for(Template, 'before_update')
+def bump_version_on_template_change(mapper, connection, target):
+    state = inspect(target)
+    # Increment in SQL; the loaded value may be stale after placeholder bumps
+    if state.attrs.content.history.has_changes():
+        target.content_hash = content_hash(target.content or '')
+        target.version = Template.__table__.c.version + 1
+        target.layout_version = Template.__table__.c.version + 1
+    elif any(state.attrs[name].history.has_changes() for name in TEMPLATE_DISPLAY_COLUMNS):
+        target.version = Template.__table__.c.version + 1
+
+def bump_template_version(connection, template_id):
+    template_table = Template.__table__
+    connection.execute(
+        template_table.update()
+        .where(template_table.c.id == template_id)
+        .values(version=template_table.c.version + 1)
+    )
+
+def bump_template_layout(connection, template_id):
+    template_table = Template.__table__
+    connection.execute(
+        template_table.update()
+        .where(template_table.c.id == template_id)
+        .values(version=template_table.c.version + 1, layout_version=template_table.c.version + 1)
+    )
+
+def changed_template_ids(target):
+    """Old and new template of a child row whose template_id may have changed"""
+    state = inspect(target)
+    return (set(state.attrs.template_id.history.sum()) | {target.template_id}) - {None}
+
+@event.listens_for(Placeholder, 'after_insert')
+@event.listens_for(Placeholder, 'after_delete')
+def bump_layout_on_placeholder_change(mapper, connection, target):
+    bump_template_layout(connection, target.template_id)
+
+@event.listens_for(Placeholder, 'after_update')
+def bump_version_on_placeholder_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs.name.history.has_changes() or attrs.template_id.history.has_changes():
+        for template_id in changed_template_ids(target):
+            bump_template_layout(connection, template_id)
+    elif attrs.content.history.has_changes():
+        bump_template_version(connection, target.template_id)
+        template_table = Template.__table__
+        placeholder_table = Placeholder.__table__
+        connection.execute(
+            placeholder_table.update()
+            .where(placeholder_table.c.id == target.id)
+            .values(revision=select(template_table.c.version)
+                    .where(template_table.c.id == target.template_id)
+                    .scalar_subquery())
+        )
+    elif attrs.description.history.has_changes() or attrs.example.history.has_changes():
+        bump_template_version(connection, target.template_id)
+
+@event.listens_for(Prompt, 'after_insert')
+@event.listens_for(Prompt, 'after_delete')
+def bump_version_on_prompt_change(mapper, connection, target):
+    bump_template_version(connection, target.template_id)
+
+@event.listens_for(Prompt, 'after_update')
+def bump_version_on_prompt_update(mapper, connection, target):
+    # Completing a prompt does not change anything that is displayed
+    attrs = inspect(target).attrs
+    if any(attrs[name].history.has_changes() for name in ('content', 'order', 'template_id')):
+        for template_id in changed_template_ids(target):
+            bump_template_version(connection, template_id)
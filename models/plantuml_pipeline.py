@@ -0,0 +1,429 @@
+# PlantUML Pipeline Implementation
+#
+# Submitted placeholder content is scanned for PlantUML diagrams, which are
+# syntax-checked on the spot and rendered in the background on a process
+# pool. Rendered output is stored under the hash of the renderer and the
+# diagram source, in memory and on disk, so an unchanged diagram is rendered
+# once no matter how many documents, generations or users include it.
+
+import abc
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(basedir, 'storage', 'diagram_cache')
+
+# ```plantuml / ```puml fenced blocks
+FENCED_BLOCK_PATTERN = re.compile(r'^```[ \t]*(?:plantuml|puml)[ \t]*\n(.*?)^```[ \t]*$',
+                                  re.MULTILINE | re.DOTALL | re.IGNORECASE)
+# Bare @startuml ... @enduml blocks (and the other diagram kinds, e.g. @startmindmap)
+BARE_BLOCK_PATTERN = re.compile(r'^[ \t]*@start(\w+)\b.*?^[ \t]*@end\1\b[^\n]*$',
+                                re.MULTILINE | re.DOTALL)
+START_PATTERN = re.compile(r'^@start(\w+)\b')
+END_PATTERN = re.compile(r'^@end(\w+)\b')
+
+PlantUMLBlock = namedtuple('PlantUMLBlock', ['source', 'start', 'end'])
+Diagram = namedtuple('Diagram', ['key', 'source', 'errors', 'status'])
+
+
+class DiagramRenderError(Exception):
+    """Raised when a renderer cannot produce output for a diagram"""
+
+
+def normalize_source(source):
+    """Canonical form of a diagram, wrapped in @startuml/@enduml when unmarked"""
+    source = source.replace('\r\n', '\n').strip()
+    if not START_PATTERN.match(source):
+        source = f"@startuml\n{source}\n@enduml"
+    return source
+
+
+def extract_plantuml_blocks(content):
+    """Find fenced and bare PlantUML diagrams in Markdown content"""
+    blocks = []
+    fenced_spans = []
+    for match in FENCED_BLOCK_PATTERN.finditer(content):
+        blocks.append(PlantUMLBlock(match.group(1), match.start(), match.end()))
+        fenced_spans.append((match.start(), match.end()))
+    for match in BARE_BLOCK_PATTERN.finditer(content):
+        if not any(start <= match.start() < end for start, end in fenced_spans):
+            blocks.append(PlantUMLBlock(match.group(0), match.start(), match.end()))
+    blocks.sort(key=lambda block: block.start)
+    return blocks
+
+
+def strip_comments_and_strings(line):
+    """Remove quoted strings from a diagram line, and the line itself if it is a ' comment"""
+    if line.lstrip().startswith("'"):
+        return ''
+    return re.sub(r'"[^"]*"', '""', line)
+
+
+def check_plantuml_syntax(source):
+    """
+    Cheap structural checks that catch most broken diagrams without a renderer
+    Returns a list of "line N: message" strings; empty when nothing is wrong.
+    """
+    errors = []
+    lines = normalize_source(source).split('\n')
+    open_kind = None
+    depth = 0
+    body_lines = 0
+    in_block_comment = False
+    for number, raw_line in enumerate(lines, start=1):
+        line = raw_line.strip()
+        if in_block_comment:
+            if "'/" in line:
+                in_block_comment = False
+            continue
+        if line.startswith("/'"):
+            in_block_comment = "'/" not in line[2:]
+            continue
+        start = START_PATTERN.match(line)
+        end = END_PATTERN.match(line)
+        if start:
+            if open_kind is not None:
+                errors.append(f"line {number}: @start{start.group(1)} inside an open @start{open_kind}")
+            open_kind = start.group(1)
+            continue
+        if end:
+            if open_kind is None:
+                errors.append(f"line {number}: @end{end.group(1)} without a matching @start")
+            elif end.group(1) != open_kind:
+                errors.append(f"line {number}: @end{end.group(1)} closes @start{open_kind}")
+            elif depth > 0:
+                errors.append(f"line {number}: {depth} unclosed '{{' before @end{open_kind}")
+            if open_kind is not None and body_lines == 0:
+                errors.append(f"line {number}: empty diagram")
+            open_kind = None
+            depth = 0
+            body_lines = 0
+            continue
+        if open_kind is None:
+            if line:
+                errors.append(f"line {number}: content outside @start/@end")
+            continue
+        code = strip_comments_and_strings(line)
+        if code:
+            body_lines += 1
+        if code.count('"') % 2:
+            errors.append(f"line {number}: unterminated string")
+        for char in code:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth < 0:
+                    errors.append(f"line {number}: unmatched '}}'")
+                    depth = 0
+    if open_kind is not None:
+        errors.append(f"line {len(lines)}: missing @end{open_kind}")
+    return errors
+
+
+# Renderers. Instances are sent to worker processes, so they only hold plain
+# configuration and must be picklable.
+
+class DiagramRenderer(abc.ABC):
+    """Base class for renderers; ``render`` returns the output as bytes"""
+
+    name = 'base'
+    output_format = 'svg'
+    MIME_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'txt': 'text/plain'}
+
+    @property
+    def cache_namespace(self):
+        """Rendered output is only shared between renderers with the same namespace"""
+        return f"{self.name}:{self.output_format}"
+
+    @property
+    def mimetype(self):
+        return self.MIME_TYPES.get(self.output_format, 'application/octet-stream')
+
+    @abc.abstractmethod
+    def render(self, source):
+        """The rendered diagram as bytes; raises DiagramRenderError on failure"""
+
+
+class CommandRenderer(DiagramRenderer):
+    """Render with a local PlantUML installation (``plantuml`` or ``java -jar plantuml.jar``)"""
+
+    name = 'command'
+
+    def __init__(self, command=None, output_format='svg', timeout=60):
+        self.command = list(command or default_plantuml_command() or ['plantuml'])
+        self.output_format = output_format
+        self.timeout = timeout
+
+    def render(self, source):
+        try:
+            completed = subprocess.run(
+                self.command + [f'-t{self.output_format}', '-pipe', '-charset', 'UTF-8'],
+                input=source.encode('utf-8'), capture_output=True, timeout=self.timeout,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise DiagramRenderError(str(e)) from e
+        if completed.returncode != 0:
+            raise DiagramRenderError(completed.stderr.decode('utf-8', 'replace').strip()
+                                     or f"plantuml exited with status {completed.returncode}")
+        return completed.stdout
+
+
+class ServerRenderer(DiagramRenderer):
+    """Render through a PlantUML server, e.g. a local plantuml-server container"""
+
+    name = 'server'
+
+    def __init__(self, url, output_format='svg'):
+        self.url = url.rstrip('/')
+        self.output_format = output_format
+
+    def render(self, source):
+        from plantuml import PlantUML, PlantUMLHTTPError
+
+        try:
+            return PlantUML(url=f"{self.url}/{self.output_format}/").processes(source)
+        except PlantUMLHTTPError as e:
+            raise DiagramRenderError(str(e)) from e
+
+
+class StubRenderer(DiagramRenderer):
+    """Deterministic placeholder SVG, for tests and benchmarks without PlantUML installed"""
+
+    name = 'stub'
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def render(self, source):
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" data-source="{digest}">'
+                f'<text x="0" y="12">{len(source.splitlines())} lines</text></svg>').encode('utf-8')
+
+
+def default_plantuml_command():
+    """The local PlantUML command, from PLANTUML_JAR or the PATH, or None"""
+    jar = os.environ.get('PLANTUML_JAR')
+    if jar:
+        return ['java', '-Djava.awt.headless=true', '-jar', jar]
+    if shutil.which('plantuml'):
+        return ['plantuml']
+    return None
+
+
+def renderer_from_environment():
+    """
+    Select the renderer with PLANTUML_RENDERER: command, server, stub or none
+    By default a local PlantUML installation is used when one is found, and
+    diagrams are only checked, not rendered, otherwise.
+    """
+    choice = os.environ.get('PLANTUML_RENDERER', '').lower()
+    if choice == 'none':
+        return None
+    if choice == 'stub':
+        return StubRenderer()
+    if choice == 'server':
+        return ServerRenderer(os.environ.get('PLANTUML_SERVER_URL', 'http://127.0.0.1:8080'))
+    if choice == 'command' or default_plantuml_command():
+        return CommandRenderer()
+    return None
+
+
+def render_diagram(renderer, source):
+    """Process pool entry point"""
+    return renderer.render(source)
+
+
+class DiagramCache:
+    """Rendered diagrams addressed by content hash, in a memory LRU backed by a directory"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_entries=256):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(renderer, source):
+        return hashlib.sha256(f"{renderer.cache_namespace}\0{source}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return the cached output, or None"""
+        with self._lock:
+            output = self._memory.get(key)
+            if output is not None:
+                self._memory.move_to_end(key)
+                return output
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                output = f.read()
+        except FileNotFoundError:
+            return None
+        self._remember(key, output)
+        return output
+
+    def put(self, key, output):
+        """Store rendered output; files are replaced atomically for concurrent processes"""
+        self._remember(key, output)
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(output)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _remember(self, key, output):
+        with self._lock:
+            self._memory[key] = output
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+
+class PlantUMLPipeline:
+    """Check, render and cache the PlantUML diagrams found in content"""
+
+    def __init__(self, renderer=None, cache=None, max_workers=None, timeout=120):
+        self.renderer = renderer
+        self.cache = cache if cache is not None else DiagramCache()
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self._pool = None
+        # key -> Future of a render in progress, so that concurrent requests
+        # for the same diagram share one render
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Workers are spawned rather than forked: the calling process
+                # runs database and event loop threads whose locks must not be copied
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=get_context('spawn'))
+            return self._pool
+
+    def _submit(self, key, source):
+        """Start rendering a diagram unless it is already in progress"""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+        pool = self._get_pool()
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = pool.submit(render_diagram, self.renderer, source)
+            self._pending[key] = future
+        # Outside the lock: the callback runs immediately if the render already finished
+        future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    def process(self, content, wait=False):
+        """
+        Check every diagram in ``content`` and render the valid, uncached ones
+        Returns a list of Diagram(key, source, errors, status) in document order.
+        ``status`` is one of invalid, cached, queued, rendered, failed, or
+        unrendered when no renderer is configured. With ``wait=False``
+        rendering continues in the background and only warms the cache.
+        """
+        diagrams = []
+        futures = {}
+        for block in extract_plantuml_blocks(content):
+            source = normalize_source(block.source)
+            errors = check_plantuml_syntax(source)
+            if errors:
+                diagrams.append(Diagram(None, source, errors, 'invalid'))
+                continue
+            if self.renderer is None:
+                diagrams.append(Diagram(None, source, [], 'unrendered'))
+                continue
+            key = DiagramCache.key(self.renderer, source)
+            if key not in futures and self.cache.get(key) is not None:
+                diagrams.append(Diagram(key, source, [], 'cached'))
+                continue
+            futures[key] = self._submit(key, source)
+            diagrams.append(Diagram(key, source, [], 'queued'))
+
+        if not wait or not futures:
+            return diagrams
+        results = []
+        for diagram in diagrams:
+            if diagram.status != 'queued':
+                results.append(diagram)
+                continue
+            try:
+                futures[diagram.key].result(timeout=self.timeout)
+                results.append(diagram._replace(status='rendered'))
+            except Exception as e:
+                results.append(diagram._replace(errors=[str(e)], status='failed'))
+        return results
+
+    def get_output(self, source):
+        """Rendered output of a diagram source, rendering it now if needed"""
+        if self.renderer is None:
+            return None
+        source = normalize_source(source)
+        key = DiagramCache.key(self.renderer, source)
+        output = self.cache.get(key)
+        if output is None:
+            output = self._submit(key, source).result(timeout=self.timeout)
+        return output
+
+    def get_rendered(self, key, wait=True):
+        """Rendered output for a cache key, waiting for a render in progress; None if unknown"""
+        output = self.cache.get(key)
+        if output is not None or not wait:
+            return output
+        with self._lock:
+            future = self._pending.get(key)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=self.timeout)
+        except Exception:
+            return None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+plantuml_pipeline = PlantUMLPipeline(
+    renderer=renderer_from_environment(),
+    cache=DiagramCache(os.environ.get('DIAGRAM_CACHE_DIR', DEFAULT_CACHE_DIR)),
+    max_workers=int(os.environ.get('PLANTUML_WORKERS', 0)) or None,
+)
@@ -0,0 +1,321 @@
+# Bulk Template Creation
+#
+# Creates a template with all of its placeholders and prompts in one
+# transaction. Placeholders are discovered from the {{name}} tokens of the
+# content in one scan with the renderer's token pattern and reconciled with the
+# ones the author declared, so listing them by hand is optional. Placeholders
+# and prompts go in as one executemany INSERT each instead of one ORM object
+# (and one version-bump UPDATE from the model events) per row; the template's
+# version stamps are set once afterwards.
+#
+# Catalogues of templates are imported and exported as NDJSON, one template
+# with its placeholders and prompts per line. Both directions work in batches
+# (keyset pages for export, one transaction per batch for import), so memory
+# stays bounded whatever the catalogue size. Imports skip templates whose
+# content hash the owner already has, which makes re-running them harmless.
+
+import json
+from collections import namedtuple
+
+from sqlalchemy import insert, select
+
+from models.models import db, Placeholder, Prompt, Template
+from models.database import begin_immediate
+from models.data_access import bump_template_layouts
+from templates.template_renderer import PLACEHOLDER_PATTERN, content_hash
+
+# Upper bound on the placeholders or prompts of one template
+MAX_TEMPLATE_ITEMS = 10000
+# Templates per import transaction and per export page
+CATALOGUE_BATCH_SIZE = 500
+# Line errors kept in an ImportResult; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+PlaceholderSpec = namedtuple('PlaceholderSpec', ['name', 'description', 'example'])
+PlaceholderPlan = namedtuple('PlaceholderPlan', ['placeholders', 'undeclared', 'unused'])
+CreatedTemplate = namedtuple('CreatedTemplate', ['template_id', 'placeholder_count', 'prompt_count',
+                                                 'undeclared', 'unused'])
+ImportResult = namedtuple('ImportResult', ['imported', 'skipped', 'failed', 'errors'])
+
+
+def parse_placeholder_lines(text):
+    """
+    Declared placeholders from the web form, one ``name:description`` per line
+    A bare ``name`` declares a placeholder without a description.
+    """
+    declared = []
+    for line in (text or '').splitlines():
+        name, _, description = line.partition(':')
+        if name.strip():
+            declared.append(PlaceholderSpec(name.strip(), description.strip(), None))
+    return declared
+
+
+def parse_prompt_lines(text):
+    """Prompts from the web form, one per non-empty line"""
+    return [line.strip() for line in (text or '').splitlines() if line.strip()]
+
+
+def plan_placeholders(content, declared=()):
+    """
+    Reconcile the placeholders found in ``content`` with the ``declared`` ones
+    Every distinct name in the content becomes a placeholder, in order of
+    first appearance, named exactly as written so that it renders; a
+    declaration matching it (ignoring surrounding spaces) supplies the
+    description and example. Declared names missing from the content are
+    kept after them. ``undeclared`` lists the names found without a
+    declaration and ``unused`` the declared names the content does not use.
+    """
+    declarations = {}
+    for spec in declared:
+        declarations.setdefault(spec.name.strip(), spec)
+
+    placeholders = []
+    undeclared = []
+    found = set()
+    # Only the distinct names are needed, not the literal segments between them
+    for name in dict.fromkeys(PLACEHOLDER_PATTERN.findall(content)):
+        key = name.strip()
+        if not key:
+            continue
+        found.add(key)
+        spec = declarations.get(key)
+        if spec is None:
+            undeclared.append(name)
+            placeholders.append(PlaceholderSpec(name, '', None))
+        else:
+            placeholders.append(PlaceholderSpec(name, spec.description or '', spec.example))
+
+    unused = [key for key in declarations if key not in found]
+    placeholders.extend(PlaceholderSpec(key, declarations[key].description or '', declarations[key].example)
+                        for key in unused)
+    return PlaceholderPlan(placeholders, undeclared, unused)
+
+
+def placeholder_rows(template_id, placeholders):
+    return [{'name': spec.name, 'description': spec.description, 'example': spec.example,
+             'template_id': template_id, 'revision': 0} for spec in placeholders]
+
+
+def prompt_rows(template_id, prompts):
+    return [{'order': order, 'content': prompt, 'template_id': template_id, 'completed': False}
+            for order, prompt in enumerate(prompts)]
+
+
+def insert_children(session, placeholders, prompts):
+    """Insert placeholder and prompt rows with one executemany statement each"""
+    if placeholders:
+        session.execute(Placeholder.__table__.insert(), placeholders)
+    if prompts:
+        session.execute(Prompt.__table__.insert(), prompts)
+
+
+def create_template_bulk(user_id, name, content, description='', is_public=False, declared=(), prompts=(),
+                         session=None):
+    """
+    Create a template with its discovered and declared placeholders and its prompts
+    One transaction: the template row, one executemany INSERT for the
+    placeholders, one for the prompts and one version stamp update. Raises
+    ValueError when the template would exceed MAX_TEMPLATE_ITEMS placeholders
+    or prompts.
+    """
+    session = session or db.session
+    plan = plan_placeholders(content, declared)
+    prompts = [prompt for prompt in prompts if prompt]
+    if len(plan.placeholders) > MAX_TEMPLATE_ITEMS or len(prompts) > MAX_TEMPLATE_ITEMS:
+        raise ValueError(f'Too many placeholders or prompts, at most {MAX_TEMPLATE_ITEMS} each')
+
+    try:
+        template = Template(name=name, content=content, description=description, user_id=user_id,
+                            is_public=bool(is_public))
+        session.add(template)
+        session.flush()
+        template_id = template.id
+
+        # Core inserts skip the per-row model events; the stamps are bumped once below
+        insert_children(session, placeholder_rows(template_id, plan.placeholders), prompt_rows(template_id, prompts))
+        bump_template_layouts([template_id], session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return CreatedTemplate(template_id, len(plan.placeholders), len(prompts), plan.undeclared, plan.unused)
+
+
+def parse_catalogue_record(line):
+    """
+    Validate one NDJSON catalogue line
+    Returns (template row without its owner, placeholder plan, prompts);
+    raises ValueError describing what is wrong with the line.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f'Invalid JSON: {e}')
+    if not isinstance(record, dict):
+        raise ValueError('A line must hold a JSON object')
+    name = record.get('name')
+    content = record.get('content')
+    if not isinstance(name, str) or not name.strip() or not isinstance(content, str) or not content:
+        raise ValueError('"name" and "content" are required strings')
+    description = record.get('description') or ''
+    placeholders = record.get('placeholders') or []
+    prompts = record.get('prompts') or []
+    if not isinstance(description, str) or not isinstance(placeholders, list) or not isinstance(prompts, list):
+        raise ValueError('"description" must be a string, "placeholders" and "prompts" lists')
+
+    declared = []
+    for item in placeholders:
+        if not isinstance(item, dict) or not isinstance(item.get('name'), str) or not item['name'].strip():
+            raise ValueError('Every placeholder needs a name')
+        example = item.get('example')
+        declared.append(PlaceholderSpec(item['name'].strip(), str(item.get('description') or ''),
+                                        None if example is None else str(example)))
+    if any(not isinstance(prompt, str) for prompt in prompts):
+        raise ValueError('Prompts must be strings')
+    prompts = [prompt.strip() for prompt in prompts if prompt.strip()]
+
+    plan = plan_placeholders(content, declared)
+    if len(plan.placeholders) > MAX_TEMPLATE_ITEMS or len(prompts) > MAX_TEMPLATE_ITEMS:
+        raise ValueError(f'Too many placeholders or prompts, at most {MAX_TEMPLATE_ITEMS} each')
+    row = {'name': name.strip(), 'content': content, 'description': description,
+           'is_public': bool(record.get('is_public', False)), 'content_hash': content_hash(content),
+           # Created with its placeholders and prompts, like create_template_bulk
+           'version': 1, 'layout_version': 1}
+    return row, plan, prompts
+
+
+def import_batch(user_id, entries, session):
+    """
+    Insert one batch of parsed records in a single transaction
+    ``entries`` holds distinct content hashes; the ones the owner already has
+    are skipped. Returns the number of templates inserted.
+    """
+    hashes = [row['content_hash'] for row, _, _ in entries]
+    try:
+        # Hold the write lock from the existence check to the commit, so that a
+        # concurrent import cannot add the same hashes in between and the
+        # hash -> id lookup below finds exactly the rows inserted here
+        begin_immediate(session)
+        existing = set(session.execute(
+            select(Template.content_hash)
+            .where(Template.user_id == user_id, Template.content_hash.in_(hashes))
+        ).scalars())
+        entries = [entry for entry in entries if entry[0]['content_hash'] not in existing]
+        if entries:
+            session.execute(insert(Template.__table__), [{**row, 'user_id': user_id} for row, _, _ in entries])
+            # One executemany and one lookup; RETURNING in parameter order would
+            # make SQLAlchemy insert the rows one statement at a time
+            template_ids = dict(session.execute(
+                select(Template.content_hash, Template.id)
+                .where(Template.user_id == user_id,
+                       Template.content_hash.in_([row['content_hash'] for row, _, _ in entries]))
+            ).all())
+            placeholders = []
+            prompts = []
+            for row, plan, template_prompts in entries:
+                template_id = template_ids[row['content_hash']]
+                placeholders.extend(placeholder_rows(template_id, plan.placeholders))
+                prompts.extend(prompt_rows(template_id, template_prompts))
+            insert_children(session, placeholders, prompts)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return len(entries)
+
+
+def import_catalogue(lines, user_id, batch_size=CATALOGUE_BATCH_SIZE, session=None):
+    """
+    Import NDJSON catalogue lines as templates owned by ``user_id``
+    ``lines`` may be any iterable of str or bytes, such as an open file or a
+    request stream; it is consumed as it is read. Every ``batch_size``
+    templates are committed together. Templates whose content the owner
+    already has, in the database or earlier in the input, are skipped, as are
+    blank lines. Invalid lines are counted as failed, with the first
+    MAX_REPORTED_ERRORS kept as (line number, message) pairs.
+    """
+    session = session or db.session
+    imported = skipped = failed = 0
+    errors = []
+    batch = {}
+
+    def flush():
+        nonlocal imported, skipped
+        inserted = import_batch(user_id, list(batch.values()), session)
+        imported += inserted
+        skipped += len(batch) - inserted
+        batch.clear()
+
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            entry = parse_catalogue_record(line)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((number, str(e)))
+            continue
+        if entry[0]['content_hash'] in batch:
+            skipped += 1
+            continue
+        batch[entry[0]['content_hash']] = entry
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return ImportResult(imported, skipped, failed, errors)
+
+
+def export_catalogue(criteria, batch_size=CATALOGUE_BATCH_SIZE, session=None):
+    """
+    Yield the templates matching ``criteria`` as NDJSON lines, oldest first
+    Templates are read in keyset pages of ``batch_size`` with their
+    placeholders and prompts loaded by one query each per page. Submitted
+    placeholder content and prompt progress are not exported.
+    """
+    session = session or db.session
+    after_id = 0
+    while True:
+        templates = session.execute(
+            select(Template.id, Template.name, Template.description, Template.content, Template.is_public)
+            .where(*criteria, Template.id > after_id)
+            .order_by(Template.id)
+            .limit(batch_size)
+        ).all()
+        if not templates:
+            return
+        template_ids = [template.id for template in templates]
+        placeholders = {}
+        for row in session.execute(
+            select(Placeholder.template_id, Placeholder.name, Placeholder.description, Placeholder.example)
+            .where(Placeholder.template_id.in_(template_ids))
+            .order_by(Placeholder.template_id, Placeholder.id)
+        ):
+            item = {'name': row.name, 'description': row.description or ''}
+            if row.example is not None:
+                item['example'] = row.example
+            placeholders.setdefault(row.template_id, []).append(item)
+        prompts = {}
+        for row in session.execute(
+            select(Prompt.template_id, Prompt.content)
+            .where(Prompt.template_id.in_(template_ids))
+            .order_by(Prompt.template_id, Prompt.order)
+        ):
+            prompts.setdefault(row.template_id, []).append(row.content)
+
+        for template in templates:
+            record = {
+                'name': template.name,
+                'description': template.description or '',
+                'content': template.content,
+                'is_public': bool(template.is_public),
+                'placeholders': placeholders.get(template.id, []),
+                'prompts': prompts.get(template.id, []),
+            }
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+        after_id = template_ids[-1]
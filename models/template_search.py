@@ -0,0 +1,218 @@
+# Template Search and Paginated Listings
+#
+# Listings use keyset pagination (newest first, continuing below the last id
+# seen) so that every page costs the same no matter how deep it is. Search
+# runs on the template_fts FTS5 table created by migration 0005, which
+# triggers keep in sync with the template table. The trigram tokenizer
+# matches substrings, so Chinese text without word boundaries is searchable;
+# terms shorter than three characters fall back to LIKE. Listing rows leave
+# out the content and bring the owner's name and placeholder count along, so a
+# page is one statement whatever the size of its templates.
+
+import base64
+import json
+from collections import namedtuple
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import configure_mappers, joinedload, load_only, raiseload, with_expression
+
+from models.models import db, Placeholder, Template, User
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TRIGRAM_MIN_LENGTH = 3
+SNIPPET_TOKENS = 16
+
+template_fts = table('template_fts', column('rowid'), column('name'), column('description'), column('content'))
+
+SearchResult = namedtuple('SearchResult', ['template_id', 'name', 'description', 'owner_id', 'is_public', 'snippet'])
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def page_size(limit):
+    """Clamp a requested page size"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decode an opaque cursor into ``size`` values; raises ValueError when invalid"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+# Databases known to have the FTS table; a missing table is re-checked each
+# time because migrations may create it while the process runs
+_fts_databases = set()
+
+
+def fts_available(session=None):
+    """Whether the template_fts table exists (it needs SQLite with FTS5)"""
+    session = session or db.session
+    database = str(session.get_bind().url)
+    if database in _fts_databases:
+        return True
+    row = session.execute(
+        select(literal_column('1')).select_from(table('sqlite_master'))
+        .where(literal_column('type') == 'table', literal_column('name') == 'template_fts')
+    ).first()
+    if row is not None:
+        _fts_databases.add(database)
+    return row is not None
+
+
+def split_terms(query):
+    """Split a search query into long (FTS) and short (LIKE) terms"""
+    terms = [term for term in (query or '').split() if term]
+    long_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+    short_terms = [term for term in terms if len(term) < TRIGRAM_MIN_LENGTH]
+    return long_terms, short_terms
+
+
+def fts_match_expression(terms):
+    """FTS5 query matching every term as a literal phrase"""
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def term_filter(term):
+    """Case-insensitive substring match of one term in name, description or content"""
+    pattern = like_pattern(term)
+    return or_(*(field.like(pattern, escape='\\')
+                 for field in (Template.name, Template.description, Template.content)))
+
+
+def visible_to(user_id):
+    """Templates a user may find: public ones and their own"""
+    return or_(Template.is_public == True, Template.user_id == user_id)  # noqa: E712
+
+
+def placeholder_count_expression():
+    """Number of placeholders of the outer Template row, counted from ix_placeholder_template_id"""
+    return (
+        select(func.count(Placeholder.id))
+        .where(Placeholder.template_id == Template.id)
+        .correlate(Template)
+        .scalar_subquery()
+    )
+
+
+def listing_options():
+    """
+    Loader options for listing cards
+    Only the columns a card shows are loaded; the owner is joined and the
+    placeholder count is computed in the same statement. Anything else raises
+    instead of silently issuing one query per row.
+    """
+    # Template.user is a backref, which exists once the mappers are configured
+    configure_mappers()
+    return (
+        load_only(Template.id, Template.name, Template.description, Template.is_public,
+                  Template.user_id, Template.version, raiseload=True),
+        joinedload(Template.user).load_only(User.id, User.username, raiseload=True),
+        with_expression(Template.placeholder_count, placeholder_count_expression()),
+        raiseload(Template.placeholders),
+        raiseload(Template.prompts),
+    )
+
+
+def listing_page(criteria, limit=DEFAULT_PAGE_SIZE, cursor=None, session=None, options=()):
+    """
+    One page of Template rows matching ``criteria``, newest first
+    Returns a Page whose ``next_cursor`` continues below the last row, or is
+    None on the last page.
+    """
+    session = session or db.session
+    limit = page_size(limit)
+    query = session.query(Template).options(*options).filter(*criteria)
+    if cursor:
+        (before_id,) = decode_cursor(cursor, 1)
+        if not isinstance(before_id, int):
+            raise ValueError('Invalid cursor')
+        query = query.filter(Template.id < before_id)
+    rows = query.order_by(Template.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return Page(rows[:limit], next_cursor)
+
+
+def search_statement(user_id, query, limit, cursor=None, use_fts=True):
+    """
+    Search statement over the templates visible to ``user_id``
+    With FTS, rows are ranked by bm25 and the cursor is (rank, id); with LIKE
+    only, rows are ordered newest first and the cursor is (None, id).
+    """
+    long_terms, short_terms = split_terms(query)
+    if not use_fts:
+        short_terms, long_terms = long_terms + short_terms, []
+    criteria = [visible_to(user_id)] + [term_filter(term) for term in short_terms]
+    columns = [Template.id, Template.name, Template.description, Template.user_id, Template.is_public]
+    after_rank, after_id = cursor or (None, None)
+
+    if long_terms:
+        match = literal_column('template_fts').op('MATCH')(fts_match_expression(long_terms))
+        rank = func.bm25(literal_column('template_fts'))
+        # Rank and page in a subquery so that snippets are only built for the page
+        ranked = (
+            select(Template.id.label('id'), rank.label('rank'))
+            .select_from(template_fts)
+            .join(Template, Template.id == template_fts.c.rowid)
+            .where(match, *criteria)
+        )
+        if after_id is not None:
+            ranked = ranked.where(or_(
+                rank > after_rank,
+                and_(rank == after_rank, Template.id > after_id),
+            ))
+        ranked = ranked.order_by(rank, Template.id).limit(limit + 1).subquery()
+        snippet = func.snippet(literal_column('template_fts'), -1, '[', ']', '…', SNIPPET_TOKENS)
+        return (
+            select(*columns, snippet, ranked.c.rank)
+            .select_from(ranked)
+            .join(template_fts, template_fts.c.rowid == ranked.c.id)
+            .join(Template, Template.id == ranked.c.id)
+            .where(match)
+            .order_by(ranked.c.rank, ranked.c.id)
+        )
+
+    statement = select(*columns, literal_column("''"), literal_column('NULL')).where(*criteria)
+    if after_id is not None:
+        statement = statement.where(Template.id < after_id)
+    return statement.order_by(Template.id.desc()).limit(limit + 1)
+
+
+def search_templates(user_id, query, limit=DEFAULT_PAGE_SIZE, cursor=None, session=None):
+    """
+    Find templates visible to ``user_id`` whose name, description or content contain every term
+    Returns a Page of SearchResult; raises ValueError for an invalid cursor.
+    """
+    session = session or db.session
+    limit = page_size(limit)
+    position = None
+    if cursor:
+        after_rank, after_id = decode_cursor(cursor, 2)
+        if not (after_rank is None or isinstance(after_rank, (int, float))) or not isinstance(after_id, int):
+            raise ValueError('Invalid cursor')
+        position = (after_rank, after_id)
+    statement = search_statement(user_id, query, limit, position, use_fts=fts_available(session))
+    rows = session.execute(statement).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[6], last[0])
+    return Page([SearchResult(*row[:6]) for row in rows[:limit]], next_cursor)
@@ -0,0 +1,188 @@
+# Request and Tool Instrumentation
+#
+# Records call counts, errors and latency of the MCP tools and the web routes,
+# and the number and duration of the SQL statements each of them issues. The
+# tool call or request in progress is kept in a context variable, which the
+# SQLAlchemy engine events read to attribute every statement; db_executor
+# carries the context into its worker threads.
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+from monitoring.metrics import CONTENT_TYPE, registry
+
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+
+TOOL_CALLS = registry.counter(
+    'designmaster_mcp_tool_calls_total', 'MCP tool calls', ('tool',))
+TOOL_ERRORS = registry.counter(
+    'designmaster_mcp_tool_errors_total', 'MCP tool calls that returned an error or raised', ('tool',))
+TOOL_DURATION = registry.histogram(
+    'designmaster_mcp_tool_duration_seconds', 'MCP tool call latency', ('tool',))
+HTTP_REQUESTS = registry.counter(
+    'designmaster_http_requests_total', 'Web requests by route, method and status', ('route', 'method', 'status'))
+HTTP_ERRORS = registry.counter(
+    'designmaster_http_request_errors_total', 'Web requests that failed with a 5xx status', ('route', 'method'))
+HTTP_DURATION = registry.histogram(
+    'designmaster_http_request_duration_seconds', 'Web request latency', ('route', 'method'))
+SQL_STATEMENTS = registry.counter(
+    'designmaster_sql_statements_total', 'SQL statements executed, by the tool or route that issued them',
+    ('scope', 'name'))
+SQL_DURATION = registry.histogram(
+    'designmaster_sql_statement_duration_seconds', 'SQL statement execution time', ('scope', 'name'))
+SQL_PER_CALL = registry.histogram(
+    'designmaster_sql_statements_per_call', 'SQL statements issued by one tool call or request',
+    ('scope', 'name'), buckets=SQL_COUNT_BUCKETS)
+
+
+class CallScope:
+    """The tool call or web request in progress, and the SQL it has issued so far"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # Per-statement details, kept only while the SQL profiler is enabled
+        self.profile = None
+
+
+_current_scope = contextvars.ContextVar('designmaster_call_scope', default=None)
+
+# Callables run with every CallScope when its tool call or request ends
+scope_finishers = []
+
+
+def finish_scope(scope):
+    """Record the statements of a finished call and run the scope finishers"""
+    SQL_PER_CALL.labels(scope.kind, scope.name).observe(scope.statements)
+    for finisher in scope_finishers:
+        finisher(scope)
+
+
+def current_scope():
+    """The CallScope of the running tool call or request, or None"""
+    return _current_scope.get()
+
+
+@contextmanager
+def call_scope(kind, name):
+    """Attribute SQL issued inside the block to ``kind``/``name``"""
+    scope = CallScope(kind, name)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+        finish_scope(scope)
+
+
+def instrument_tool(func):
+    """
+    Decorator for async MCP tools recording calls, errors and latency
+    A tool result carrying an "error" key counts as an error, like an exception.
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            with call_scope('tool', tool):
+                result = await func(*args, **kwargs)
+            failed = isinstance(result, dict) and 'error' in result
+            return result
+        finally:
+            TOOL_CALLS.labels(tool).inc()
+            if failed:
+                TOOL_ERRORS.labels(tool).inc()
+            TOOL_DURATION.labels(tool).observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_statement_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_statement_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    scope = _current_scope.get()
+    kind, name = (scope.kind, scope.name) if scope is not None else ('none', '')
+    SQL_STATEMENTS.labels(kind, name).inc()
+    SQL_DURATION.labels(kind, name).observe(elapsed)
+    if scope is not None:
+        scope.statements += 1
+        scope.sql_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None:
+        starts = connection.info.get('metrics_statement_start')
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every SQL statement an engine executes"""
+    # Imported here so that the MCP server can start without SQLAlchemy
+    from sqlalchemy import event
+
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+
+
+def init_metrics(app, db):
+    """Instrument a Flask app's routes and database engine and serve /metrics"""
+    from flask import Response, g, request
+
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.metrics_scope = CallScope('route', g.metrics_route)
+        g.metrics_token = _current_scope.set(g.metrics_scope)
+
+    @app.after_request
+    def record_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        token = g.pop('metrics_token', None)
+        if token is None:
+            return
+        _current_scope.reset(token)
+        route, method = g.metrics_route, request.method
+        status = 500 if exc is not None else g.get('metrics_status', 500)
+        HTTP_REQUESTS.labels(route, method, status).inc()
+        if status >= 500:
+            HTTP_ERRORS.labels(route, method).inc()
+        HTTP_DURATION.labels(route, method).observe(time.perf_counter() - g.metrics_start)
+        finish_scope(g.metrics_scope)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+async def metrics_endpoint(request):
+    """Starlette endpoint serving /metrics on the MCP HTTP and SSE transports"""
+    from starlette.responses import Response
+
+    return Response(registry.render(), media_type=CONTENT_TYPE)
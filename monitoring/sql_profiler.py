@@ -0,0 +1,175 @@
+# SQL Profiler Implementation
+#
+# Opt-in companion to the metrics: instead of aggregates it shows what ran.
+# Statements slower than a threshold are logged with their bound parameters
+# and the line of project code that issued them, and a tool call or request
+# that runs the same statement many times is reported as a suspected N+1.
+# Statements are grouped per call through the CallScope of
+# monitoring.instrumentation, so it covers both the web routes and the MCP
+# tools. Enable it with SQL_PROFILE=1; it costs a stack walk per distinct
+# statement per call, so it is off by default.
+
+import logging
+import os
+import time
+import traceback
+from collections import OrderedDict, deque
+
+from sqlalchemy import event
+
+from monitoring.instrumentation import current_scope, scope_finishers
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONITORING_DIR = os.path.join(ROOT, 'monitoring')
+MAX_PARAMETERS_LENGTH = 500
+MAX_STATEMENT_LENGTH = 300
+
+
+def statement_origin():
+    """``path:line in function`` of the innermost project frame outside this package"""
+    for frame in reversed(traceback.extract_stack()):
+        # Skip generated code such as "<sqlalchemy generated cache() wrapper>"
+        if frame.filename.startswith('<'):
+            continue
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(ROOT + os.sep) and not filename.startswith(MONITORING_DIR + os.sep)
+                and 'site-packages' not in filename):
+            return f"{os.path.relpath(filename, ROOT)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+def shorten(text, limit):
+    text = ' '.join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+class StatementStats:
+    """Executions of one statement within one call"""
+
+    def __init__(self, statement, origin):
+        self.statement = statement
+        self.origin = origin
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+class CallProfile:
+    """The statements run by one tool call or request, in first-execution order"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.statements = OrderedDict()
+
+    def record(self, statement, elapsed):
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = StatementStats(statement, statement_origin())
+        stats.count += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        return stats
+
+    def repeated(self, threshold):
+        """Statements executed at least ``threshold`` times"""
+        return [stats for stats in self.statements.values() if stats.count >= threshold]
+
+    def summary(self):
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'statements': sum(stats.count for stats in self.statements.values()),
+            'distinct_statements': len(self.statements),
+            'sql_ms': sum(stats.total_seconds for stats in self.statements.values()) * 1000,
+            'top': [
+                {'statement': shorten(stats.statement, MAX_STATEMENT_LENGTH), 'count': stats.count,
+                 'total_ms': stats.total_seconds * 1000, 'origin': stats.origin}
+                for stats in sorted(self.statements.values(), key=lambda s: s.total_seconds, reverse=True)[:5]
+            ],
+        }
+
+
+class SQLProfiler:
+    """
+    Slow-statement log and N+1 detector driven by SQLAlchemy cursor events
+    ``slow_ms`` is the threshold for logging a statement; ``repeat_threshold``
+    is how many executions of the same statement in one call count as N+1.
+    The summaries of the last ``keep`` calls are kept for inspection.
+    """
+
+    def __init__(self, enabled=False, slow_ms=100.0, repeat_threshold=10, keep=50):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.slow_statements = 0
+        self.suspected_n_plus_one = 0
+        self._recent = deque(maxlen=keep)
+
+    @classmethod
+    def from_environment(cls):
+        return cls(
+            enabled=os.environ.get('SQL_PROFILE', '').lower() in ('1', 'true', 'yes', 'on'),
+            slow_ms=float(os.environ.get('SQL_SLOW_QUERY_MS', 100)),
+            repeat_threshold=int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10)),
+        )
+
+    def install(self, engine):
+        """Profile an engine's statements, when the profiler is enabled"""
+        if not self.enabled:
+            return
+        for name, listener in (('before_cursor_execute', self._before_cursor_execute),
+                               ('after_cursor_execute', self._after_cursor_execute),
+                               ('handle_error', self._handle_error)):
+            if not event.contains(engine, name, listener):
+                event.listen(engine, name, listener)
+        if self.finish not in scope_finishers:
+            scope_finishers.append(self.finish)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_statement_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profiler_statement_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        scope = current_scope()
+        if scope is not None:
+            if scope.profile is None:
+                scope.profile = CallProfile(scope.kind, scope.name)
+            scope.profile.record(statement, elapsed)
+        if elapsed * 1000 >= self.slow_ms:
+            self.slow_statements += 1
+            where = f"{scope.kind} {scope.name}" if scope is not None else "no tool call or request"
+            logger.warning("Slow SQL (%.1f ms) in %s from %s: %s | parameters: %s",
+                           elapsed * 1000, where, statement_origin(),
+                           shorten(statement, MAX_STATEMENT_LENGTH), shorten(repr(parameters), MAX_PARAMETERS_LENGTH))
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None:
+            starts = connection.info.get('profiler_statement_start')
+            if starts:
+                starts.pop()
+
+    def finish(self, scope):
+        """Report statements repeated within a finished call and keep its summary"""
+        profile = scope.profile
+        if profile is None:
+            return
+        for stats in profile.repeated(self.repeat_threshold):
+            self.suspected_n_plus_one += 1
+            logger.warning("Possible N+1 in %s %s: %d executions (%.1f ms) of a statement issued from %s: %s",
+                           profile.kind, profile.name, stats.count, stats.total_seconds * 1000,
+                           stats.origin, shorten(stats.statement, MAX_STATEMENT_LENGTH))
+        self._recent.append(profile.summary())
+
+    def recent(self):
+        """Summaries of the most recently finished calls, oldest first"""
+        return list(self._recent)
+
+
+sql_profiler = SQLProfiler.from_environment()
@@ -2,24 +2,44 @@
 """
 启动脚本，同时启动主Web服务和MCP服务
 支持多种传输方式：STDIO、SSE、StreamableHTTP
+生产模式 (--workers N)：启动N个Web工作进程和N个MCP HTTP工作进程，通过SO_REUSEPORT共享端口，
+由监督进程做健康检查，并以指数退避重启崩溃或无响应的工作进程
+各服务的输出由后台线程持续读取，按服务名和PID标记后写入滚动的JSON Lines日志文件 (默认: logs/services.log)
 """
 
 import subprocess
 import sys
 import time
 import argparse
+import logging
 import os
+import signal
 
-def start_main_web_service():
+from workers.log_pipeline import LogPipeline, PipelineHandler, child_output_env
+from workers.serving import reuse_port_supported
+from workers.supervisor import Supervisor, WorkerSpec
+
+def start_main_web_service(log_pipeline):
     """启动主Web服务"""
     print("正在启动主Web服务...")
     web_process = subprocess.Popen([sys.executable, "app.py"], 
                                   stdout=subprocess.PIPE, 
                                   stderr=subprocess.PIPE,
-                                  text=True)
+                                  env=child_output_env())
+    # 持续读取输出，避免管道写满后服务阻塞
+    log_pipeline.attach(web_process, "web")
     return web_process
 
-def start_mcp_service(transport="stdio", host="127.0.0.1", port=8000):
+def mcp_command(transport, host, port):
+    """构建MCP服务的命令参数"""
+    cmd = [sys.executable, "mcp_service.py"]
+    
+    if transport in ("sse", "http", "streamable-http"):
+        cmd.extend([f"--{transport}", "--host", host, "--port", str(port)])
+    # stdio模式不需要额外参数
+    return cmd
+
+def start_mcp_service(log_pipeline, transport="http", host="127.0.0.1", port=8000):
     """启动MCP服务"""
     print(f"正在启动MCP服务 (传输方式: {transport})...")
     
@@ -30,32 +50,93 @@ def start_mcp_service(transport="stdio", host="127.0.0.1", port=8000):
     env['MCP_PORT'] = str(port)
     env['WEB_PORT'] = '5000'  # 默认Web端口
     
-    # 构建命令参数
-    cmd = [sys.executable, "mcp_service.py"]
-    
-    if transport == "sse":
-        cmd.extend(["--sse", "--host", host, "--port", str(port)])
-    elif transport == "http":
-        cmd.extend(["--http", "--host", host, "--port", str(port)])
-    elif transport == "streamable-http":
-        cmd.extend(["--streamable-http", "--host", host, "--port", str(port)])
-    # stdio模式不需要额外参数
+    cmd = mcp_command(transport, host, port)
     
     mcp_process = subprocess.Popen(cmd,
                                   stdout=subprocess.PIPE, 
                                   stderr=subprocess.PIPE,
-                                  text=True,
-                                  env=env)
+                                  env=child_output_env(env))
+    log_pipeline.attach(mcp_process, "mcp")
     return mcp_process
 
+def run_workers(args, parser, log_pipeline):
+    """生产模式：在监督进程下运行多个Web和MCP工作进程"""
+    web_workers = 0 if args.no_web else (args.web_workers if args.web_workers is not None else args.workers)
+    mcp_workers = 0 if args.no_mcp else (args.mcp_workers if args.mcp_workers is not None else args.workers)
+    if web_workers < 0 or mcp_workers < 0:
+        parser.error("工作进程数不能为负数")
+    if not reuse_port_supported():
+        parser.error("生产模式需要支持SO_REUSEPORT的系统 (例如Linux)")
+    if mcp_workers and args.mcp_transport == "stdio":
+        parser.error("STDIO模式的MCP服务由IDE启动；生产模式请使用 --mcp-transport http/streamable-http，或 --no-mcp")
+    if mcp_workers > 1 and args.mcp_transport == "sse":
+        # SSE会话保存在单个进程中，无法在多个进程间共享
+        print("SSE传输方式只支持单个MCP工作进程，已改为1个")
+        mcp_workers = 1
+    
+    # 监督进程自身的日志也写入同一个日志文件
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(PipelineHandler(log_pipeline))
+    
+    specs = []
+    if web_workers:
+        specs.append(WorkerSpec("web", [sys.executable, "app.py", "--worker",
+                                        "--host", args.web_host, "--port", str(args.web_port)],
+                                count=web_workers))
+    if mcp_workers:
+        cmd = mcp_command(args.mcp_transport, args.mcp_host, args.mcp_port)
+        if args.mcp_transport != "sse":
+            cmd.append("--reuse-port")
+        specs.append(WorkerSpec("mcp", cmd, count=mcp_workers))
+    if not specs:
+        print("没有启动任何服务")
+        return
+    
+    print("=" * 50)
+    print("DesignMaster 服务启动器 (生产模式)")
+    print("=" * 50)
+    
+    # 相对路径 (app.py、mcp_service.py) 以本脚本所在目录为准
+    supervisor = Supervisor(specs, cwd=os.path.dirname(os.path.abspath(__file__)), log_pipeline=log_pipeline)
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.request_stop())
+    supervisor.start()
+    
+    print("\n" + "=" * 50)
+    print("服务信息:")
+    print("=" * 50)
+    if web_workers:
+        print(f"主Web服务: http://{args.web_host}:{args.web_port} ({web_workers} 个工作进程)")
+    if mcp_workers:
+        print(f"MCP服务: http://{args.mcp_host}:{args.mcp_port} "
+              f"(传输方式: {args.mcp_transport.upper()}, {mcp_workers} 个工作进程)")
+    print("崩溃或健康检查失败的工作进程会被自动重启")
+    print(f"日志文件: {log_pipeline.path}")
+    print("按 Ctrl+C 停止所有服务")
+    print("=" * 50)
+    
+    supervisor.run()
+    print("所有服务已停止")
+
 def main():
     parser = argparse.ArgumentParser(description="启动DesignMaster服务")
     parser.add_argument("--mcp-transport", choices=["stdio", "sse", "http", "streamable-http"], 
-                       default="stdio", help="MCP服务传输方式 (默认: stdio)")
+                       default="http", help="MCP服务传输方式 (默认: http；stdio模式由IDE启动MCP服务，这里不启动)")
     parser.add_argument("--mcp-host", default="127.0.0.1", help="MCP服务主机地址 (默认: 127.0.0.1)")
     parser.add_argument("--mcp-port", type=int, default=8000, help="MCP服务端口 (默认: 8000)")
     parser.add_argument("--no-web", action="store_true", help="不启动主Web服务")
     parser.add_argument("--no-mcp", action="store_true", help="不启动MCP服务")
+    parser.add_argument("--workers", type=int, default=0,
+                       help="生产模式：Web和MCP各启动N个工作进程 (默认: 0，即单进程开发模式)")
+    parser.add_argument("--web-workers", type=int, help="生产模式下的Web工作进程数 (默认: 同 --workers)")
+    parser.add_argument("--mcp-workers", type=int, help="生产模式下的MCP工作进程数 (默认: 同 --workers)")
+    parser.add_argument("--web-host", default="0.0.0.0", help="生产模式下Web服务主机地址 (默认: 0.0.0.0)")
+    parser.add_argument("--web-port", type=int, default=5000, help="生产模式下Web服务端口 (默认: 5000)")
+    parser.add_argument("--log-dir", default="logs", help="服务日志目录 (默认: logs)")
+    parser.add_argument("--log-max-bytes", type=int, default=10 * 1024 * 1024,
+                       help="单个日志文件的最大字节数，超过后滚动 (默认: 10MB)")
+    parser.add_argument("--log-backups", type=int, default=5, help="保留的旧日志文件数 (默认: 5)")
+    parser.add_argument("--quiet", action="store_true", help="不在终端显示服务输出，只写入日志文件")
     
     args = parser.parse_args()
     
@@ -63,8 +144,20 @@ def main():
     os.environ['MCP_TRANSPORT'] = args.mcp_transport
     os.environ['MCP_HOST'] = args.mcp_host
     os.environ['MCP_PORT'] = str(args.mcp_port)
-    os.environ['WEB_PORT'] = '5000'  # 默认Web端口
+    os.environ['WEB_PORT'] = str(args.web_port) if args.workers else '5000'  # 默认Web端口
     
+    log_pipeline = LogPipeline(args.log_dir, max_bytes=args.log_max_bytes, backup_count=args.log_backups,
+                               echo=not args.quiet)
+    try:
+        if args.workers or args.web_workers or args.mcp_workers:
+            run_workers(args, parser, log_pipeline)
+        else:
+            run_services(args, log_pipeline)
+    finally:
+        log_pipeline.close()
+
+def run_services(args, log_pipeline):
+    """开发模式：Web服务和MCP服务各启动一个进程"""
     print("=" * 50)
     print("DesignMaster 服务启动器")
     print("=" * 50)
@@ -74,16 +167,20 @@ def main():
     # 启动主Web服务
     if not args.no_web:
         try:
-            web_process = start_main_web_service()
+            web_process = start_main_web_service(log_pipeline)
             processes.append(("主Web服务", web_process))
             print("✓ 主Web服务已启动")
         except Exception as e:
             print(f"✗ 启动主Web服务失败: {e}")
     
-    # 启动MCP服务
+    # 启动MCP服务；STDIO服务必须由IDE启动，作为子进程它会读取本终端的输入，
+    # 协议输出也会被写进日志文件
+    if not args.no_mcp and args.mcp_transport == "stdio":
+        print("STDIO模式的MCP服务由IDE按MCP配置启动，这里不启动MCP服务")
+        args.no_mcp = True
     if not args.no_mcp:
         try:
-            mcp_process = start_mcp_service(args.mcp_transport, args.mcp_host, args.mcp_port)
+            mcp_process = start_mcp_service(log_pipeline, args.mcp_transport, args.mcp_host, args.mcp_port)
             processes.append(("MCP服务", mcp_process))
             print(f"✓ MCP服务已启动 (传输方式: {args.mcp_transport})")
         except Exception as e:
@@ -1,70 +1,302 @@
 # Storage Module Implementation
+#
+# Layout on disk:
+#   <storage_dir>/user_<id>/profile.json               user-level data
+#   <storage_dir>/user_<id>/templates/<template>.json  one record per template
+#
+# Every file is replaced atomically (write to a temporary file, then rename),
+# so a crash mid-write leaves the previous version intact, and saving one
+# template costs the same no matter how many templates the user has.
+#
+# Template records are independent files and need no locking. Read-merge-write
+# cycles on the profile (and the one-off legacy migration) run under a per-user
+# file lock, so concurrent saves from the web and MCP processes are all kept.
 
-import os
+import copy
 import json
+import os
+import tempfile
+import threading
 from datetime import datetime
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PROFILE_FILE = 'profile.json'
+TEMPLATES_DIR = 'templates'
+LOCK_FILE = '.lock'
+
+
+def atomic_write_json(path, data, durable=False):
+    """Write JSON to ``path`` so that readers see either the old or the new file"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FileLock:
+    """Exclusive lock shared by every process and thread that opens the same file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            # LK_LOCK retries for ~10 seconds; keep waiting beyond that
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def file_signature(path):
+    """(mtime, size, inode) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
 
 class StorageManager:
     """Manage user resources and data storage"""
-    
-    def __init__(self, storage_dir="storage"):
+
+    def __init__(self, storage_dir="storage", durable=False):
         self.storage_dir = storage_dir
+        # fsync every write; slower, but survives power loss as well as crashes
+        self.durable = durable
+        # path -> (file signature, parsed content); entries are revalidated
+        # against the file on every read so other processes' writes are seen
+        self._cache = {}
+        self._lock = threading.Lock()
         # Create storage directory if it doesn't exist
-        if not os.path.exists(storage_dir):
-            os.makedirs(storage_dir)
-    
+        os.makedirs(storage_dir, exist_ok=True)
+
+    # Paths
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.storage_dir, f"user_{user_id}")
+
+    def _profile_path(self, user_id):
+        return os.path.join(self._user_dir(user_id), PROFILE_FILE)
+
+    def _templates_dir(self, user_id):
+        return os.path.join(self._user_dir(user_id), TEMPLATES_DIR)
+
+    def _template_path(self, user_id, template_id):
+        # Template ids may be ints or arbitrary strings; quote them into a safe file name
+        return os.path.join(self._templates_dir(user_id), f"{quote(str(template_id), safe='')}.json")
+
+    def _legacy_path(self, user_id):
+        return os.path.join(self.storage_dir, f"user_{user_id}.json")
+
+    def _user_lock(self, user_id):
+        # Lives next to, not inside, the user directory so it can guard the migration too
+        return FileLock(os.path.join(self.storage_dir, f".user_{user_id}{LOCK_FILE}"))
+
+    def _prepare_user(self, user_id, create=False):
+        """Migrate a legacy user file if present and create the user's directories on demand"""
+        if os.path.exists(self._legacy_path(user_id)):
+            with self._user_lock(user_id):
+                # Another process may have finished the migration while we waited
+                if os.path.exists(self._legacy_path(user_id)):
+                    self._migrate_legacy_file(user_id)
+        if create and not os.path.isdir(self._templates_dir(user_id)):
+            os.makedirs(self._templates_dir(user_id), exist_ok=True)
+
+    def _migrate_legacy_file(self, user_id):
+        """Split a pre-existing user_<id>.json into profile and template records"""
+        # Renaming the legacy file is the last step, so an interrupted
+        # migration is simply redone on the next access
+        legacy_path = self._legacy_path(user_id)
+        os.makedirs(self._templates_dir(user_id), exist_ok=True)
+        data = read_json(legacy_path)
+        templates = data.pop('templates', {}) or {}
+        last_updated = data.get('last_updated', datetime.now().isoformat())
+        for sequence, (template_id, template_data) in enumerate(templates.items()):
+            self._write(self._template_path(user_id, template_id), {
+                'template_id': template_id,
+                'created': last_updated,
+                'sequence': sequence,
+                'last_updated': last_updated,
+                'data': template_data,
+            })
+        data.update(self._read(self._profile_path(user_id), {}, fresh=True))
+        self._write(self._profile_path(user_id), data)
+        os.replace(legacy_path, legacy_path + '.migrated')
+
+    # Cached file access
+
+    def _read(self, path, default=None, fresh=False):
+        signature = file_signature(path)
+        if signature is None:
+            return default
+        with self._lock:
+            cached = self._cache.get(path)
+            if not fresh and cached is not None and cached[0] == signature:
+                return cached[1]
+        try:
+            data = read_json(path)
+        except FileNotFoundError:
+            # Deleted since the stat, e.g. by delete_template in another process
+            with self._lock:
+                self._cache.pop(path, None)
+            return default
+        with self._lock:
+            self._cache[path] = (signature, data)
+        return data
+
+    def _write(self, path, data):
+        atomic_write_json(path, data, durable=self.durable)
+        with self._lock:
+            self._cache[path] = (file_signature(path), data)
+
+    # Public API
+
     def save_user_data(self, user_id, data):
-        """Save user data to storage"""
-        user_file = os.path.join(self.storage_dir, f"user_{user_id}.json")
-        
-        # Add timestamp
-        data['last_updated'] = datetime.now().isoformat()
-        
-        # Load existing data if file exists
-        if os.path.exists(user_file):
-            with open(user_file, 'r') as f:
-                existing_data = json.load(f)
-            # Merge data
-            existing_data.update(data)
-            data = existing_data
-        
-        # Save data
-        with open(user_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        return user_file
-    
+        """Save user data to storage
+
+        Keys are merged into the user's profile. Entries under 'templates' are
+        stored as individual template records.
+        """
+        self._prepare_user(user_id, create=True)
+        data = dict(data)
+        now = datetime.now().isoformat()
+
+        templates = data.pop('templates', None) or {}
+        for sequence, (template_id, template_data) in enumerate(templates.items()):
+            self._save_template_record(user_id, template_id, template_data, now, sequence)
+
+        # Add timestamp and merge with the existing profile. The lock makes the
+        # read-merge-write atomic across processes, and the profile is re-read
+        # from disk because the cached copy may predate another process's write.
+        profile_path = self._profile_path(user_id)
+        with self._user_lock(user_id):
+            profile = dict(self._read(profile_path, {}, fresh=True))
+            profile.update(copy.deepcopy(data))
+            profile['last_updated'] = now
+            self._write(profile_path, profile)
+
+        return profile_path
+
     def load_user_data(self, user_id):
         """Load user data from storage"""
-        user_file = os.path.join(self.storage_dir, f"user_{user_id}.json")
-        
-        if not os.path.exists(user_file):
+        self._prepare_user(user_id)
+        profile = self._read(self._profile_path(user_id))
+        records = self._load_template_records(user_id)
+        if profile is None and not records:
             return {}
-        
-        with open(user_file, 'r') as f:
-            return json.load(f)
-    
+
+        data = copy.deepcopy(profile or {})
+        if records:
+            data['templates'] = {
+                str(record['template_id']): copy.deepcopy(record['data']) for record in records
+            }
+            latest = max(record['last_updated'] for record in records)
+            data['last_updated'] = max(data.get('last_updated', latest), latest)
+        return data
+
     def save_template(self, user_id, template_id, template_data):
         """Save a template for a user"""
-        user_data = self.load_user_data(user_id)
-        if 'templates' not in user_data:
-            user_data['templates'] = {}
-        
-        user_data['templates'][template_id] = template_data
-        self.save_user_data(user_id, user_data)
-    
+        self._prepare_user(user_id, create=True)
+        self._save_template_record(user_id, template_id, template_data, datetime.now().isoformat())
+
     def get_template(self, user_id, template_id):
         """Get a template for a user"""
-        user_data = self.load_user_data(user_id)
-        if 'templates' not in user_data:
+        self._prepare_user(user_id)
+        record = self._read(self._template_path(user_id, template_id))
+        if record is None:
             return None
-        
-        return user_data['templates'].get(template_id)
-    
+        return copy.deepcopy(record['data'])
+
+    def delete_template(self, user_id, template_id):
+        """Delete a template for a user"""
+        self._prepare_user(user_id)
+        path = self._template_path(user_id, template_id)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._cache.pop(path, None)
+        return True
+
     def list_user_templates(self, user_id):
         """List all templates for a user"""
-        user_data = self.load_user_data(user_id)
-        if 'templates' not in user_data:
-            return []
-        
-        return list(user_data['templates'].values())
\ No newline at end of file
+        self._prepare_user(user_id)
+        return [copy.deepcopy(record['data']) for record in self._load_template_records(user_id)]
+
+    def _save_template_record(self, user_id, template_id, template_data, timestamp, sequence=0):
+        # Re-saving keeps a template's creation stamp, and so its place in listings
+        path = self._template_path(user_id, template_id)
+        existing = self._read(path)
+        if existing is not None:
+            created = existing.get('created', existing['last_updated'])
+            sequence = existing.get('sequence', 0)
+        else:
+            created = timestamp
+        self._write(path, {
+            'template_id': template_id,
+            'created': created,
+            'sequence': sequence,
+            'last_updated': timestamp,
+            'data': copy.deepcopy(template_data),
+        })
+
+    def _load_template_records(self, user_id):
+        templates_dir = self._templates_dir(user_id)
+        records = []
+        try:
+            with os.scandir(templates_dir) as entries:
+                names = sorted(entry.name for entry in entries
+                               if entry.name.endswith('.json') and not entry.name.startswith('.'))
+        except FileNotFoundError:
+            return records
+        for name in names:
+            record = self._read(os.path.join(templates_dir, name))
+            if record is not None:
+                records.append(record)
+        # Insertion order, as in the single-file layout; file names would put "10" before "2".
+        # Templates saved in one call share a timestamp and keep their order by sequence.
+        records.sort(key=lambda record: (record.get('created', record['last_updated']), record.get('sequence', 0)))
+        return records
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+模板目录导入/导出脚本：以NDJSON格式(每行一个模板，含占位符和提示词)流式导入或导出模板，
+分批提交，内存占用与目录大小无关；导入时跳过该用户已有的相同内容模板(按内容哈希)，可重复执行
+用法:
+    python template_catalogue.py export -o catalogue.ndjson              # 导出所有模板
+    python template_catalogue.py export --public -o market.ndjson.gz     # 只导出公开模板(.gz自动压缩)
+    python template_catalogue.py export --user testuser                  # 导出某个用户的模板到标准输出
+    python template_catalogue.py import catalogue.ndjson --user testuser # 导入为该用户的模板
+"""
+
+import argparse
+import gzip
+import sys
+import time
+
+from flask import Flask
+
+from models.database import init_database
+from models.migrations import run_migrations
+from models.models import db, User, Template
+from models.template_import import CATALOGUE_BATCH_SIZE, export_catalogue, import_catalogue
+
+
+def open_catalogue(path, mode):
+    """A binary file for ``path``; "-" is stdin/stdout and a .gz suffix is (de)compressed"""
+    if path == '-':
+        return (sys.stdin if mode == 'rb' else sys.stdout).buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def find_user(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        sys.exit(f"用户不存在: {username}")
+    return user
+
+
+def export_command(args):
+    criteria = []
+    if args.public:
+        criteria.append(Template.is_public == True)  # noqa: E712
+    if args.user:
+        criteria.append(Template.user_id == find_user(args.user).id)
+    count = 0
+    output = open_catalogue(args.output, 'wb')
+    try:
+        for line in export_catalogue(criteria, args.batch_size):
+            output.write(line.encode('utf-8'))
+            count += 1
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(f"已导出 {count} 个模板", file=sys.stderr)
+
+
+def import_command(args):
+    user = find_user(args.user)
+    start = time.perf_counter()
+    with open_catalogue(args.input, 'rb') as catalogue:
+        result = import_catalogue(catalogue, user.id, args.batch_size)
+    for number, message in result.errors:
+        print(f"第 {number} 行: {message}", file=sys.stderr)
+    print(f"导入 {result.imported}，跳过重复 {result.skipped}，失败 {result.failed}，"
+          f"用时 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if result.failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DesignMaster模板目录导入/导出 (NDJSON)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出模板")
+    export_parser.add_argument("-o", "--output", default="-", help="输出文件，.gz结尾时压缩 (默认: 标准输出)")
+    export_parser.add_argument("--public", action="store_true", help="只导出公开模板")
+    export_parser.add_argument("--user", help="只导出该用户的模板")
+    export_parser.add_argument("--batch-size", type=int, default=CATALOGUE_BATCH_SIZE,
+        help=f"每次读取的模板数 (默认: {CATALOGUE_BATCH_SIZE})")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = subparsers.add_parser("import", help="导入模板")
+    import_parser.add_argument("input", help="NDJSON文件，.gz结尾时解压，- 表示标准输入")
+    import_parser.add_argument("--user", default="testuser", help="导入模板的所有者 (默认: testuser)")
+    import_parser.add_argument("--batch-size", type=int, default=CATALOGUE_BATCH_SIZE,
+        help=f"每个事务提交的模板数 (默认: {CATALOGUE_BATCH_SIZE})")
+    import_parser.set_defaults(handler=import_command)
+
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size 必须大于0")
+
+    app = Flask('template_catalogue')
+    init_database(app, role='script')
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine, backup=True)
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
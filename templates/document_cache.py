@@ -0,0 +1,115 @@
+# Rendered Document Cache
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class DocumentCache:
+    """
+    LRU cache of rendered documents keyed by (template_id, version)
+    Template.version is bumped in the same transaction as every change to a
+    template's content or placeholders, so a cached entry is valid for exactly
+    as long as its version is current; no explicit invalidation is needed.
+    When only placeholder contents changed since the cached render, the new
+    document is spliced from the old one instead of being rendered again.
+    The cache is bounded both by entry count and by total memory.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.splices = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        # template_id -> RenderedDocument; one entry per template since only
+        # the latest version can ever be requested again
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_id, version):
+        """Return the cached RenderedDocument, or None"""
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(template_id)
+            return entry
+
+    def put(self, template_id, rendered):
+        """Store a RenderedDocument, evicting least recently used entries"""
+        if rendered.size > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is not None:
+                # Never replace a newer version with an older render
+                if entry.version > rendered.version:
+                    return
+                self.current_bytes -= entry.size
+            self._entries[template_id] = rendered
+            self._entries.move_to_end(template_id)
+            self.current_bytes += rendered.size
+            while self._entries and (self.current_bytes > self.max_bytes
+                                     or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+                self.evictions += 1
+
+    def get_document(self, template_id, version, layout_version, render, load_changes):
+        """
+        Return the RenderedDocument for ``version``
+        ``render()`` builds the document from scratch. ``load_changes(since)``
+        returns the placeholder values changed after version ``since``; it is
+        used instead when the cached render is older than ``version`` but not
+        older than ``layout_version``, the last change to the template's
+        content or placeholder names.
+        """
+        with self._lock:
+            cached = self._entries.get(template_id)
+            if cached is not None and cached.version == version:
+                self._entries.move_to_end(template_id)
+                self.hits += 1
+                return cached
+
+        if cached is not None and layout_version <= cached.version < version:
+            rendered = cached.splice(load_changes(cached.version), version)
+            with self._lock:
+                self.splices += 1
+        else:
+            rendered = render()
+            with self._lock:
+                self.misses += 1
+        self.put(template_id, rendered)
+        return rendered
+
+    def invalidate(self, template_id=None):
+        """Drop one template, or everything"""
+        with self._lock:
+            if template_id is None:
+                self._entries.clear()
+                self.current_bytes = 0
+                return
+            entry = self._entries.pop(template_id, None)
+            if entry is not None:
+                self.current_bytes -= entry.size
+
+    def stats(self):
+        """Return hit/splice/miss/eviction counters and current usage"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'splices': self.splices,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+            }
+
+
+document_cache = DocumentCache(
+    max_bytes=int(os.environ.get('DOCUMENT_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    max_entries=int(os.environ.get('DOCUMENT_CACHE_MAX_ENTRIES', 1024)),
+)
@@ -0,0 +1,191 @@
+# Markdown Preview Implementation
+#
+# Converts template and document Markdown to HTML for the web preview. The
+# conversion is done once per content hash and kept in a bounded cache, so
+# reloading a large, unchanged document never converts it again.
+#
+# Template and placeholder content comes from users and agents, so the output
+# is made safe to embed: raw HTML is escaped instead of passed through, and
+# only allowlisted attributes and link schemes survive (attr_list from the
+# "extra" extension could otherwise add event handlers).
+
+import hashlib
+import html
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+from models.plantuml_pipeline import (
+    FENCED_BLOCK_PATTERN, DiagramCache, check_plantuml_syntax, normalize_source, plantuml_pipeline,
+)
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'toc']
+
+# Attributes kept on generated elements; everything else (on*, style, ...) is dropped
+ALLOWED_ATTRIBUTES = frozenset(['href', 'src', 'alt', 'title', 'id', 'class', 'align', 'colspan', 'rowspan',
+                                'start', 'rev'])
+URL_ATTRIBUTES = ('href', 'src')
+ALLOWED_URL_SCHEMES = frozenset(['http', 'https', 'mailto'])
+URL_SCHEME_PATTERN = re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*):')
+# Part of every cache key and page ETag: change it whenever the sanitizing
+# rules change so that HTML produced under the old rules is not served
+SANITIZER_VERSION = 'safe-html-2'
+
+PreviewEntry = namedtuple('PreviewEntry', ['key', 'html', 'last_modified', 'size'])
+
+
+def link_diagrams(content, pipeline):
+    """
+    Replace valid ```plantuml fences with images served from the diagram cache
+    Rendering is started in the background; the image route waits for it.
+    Diagrams with syntax errors stay as code blocks.
+    """
+    pipeline.process(content)
+
+    def replace(match):
+        source = normalize_source(match.group(1))
+        if check_plantuml_syntax(source):
+            return match.group(0)
+        key = DiagramCache.key(pipeline.renderer, source)
+        return f"![diagram](/diagrams/{key})\n"
+
+    return FENCED_BLOCK_PATTERN.sub(replace, content)
+
+
+def safe_url(url):
+    """Whether a link target is relative or uses an allowed scheme"""
+    # The attribute is written out with its character references intact and
+    # the browser decodes them ("&#106;avascript:"), so check the decoded value;
+    # browsers also ignore whitespace and control characters inside the scheme
+    compact = re.sub(r'[\x00-\x20]+', '', html.unescape(url))
+    match = URL_SCHEME_PATTERN.match(compact)
+    return match is None or match.group(1).lower() in ALLOWED_URL_SCHEMES
+
+
+class SanitizeTreeprocessor(Treeprocessor):
+    """Drop attributes outside the allowlist and links with unsafe schemes"""
+
+    def run(self, root):
+        for element in root.iter():
+            for name in list(element.attrib):
+                if name not in ALLOWED_ATTRIBUTES or (name in URL_ATTRIBUTES and not safe_url(element.get(name))):
+                    del element.attrib[name]
+
+
+class SafeHtmlExtension(Extension):
+    """Escape raw HTML in the source and sanitize the generated elements"""
+
+    def extendMarkdown(self, md):
+        # Without these, raw HTML is treated as text and escaped on output
+        for registry, name in ((md.preprocessors, 'html_block'), (md.inlinePatterns, 'html')):
+            if name in registry:
+                registry.deregister(name)
+        # After the inline patterns have created every link and image
+        md.treeprocessors.register(SanitizeTreeprocessor(md), 'sanitize', 1)
+
+
+def create_converter():
+    """A Markdown converter producing HTML that is safe to embed"""
+    # The safe extension goes last so that it also removes what "extra" registers
+    return markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [SafeHtmlExtension()])
+
+
+class MarkdownPreviewCache:
+    """LRU cache of converted HTML keyed by content hash, bounded by entries and memory"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=256, diagram_pipeline=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.diagram_pipeline = diagram_pipeline
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # markdown.Markdown instances are reusable but not thread-safe
+        self._local = threading.local()
+
+    def namespace(self):
+        """
+        What besides the content shapes the HTML: the sanitizing rules, and
+        the diagram renderer, since diagrams are linked only when one is configured
+        """
+        pipeline = self.diagram_pipeline
+        if pipeline is None or pipeline.renderer is None:
+            return SANITIZER_VERSION
+        return f"{SANITIZER_VERSION}\0{pipeline.renderer.cache_namespace}"
+
+    def key(self, content):
+        """Cache key for the preview of ``content``"""
+        digest = hashlib.sha256(f"{self.namespace()}\0{content}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _convert(self, content):
+        converter = getattr(self._local, 'converter', None)
+        if converter is None:
+            converter = self._local.converter = create_converter()
+        if self.diagram_pipeline is not None and self.diagram_pipeline.renderer is not None:
+            content = link_diagrams(content, self.diagram_pipeline)
+        try:
+            return converter.convert(content)
+        finally:
+            converter.reset()
+
+    def get(self, key):
+        """Return the cached PreviewEntry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_html(self, content, key=None):
+        """Return the PreviewEntry for ``content``, converting it on a miss"""
+        key = key or self.key(content)
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        html = self._convert(content)
+        entry = PreviewEntry(key, html, datetime.now(timezone.utc).replace(microsecond=0),
+                             sys.getsizeof(html))
+        with self._lock:
+            self.misses += 1
+            if entry.size > self.max_bytes:
+                return entry
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.size
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            while self._entries and (self.current_bytes > self.max_bytes
+                                     or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+        return entry
+
+    def stats(self):
+        """Return hit/miss counters and current usage"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+            }
+
+
+preview_cache = MarkdownPreviewCache(
+    max_bytes=int(os.environ.get('PREVIEW_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    max_entries=int(os.environ.get('PREVIEW_CACHE_MAX_ENTRIES', 256)),
+    diagram_pipeline=plantuml_pipeline,
+)
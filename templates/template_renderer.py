@@ -0,0 +1,194 @@
+# Template Renderer Implementation
+
+import hashlib
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+# Matches {{name}}; braces are not allowed inside the name so that "{{{x}}}"
+# resolves to "{" + "{{x}}" + "}" exactly like str.replace would.
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^{}]*)\}\}')
+
+
+def missing_placeholder_text(name):
+    """Text rendered for a placeholder that has no submitted content"""
+    return f"[{name} content not provided]"
+
+
+def content_hash(content):
+    """Stable hash of template content, used to validate compiled entries"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class CompiledTemplate:
+    """Template content tokenized into alternating literal/placeholder segments
+
+    ``literals`` always holds one more item than ``names``; the document is
+    ``literals[0] + value(names[0]) + literals[1] + ... + literals[-1]``.
+    ``slots`` maps each name to the indexes of its values in that part list.
+    """
+
+    __slots__ = ('literals', 'names', 'content_hash', 'slots')
+
+    def __init__(self, literals, names, content_hash=None):
+        self.literals = literals
+        self.names = names
+        self.content_hash = content_hash
+        slots = {}
+        for index, name in enumerate(names):
+            slots.setdefault(name, []).append(2 * index + 1)
+        self.slots = {name: tuple(indexes) for name, indexes in slots.items()}
+
+    @classmethod
+    def compile(cls, content, digest=None):
+        """Tokenize template content in a single pass"""
+        literals = []
+        names = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(content):
+            literals.append(content[position:match.start()])
+            names.append(match.group(1))
+            position = match.end()
+        literals.append(content[position:])
+        return cls(tuple(literals), tuple(names), digest)
+
+    @property
+    def placeholder_names(self):
+        """Distinct placeholder names in order of first appearance"""
+        return list(dict.fromkeys(self.names))
+
+    def render_parts(self, values):
+        """
+        Return the document as a list of alternating literal and value parts
+        ``values`` maps placeholder name to replacement text. Names that are
+        not in ``values`` are left untouched as ``{{name}}``.
+        """
+        literals = self.literals
+        parts = [literals[0]]
+        append = parts.append
+        for index, name in enumerate(self.names):
+            value = values.get(name)
+            append(f"{{{{{name}}}}}" if value is None else value)
+            append(literals[index + 1])
+        return parts
+
+    def render(self, values):
+        """Render the document with a single join"""
+        return ''.join(self.render_parts(values))
+
+
+class RenderedDocument:
+    """
+    A rendered document that remembers where each placeholder value sits
+    Changing a few placeholders re-splices only their segments, and the
+    result can be described as a patch against the previous output.
+    """
+
+    __slots__ = ('compiled', 'parts', 'document', 'version', 'base_version', 'patch', 'size')
+
+    def __init__(self, compiled, parts, version, base_version=None, patch=None):
+        self.compiled = compiled
+        self.parts = parts
+        self.document = ''.join(parts)
+        self.version = version
+        # Set when this document was spliced from an earlier render
+        self.base_version = base_version
+        self.patch = patch
+        self.size = sys.getsizeof(self.document) + sys.getsizeof(parts) + sum(map(sys.getsizeof, parts))
+
+    @classmethod
+    def render(cls, compiled, values, version):
+        return cls(compiled, compiled.render_parts(values), version)
+
+    def splice(self, values, version):
+        """
+        Return a new document with the given placeholder values replaced
+        The new document's ``patch`` lists ``{'offset', 'length', 'text'}``
+        edits against this document, in ascending, non-overlapping order.
+        """
+        parts = list(self.parts)
+        changed = []
+        for name, value in values.items():
+            for index in self.compiled.slots.get(name, ()):
+                if parts[index] != value:
+                    parts[index] = value
+                    changed.append(index)
+        changed.sort()
+
+        patch = []
+        offset = 0
+        position = 0
+        old_parts = self.parts
+        for index in changed:
+            offset += sum(map(len, old_parts[position:index]))
+            patch.append({'offset': offset, 'length': len(old_parts[index]), 'text': parts[index]})
+            position = index
+        return RenderedDocument(self.compiled, parts, version, base_version=self.version, patch=patch)
+
+    def patch_from(self, since_version):
+        """Edits turning the document at ``since_version`` into this one, or None if unknown"""
+        if since_version == self.version:
+            return []
+        if since_version is not None and since_version == self.base_version:
+            return self.patch
+        return None
+
+
+class TemplateCompiler:
+    """Compile templates once and keep the compiled form in a bounded LRU cache"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_id, content):
+        """Return the compiled template, recompiling when the content changed"""
+        digest = content_hash(content)
+        key = (template_id, digest)
+        with self._lock:
+            compiled = self._cache.get(key)
+            if compiled is not None:
+                self._cache.move_to_end(key)
+                return compiled
+
+        compiled = CompiledTemplate.compile(content, digest)
+        with self._lock:
+            self._cache[key] = compiled
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def invalidate(self, template_id=None):
+        """Drop cached entries for one template, or everything"""
+        with self._lock:
+            if template_id is None:
+                self._cache.clear()
+                return
+            for key in [key for key in self._cache if key[0] == template_id]:
+                del self._cache[key]
+
+
+template_compiler = TemplateCompiler()
+
+
+def placeholder_values(placeholders):
+    """Build the name -> text mapping used for rendering
+
+    When several placeholders share a name the first one wins, matching the
+    order in which the old replace loop applied them.
+    """
+    values = {}
+    for placeholder in placeholders:
+        if placeholder.name not in values:
+            values[placeholder.name] = placeholder.content or missing_placeholder_text(placeholder.name)
+    return values
+
+
+def render_document(template_id, content, placeholders, compiler=None):
+    """Render template content with the given placeholders"""
+    compiler = compiler or template_compiler
+    compiled = compiler.get(template_id, content)
+    return compiled.render(placeholder_values(placeholders))
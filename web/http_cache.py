@@ -0,0 +1,78 @@
+# HTTP Caching and Compression for the Web App
+#
+# Pages compute an ETag from the version stamps of the rows they show, before
+# doing any other work, and answer 304 Not Modified when the browser already
+# has that version. Large text responses are gzip-compressed.
+
+import gzip
+import hashlib
+
+from flask import Response, request
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/markdown',
+    'application/json', 'application/javascript', 'application/x-ndjson', 'image/svg+xml',
+}
+
+
+def etag_for(*parts):
+    """ETag derived from everything a response depends on"""
+    return hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 response, when the request's If-None-Match already names ``etag``; otherwise None"""
+    # Weak comparison: compressed responses carry the ETag as a weak validator
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional_response(body, etag, last_modified=None, mimetype=None):
+    """
+    Build a response that browsers keep but always revalidate
+    ``private`` keeps per-user pages out of shared caches; Last-Modified is
+    honoured too when given.
+    """
+    response = body if isinstance(body, Response) else Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def gzip_response(response):
+    """after_request hook that gzip-compresses large text responses for clients that accept it"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or request.accept_encodings['gzip'] <= 0):
+        return response
+
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The compressed bytes differ from the identity encoding, so the ETag
+    # can only remain a weak validator
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_http_cache(app):
+    """Install response compression on a Flask app"""
+    app.after_request(gzip_response)
@@ -0,0 +1,192 @@
+# Log Pipeline Implementation
+#
+# Collects the output of supervised services. Every stdout/stderr pipe of a
+# child process gets a reader thread that does nothing but read whatever the
+# pipe holds and hand the complete lines to a bounded queue, so a child can
+# never block on a full pipe. One writer thread turns the queued lines into
+# JSON records tagged with the service, worker and PID, appends them in
+# batches to a size-rotated log file and echoes them to the console. When the
+# writer falls behind and the queue is full, lines are dropped and counted
+# instead of waiting: memory stays bounded and logging never back-pressures a
+# worker.
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+# Bytes read from a pipe at once; longer lines are split into several records
+READ_BYTES = 64 * 1024
+
+
+def timestamp():
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+class LogPipeline:
+    """
+    Drain child process output into rotating JSON-lines files
+    At most ``queue_size`` reads (of up to 64 KB each) wait for the writer;
+    the log file rolls over at ``max_bytes`` and ``backup_count`` old files
+    are kept.
+    """
+
+    def __init__(self, directory='logs', filename='services.log', max_bytes=10 * 1024 * 1024, backup_count=5,
+                 queue_size=64, echo=True):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, filename)
+        self.max_bytes = max_bytes
+        self.echo = echo
+        # Lines dropped since the start, and since the last "dropped" record
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._readers = []
+        # Only used for its rotation; batches are written to its stream directly
+        self._file = logging.handlers.RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backup_count,
+                                                          encoding='utf-8')
+        self._writer = threading.Thread(target=self._write_loop, name='log-writer', daemon=True)
+        self._writer.start()
+
+    def submit(self, fields, messages):
+        """
+        Queue messages sharing the record ``fields``; drop them if the queue is full
+        Messages may be bytes, as read from a pipe, or str.
+        """
+        try:
+            self._queue.put_nowait((fields, messages))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(messages)
+                self._unreported_drops += len(messages)
+
+    def attach(self, process, service, worker=None):
+        """Drain the piped stdout and stderr of a child process"""
+        # Readers of replaced workers end when their pipes close
+        self._readers = [reader for reader in self._readers if reader.is_alive()]
+        for stream_name in ('stdout', 'stderr'):
+            stream = getattr(process, stream_name)
+            if stream is None:
+                continue
+            fields = {'service': service, 'worker': worker or service, 'pid': process.pid, 'stream': stream_name}
+            reader = threading.Thread(target=self._read_loop, args=(stream, fields),
+                                      name=f"log-reader-{fields['worker']}-{stream_name}", daemon=True)
+            reader.start()
+            self._readers.append(reader)
+
+    def _read_loop(self, stream, fields):
+        pending = b''
+        with stream:
+            while True:
+                # Whatever the pipe holds, without waiting for more
+                chunk = stream.read1(READ_BYTES)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b'\n')
+                if len(pending) >= READ_BYTES:
+                    lines.append(pending)
+                    pending = b''
+                if lines:
+                    self.submit({**fields, 'time': timestamp()}, lines)
+        if pending:
+            self.submit({**fields, 'time': timestamp()}, [pending])
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Write everything that is already queued in one go
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._write([entry for entry in batch if entry is not None])
+            self._report_dropped()
+            if stop:
+                break
+
+    def _report_dropped(self):
+        with self._lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        if dropped:
+            fields = {'service': 'supervisor', 'worker': 'supervisor', 'pid': os.getpid(), 'stream': 'log',
+                      'time': timestamp()}
+            self._write([(fields, [f"Dropped {dropped} log lines while the log writer was behind"])])
+
+    def _write(self, entries):
+        stream = self._file.stream
+        size = stream.tell()
+        lines = []
+        console = []
+        for fields, messages in entries:
+            # The fields are shared by every message of the entry
+            prefix = json.dumps(fields)[:-1] + ', "message": '
+            for message in messages:
+                if isinstance(message, bytes):
+                    message = message.decode('utf-8', errors='replace')
+                message = message.rstrip('\r')
+                if not message:
+                    continue
+                # ASCII-only JSON, so that characters are bytes for the size limit
+                line = prefix + json.dumps(message) + '}\n'
+                if lines and size + len(line) > self.max_bytes > 0:
+                    stream.write(''.join(lines))
+                    self._file.doRollover()
+                    stream = self._file.stream
+                    size, lines = 0, []
+                lines.append(line)
+                size += len(line)
+                if self.echo:
+                    console.append(f"[{fields['worker']} {fields['pid']}] {message}")
+        stream.write(''.join(lines))
+        stream.flush()
+        if console:
+            try:
+                print('\n'.join(console), flush=True)
+            except (OSError, ValueError):
+                # No usable console (closed or detached); the file still gets the lines
+                self.echo = False
+
+    def close(self, timeout=5):
+        """Write what the readers still deliver, then stop the writer"""
+        for reader in self._readers:
+            reader.join(timeout)
+        # A dead or stuck writer never makes room for the stop marker
+        if self._writer.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._writer.join(timeout)
+        # Leave the file to a writer that is still running
+        if not self._writer.is_alive():
+            self._file.close()
+
+
+class PipelineHandler(logging.Handler):
+    """Logging handler feeding the supervisor's own records into a LogPipeline"""
+
+    def __init__(self, pipeline, service='supervisor'):
+        super().__init__()
+        self.pipeline = pipeline
+        self.service = service
+
+    def emit(self, record):
+        try:
+            fields = {'service': self.service, 'worker': self.service, 'pid': os.getpid(), 'stream': 'log',
+                      'level': record.levelname, 'time': timestamp()}
+            self.pipeline.submit(fields, [self.format(record)])
+        except Exception:
+            self.handleError(record)
+
+
+def child_output_env(env=None):
+    """Environment for a child whose output is piped: unbuffered, so lines arrive as they are written"""
+    env = dict(os.environ if env is None else env)
+    env['PYTHONUNBUFFERED'] = '1'
+    return env
@@ -0,0 +1,62 @@
+# Worker Serving Implementation
+#
+# The worker side of the multi-process mode of start_all_services.py. Every
+# web or MCP worker binds the public port itself with SO_REUSEPORT, so the
+# kernel spreads incoming connections across the workers without a balancing
+# process in between. Each worker is also handed a private, already listening
+# socket on 127.0.0.1 by the supervisor; it serves the same application there
+# so that the supervisor can health-check every worker individually, which
+# the shared port cannot do.
+#
+# Kept free of heavy imports: mcp_service.py uses it before its first tool
+# call loads the database backend.
+
+import os
+import socket
+import threading
+
+# Environment variable carrying the file descriptor of the health socket
+HEALTH_FD_ENV = 'DESIGNMASTER_HEALTH_FD'
+LISTEN_BACKLOG = 1024
+
+
+def reuse_port_supported():
+    """Whether this platform lets several processes bind the same port"""
+    return hasattr(socket, 'SO_REUSEPORT')
+
+
+def listen_socket(host, port, reuse_port=False):
+    """A TCP socket bound to ``host``:``port`` and listening"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(LISTEN_BACKLOG)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def health_socket():
+    """The private health-check socket handed down by the supervisor, or None"""
+    fd = os.environ.get(HEALTH_FD_ENV)
+    if not fd:
+        return None
+    return socket.socket(fileno=int(fd))
+
+
+def serve_wsgi(app, host, port, reuse_port=True):
+    """Serve a WSGI app on the shared port, and on the health socket if any, until killed"""
+    from werkzeug.serving import make_server
+
+    sock = listen_socket(host, port, reuse_port)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    health = health_socket()
+    if health is not None:
+        health_server = make_server('127.0.0.1', health.getsockname()[1], app, threaded=True, fd=health.fileno())
+        threading.Thread(target=health_server.serve_forever, name='health', daemon=True).start()
+    server.serve_forever()
@@ -0,0 +1,238 @@
+# Process Supervisor Implementation
+#
+# Runs a fixed number of worker processes per service, checks each worker's
+# health over the private socket it is handed (see workers.serving), and
+# replaces workers that exit or stop answering. Restarts of a worker that
+# keeps failing are delayed with exponential backoff so that a broken
+# deployment does not spin; a worker that stayed up long enough starts over
+# from the initial delay.
+
+import http.client
+import logging
+import os
+import subprocess
+import time
+
+from workers.log_pipeline import child_output_env
+from workers.serving import HEALTH_FD_ENV, listen_socket
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerSpec:
+    """
+    How to run the workers of one service
+    ``command`` is the argv of a worker; ``env`` is added to the supervisor's
+    environment. Workers must answer ``GET health_path`` on their health socket.
+    """
+
+    def __init__(self, name, command, count=1, env=None, health_path='/healthz'):
+        self.name = name
+        self.command = list(command)
+        self.count = count
+        self.env = dict(env or {})
+        self.health_path = health_path
+
+
+class Worker:
+    """One worker slot of a service; its process is replaced on every restart"""
+
+    def __init__(self, spec, slot):
+        self.spec = spec
+        self.slot = slot
+        self.process = None
+        self.health_port = None
+        self.started_at = None
+        self.healthy = False
+        self.missed_checks = 0
+        self.failures = 0
+        self.restarts = 0
+        self.restart_at = None
+        self.next_check_at = None
+
+    @property
+    def name(self):
+        return f"{self.spec.name}-{self.slot}"
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process is not None else None
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+
+class Supervisor:
+    """
+    Start, health-check and restart the workers of several services
+    A worker is killed and replaced after ``unhealthy_after`` failed checks
+    in a row, or when it has not become healthy within ``startup_timeout``
+    seconds. Restarts wait ``backoff_initial`` seconds, doubling with every
+    failure up to ``backoff_max``; the count resets once a worker has been
+    up for ``stable_after`` seconds. With a ``log_pipeline`` the output of
+    every worker is piped into it; otherwise workers share the supervisor's
+    stdout and stderr.
+    """
+
+    def __init__(self, specs, cwd=None, health_interval=2.0, health_timeout=2.0, unhealthy_after=3,
+                 startup_timeout=60.0, backoff_initial=1.0, backoff_max=30.0, stable_after=30.0,
+                 log_pipeline=None):
+        self.specs = list(specs)
+        self.cwd = cwd
+        self.log_pipeline = log_pipeline
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_after = unhealthy_after
+        self.startup_timeout = startup_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.workers = [Worker(spec, slot) for spec in self.specs for slot in range(1, spec.count + 1)]
+        self._stopping = False
+
+    def spawn(self, worker):
+        """Start a new process for a worker slot"""
+        health = listen_socket('127.0.0.1', 0)
+        env = os.environ.copy()
+        env.update(worker.spec.env)
+        env[HEALTH_FD_ENV] = str(health.fileno())
+        env['DESIGNMASTER_WORKER'] = worker.name
+        output = {}
+        if self.log_pipeline is not None:
+            env = child_output_env(env)
+            output = {'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE}
+        try:
+            worker.process = subprocess.Popen(worker.spec.command, cwd=self.cwd, env=env,
+                                              pass_fds=(health.fileno(),), **output)
+            worker.health_port = health.getsockname()[1]
+            if self.log_pipeline is not None:
+                self.log_pipeline.attach(worker.process, worker.spec.name, worker.name)
+        finally:
+            # The worker holds its own copy of the socket
+            health.close()
+        now = time.monotonic()
+        worker.started_at = now
+        worker.healthy = False
+        worker.missed_checks = 0
+        worker.restart_at = None
+        worker.next_check_at = now + min(1.0, self.health_interval)
+        logger.info("Started %s (pid %d)", worker.name, worker.pid)
+
+    def check_health(self, worker):
+        """Whether the worker answers its health check with a 200"""
+        connection = http.client.HTTPConnection('127.0.0.1', worker.health_port, timeout=self.health_timeout)
+        try:
+            connection.request('GET', worker.spec.health_path)
+            return connection.getresponse().status == 200
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            connection.close()
+
+    def wait_healthy(self, worker):
+        """Block until a freshly spawned worker is healthy; False if it exits or times out"""
+        deadline = worker.started_at + self.startup_timeout
+        while time.monotonic() < deadline and not self._stopping:
+            if not worker.running():
+                return False
+            if self.check_health(worker):
+                worker.healthy = True
+                return True
+            time.sleep(0.2)
+        return False
+
+    def start(self):
+        """
+        Start every worker
+        The first worker starts alone and must become healthy before the
+        others are started, so that only one process creates or migrates
+        the database schema.
+        """
+        if not self.workers:
+            return
+        first, *rest = self.workers
+        self.spawn(first)
+        if not self.wait_healthy(first):
+            logger.warning("%s did not become healthy; starting the other workers anyway", first.name)
+        for worker in rest:
+            self.spawn(worker)
+
+    def schedule_restart(self, worker, reason):
+        """Record a worker failure and decide when its replacement starts"""
+        now = time.monotonic()
+        if worker.started_at is not None and now - worker.started_at >= self.stable_after:
+            worker.failures = 0
+        worker.failures += 1
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** (worker.failures - 1))
+        worker.restart_at = now + delay
+        worker.healthy = False
+        logger.warning("%s (pid %s) %s; restarting in %.1fs", worker.name, worker.pid, reason, delay)
+
+    def stop_worker(self, worker, timeout=10):
+        """Terminate a worker's process, killing it if it does not exit in time"""
+        process = worker.process
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def poll(self):
+        """One supervision pass over every worker"""
+        now = time.monotonic()
+        for worker in self.workers:
+            if self._stopping:
+                return
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self.spawn(worker)
+                continue
+            if not worker.running():
+                self.schedule_restart(worker, f"exited with code {worker.process.returncode}")
+                continue
+            if now < worker.next_check_at:
+                continue
+            worker.next_check_at = now + self.health_interval
+            if self.check_health(worker):
+                worker.healthy = True
+                worker.missed_checks = 0
+                continue
+            worker.missed_checks += 1
+            if not worker.healthy and now - worker.started_at < self.startup_timeout:
+                # Still starting up
+                continue
+            if worker.healthy and worker.missed_checks < self.unhealthy_after:
+                continue
+            reason = "failed its health checks" if worker.healthy else "did not become healthy"
+            # A worker that does not answer may not handle SIGTERM either
+            worker.process.kill()
+            worker.process.wait()
+            self.schedule_restart(worker, reason)
+
+    def run(self, interval=0.5):
+        """Supervise the workers until ``request_stop`` is called or the process is interrupted"""
+        try:
+            while not self._stopping:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def request_stop(self):
+        """Make ``run`` return after stopping the workers; safe to call from a signal handler"""
+        self._stopping = True
+
+    def stop(self):
+        """Terminate every worker"""
+        self._stopping = True
+        for worker in self.workers:
+            if worker.running():
+                worker.process.terminate()
+        for worker in self.workers:
+            self.stop_worker(worker, timeout=5)